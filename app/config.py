@@ -1,14 +1,26 @@
 """Config: read from env only, defaults in code."""
 
+import json
+import logging
 import os
+import threading
+from collections.abc import Callable, Mapping
+from types import MappingProxyType
+from typing import Any
 
 from dotenv import load_dotenv
 
+logger = logging.getLogger(__name__)
+
 # Project root
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_DOTENV_PATH = os.path.join(PROJECT_ROOT, ".env")
 
 # Local dev: load env from .env
-load_dotenv(os.path.join(PROJECT_ROOT, ".env"))
+load_dotenv(_DOTENV_PATH)
+
+# Read-only config snapshot shared by the whole process
+Config = Mapping[str, Any]
 
 
 def _env_int(key: str, default: int) -> int:
@@ -25,12 +37,85 @@ def _env_str(key: str, default: str = "") -> str:
     return os.environ.get(key, default)
 
 
-def _env_csv(key: str, default: str = "") -> list[str]:
+def _env_choice(key: str, choices: tuple[str, ...], default: str) -> str:
+    val = os.environ.get(key, default).strip().lower()
+    return val if val in choices else default
+
+
+def _env_csv(key: str, default: str = "") -> tuple[str, ...]:
     val = os.environ.get(key, default)
-    return [item.strip() for item in val.split(",") if item.strip()]
+    return tuple(item.strip() for item in val.split(",") if item.strip())
 
 
-def resolve_repo_workspace(cfg: dict) -> str:
+def _env_json_object(key: str) -> dict:
+    val = os.environ.get(key, "").strip()
+    if not val:
+        return {}
+    try:
+        parsed = json.loads(val)
+    except ValueError:
+        logger.warning("[config] %s is not valid JSON, ignored", key)
+        return {}
+    if not isinstance(parsed, dict):
+        logger.warning("[config] %s must be a JSON object, ignored", key)
+        return {}
+    return parsed
+
+
+def _env_diff_project_rules(key: str) -> dict:
+    """
+    Read per-project diff rules, dropping invalid overrides with a warning.
+
+    A dropped override falls back to the global setting, so a typo cannot
+    fail every review of the project.
+    """
+    rules: dict = {}
+    for project, rule in _env_json_object(key).items():
+        if not isinstance(rule, dict):
+            logger.warning("[config] %s[%r] must be a JSON object, ignored", key, project)
+            continue
+        rule = dict(rule)
+        for field in ("include", "exclude"):
+            value = rule.get(field)
+            if value is None or isinstance(value, str):
+                continue
+            if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+                logger.warning(
+                    "[config] %s[%r].%s must be a string or list of strings, "
+                    "using the global value",
+                    key,
+                    project,
+                    field,
+                )
+                del rule[field]
+        if "max_file_bytes" in rule:
+            value = rule["max_file_bytes"]
+            try:
+                if isinstance(value, bool):
+                    raise ValueError(value)
+                rule["max_file_bytes"] = int(value)
+            except (TypeError, ValueError):
+                logger.warning(
+                    "[config] %s[%r].max_file_bytes=%r is not an integer, "
+                    "using the global value",
+                    key,
+                    project,
+                    value,
+                )
+                del rule["max_file_bytes"]
+        rules[project] = rule
+    return rules
+
+
+_DEFAULT_DIFF_EXCLUDE = (
+    "*.lock,package-lock.json,pnpm-lock.yaml,go.sum,"
+    "*.min.js,*.min.css,*.map,"
+    "vendor/,node_modules/,third_party/,"
+    "*.pb.go,*_pb2.py,*_pb2_grpc.py"
+)
+
+
+def resolve_repo_workspace(cfg: Config) -> str:
     """
     Resolve repo_workspace to an absolute path.
     If already absolute, return as-is; otherwise relative to PROJECT_ROOT.
@@ -39,7 +124,7 @@ def resolve_repo_workspace(cfg: dict) -> str:
     return repo_ws if os.path.isabs(repo_ws) else os.path.join(PROJECT_ROOT, repo_ws)
 
 
-def resolve_claude_skills_root(cfg: dict) -> str:
+def resolve_claude_skills_root(cfg: Config) -> str:
     """
     Resolve claude_skills_root to an absolute path.
     If already absolute, return as-is; otherwise relative to PROJECT_ROOT.
@@ -52,27 +137,149 @@ def resolve_claude_skills_root(cfg: dict) -> str:
     )
 
 
-def get_config() -> dict:
+def _resolve_workspace_file(cfg: Config, key: str) -> str:
+    """Resolve a file setting relative to repo_workspace; "" stays disabled."""
+    path = cfg.get(key, "")
+    if not path:
+        return ""
+    return path if os.path.isabs(path) else os.path.join(resolve_repo_workspace(cfg), path)
+
+
+def resolve_review_queue_db(cfg: Config) -> str:
+    """
+    Resolve review_queue_db to an absolute path, or "" for an in-memory queue.
+    Relative paths are placed under the resolved repo_workspace.
+    """
+    return _resolve_workspace_file(cfg, "review_queue_db")
+
+
+def resolve_review_queue_socket(cfg: Config) -> str:
+    """
+    Resolve review_queue_socket to an absolute path, or "" when ingress
+    processes run their own queue. Relative paths are placed under the
+    resolved repo_workspace.
+    """
+    return _resolve_workspace_file(cfg, "review_queue_socket")
+
+
+def resolve_review_cache_db(cfg: Config) -> str:
+    """
+    Resolve review_cache_db to an absolute path, or "" when caching is off.
+    Relative paths are placed under the resolved repo_workspace.
+    """
+    return _resolve_workspace_file(cfg, "review_cache_db")
+
+
+def _load_config() -> dict:
     """Load config from env, use defaults for missing keys."""
     return {
         "gitlab_url": _env_str("GITLAB_URL", "http://localhost"),
         "gitlab_token": _env_str("GITLAB_TOKEN"),
         "gitlab_webhook_secret": _env_str("GITLAB_WEBHOOK_SECRET"),
         "repo_workspace": _env_str("REPO_WORKSPACE", "repos"),
+        "repo_workspace_mode": _env_choice(
+            "REPO_WORKSPACE_MODE", ("worktree", "shared", "clone"), "worktree"
+        ),
+        "repo_mirror_filter": _env_str("REPO_MIRROR_FILTER", ""),
+        "repo_prefetch_workers": _env_int("REPO_PREFETCH_WORKERS", 2),
         "claude_cmd": _env_str("CLAUDE_CMD", "claude"),
         "claude_skills_root": _env_str("CLAUDE_SKILLS_ROOT", "claude-skills"),
         "claude_model_fallbacks": _env_csv(
             "CLAUDE_MODEL_FALLBACKS", "sonnet,haiku,opus"
         ),
         "claude_retry_delay_seconds": _env_int("CLAUDE_RETRY_DELAY_SECONDS", 2),
+        "claude_output_mode": _env_choice(
+            "CLAUDE_OUTPUT_MODE", ("stream", "text"), "stream"
+        ),
+        "claude_stall_timeout": _env_int("CLAUDE_STALL_TIMEOUT", 180),
+        "claude_hedge_percentile": _env_int("CLAUDE_HEDGE_PERCENTILE", 0),
+        "claude_hedge_delay_seconds": _env_int("CLAUDE_HEDGE_DELAY_SECONDS", 120),
+        "claude_breaker_failures": _env_int("CLAUDE_BREAKER_FAILURES", 3),
+        "claude_breaker_cooldown_seconds": _env_int("CLAUDE_BREAKER_COOLDOWN_SECONDS", 300),
+        "claude_rlimit_as_mb": _env_int("CLAUDE_RLIMIT_AS_MB", 0),
+        "claude_rlimit_cpu_seconds": _env_int("CLAUDE_RLIMIT_CPU_SECONDS", 0),
+        "claude_rlimit_nofile": _env_int("CLAUDE_RLIMIT_NOFILE", 0),
         "host": _env_str("HOST", "0.0.0.0"),
         "port": _env_int("PORT", 5000),
         "review_timeout": _env_int("REVIEW_TIMEOUT", 600),
         "review_queue_max": _env_int("REVIEW_QUEUE_MAX", 100),
+        "review_queue_db": _env_str("REVIEW_QUEUE_DB", "review-queue.db"),
+        "review_queue_backend": _env_choice(
+            "REVIEW_QUEUE_BACKEND", ("local", "shared"), "local"
+        ),
+        "review_queue_socket": _env_str("REVIEW_QUEUE_SOCKET", ""),
+        "review_node_id": _env_str("REVIEW_NODE_ID", ""),
+        "review_lease_seconds": _env_int("REVIEW_LEASE_SECONDS", 60),
         "review_workers": _env_int("REVIEW_WORKERS", 3),
+        "review_workers_min": _env_int("REVIEW_WORKERS_MIN", 0),
+        "review_latency_target_seconds": _env_int("REVIEW_LATENCY_TARGET_SECONDS", 0),
+        "review_chunk_tokens": _env_int("REVIEW_CHUNK_TOKENS", 30000),
+        "review_chunk_concurrency": _env_int("REVIEW_CHUNK_CONCURRENCY", 3),
+        "review_diff_include": _env_csv("REVIEW_DIFF_INCLUDE", ""),
+        "review_diff_exclude": _env_csv("REVIEW_DIFF_EXCLUDE", _DEFAULT_DIFF_EXCLUDE),
+        "review_diff_max_file_bytes": _env_int("REVIEW_DIFF_MAX_FILE_BYTES", 200000),
+        "review_diff_project_rules": _env_diff_project_rules("REVIEW_DIFF_PROJECT_RULES"),
+        "review_cache_db": _env_str("REVIEW_CACHE_DB", "review-cache.db"),
+        "review_cache_ttl_seconds": _env_int("REVIEW_CACHE_TTL_SECONDS", 604800),
+        "review_cache_max_entries": _env_int("REVIEW_CACHE_MAX_ENTRIES", 1000),
         "review_project_max_concurrency": _env_int(
             "REVIEW_PROJECT_MAX_CONCURRENCY", 2
         ),
+        "review_mr_priority": _env_int("REVIEW_MR_PRIORITY", 0),
+        "review_push_priority": _env_int("REVIEW_PUSH_PRIORITY", 1),
+        "review_priority_aging_seconds": _env_int("REVIEW_PRIORITY_AGING_SECONDS", 600),
+        "review_sjf_seconds_per_file": _env_int("REVIEW_SJF_SECONDS_PER_FILE", 0),
+        "review_project_scheduling": _env_json_object("REVIEW_PROJECT_SCHEDULING"),
         "api_timeout": _env_int("API_TIMEOUT", 10),
+        "gitlab_api_retries": _env_int("GITLAB_API_RETRIES", 3),
+        "gitlab_api_rate_limit": _env_int("GITLAB_API_RATE_LIMIT", 10),
+        "gitlab_api_pool_size": _env_int("GITLAB_API_POOL_SIZE", 10),
         "log_file": _env_str("LOG_FILE", ""),
+        "metrics_token": _env_str("METRICS_TOKEN", ""),
+        "trace_jsonl_path": _env_str("TRACE_JSONL_PATH", ""),
+        "trace_otlp_endpoint": _env_str("TRACE_OTLP_ENDPOINT", ""),
+        "trace_otlp_headers": _env_json_object("TRACE_OTLP_HEADERS"),
     }
+
+
+_config_lock = threading.Lock()
+_config: Config | None = None
+_reload_listeners: list[Callable[[Config], None]] = []
+
+
+def get_config() -> Config:
+    """Return the cached read-only config, loading it on first use."""
+    global _config
+    snapshot = _config
+    if snapshot is not None:
+        return snapshot
+    with _config_lock:
+        if _config is None:
+            _config = MappingProxyType(_load_config())
+        return _config
+
+
+def add_reload_listener(listener: Callable[[Config], None]) -> None:
+    """Register a callback that receives the new config after each reload."""
+    with _config_lock:
+        _reload_listeners.append(listener)
+
+
+def reload_config() -> Config:
+    """
+    Re-read .env and the environment, swap the snapshot and notify listeners.
+    Values from .env override the current environment on reload.
+    """
+    global _config
+    load_dotenv(_DOTENV_PATH, override=True)
+    snapshot = MappingProxyType(_load_config())
+    with _config_lock:
+        _config = snapshot
+        listeners = list(_reload_listeners)
+    logger.info("[config] reloaded")
+    for listener in listeners:
+        try:
+            listener(snapshot)
+        except Exception:
+            logger.exception("[config] reload listener failed")
+    return snapshot
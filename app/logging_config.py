@@ -0,0 +1,35 @@
+"""Logging setup shared by the web service and the worker daemon."""
+
+import logging
+import logging.handlers
+import os
+
+_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+_DATEFMT = "%Y-%m-%d %H:%M:%S"
+
+
+def setup_logging(log_file: str = "") -> None:
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    formatter = logging.Formatter(_FORMAT, datefmt=_DATEFMT)
+
+    # Console handler for docker logs
+    if not any(isinstance(h, logging.StreamHandler) for h in root.handlers):
+        sh = logging.StreamHandler()
+        sh.setFormatter(formatter)
+        root.addHandler(sh)
+
+    # Optional rotating file handler
+    if log_file:
+        log_dir = os.path.dirname(log_file)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+        # 30MB per file, keep 3 backups
+        fh = logging.handlers.RotatingFileHandler(
+            log_file,
+            maxBytes=30 * 1024 * 1024,
+            backupCount=3,
+            encoding="utf-8",
+        )
+        fh.setFormatter(formatter)
+        root.addHandler(fh)
@@ -5,52 +5,50 @@ Accepts GitLab webhooks (Merge Request or Push), runs local Claude Code for
 review, and posts results back to GitLab.
 """
 
+import asyncio
 import logging
-import logging.handlers
-import os
+import signal
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 
 import uvicorn
 from fastapi import FastAPI
 
-from app.config import get_config
+from app.config import get_config, reload_config
+from app.logging_config import setup_logging
 from app.routers import webhook
+from app.services import webhook as webhook_service
 
-_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
-_DATEFMT = "%Y-%m-%d %H:%M:%S"
-
-
-def _setup_logging(log_file: str = "") -> None:
-    root = logging.getLogger()
-    root.setLevel(logging.INFO)
-    formatter = logging.Formatter(_FORMAT, datefmt=_DATEFMT)
-
-    # Console handler for docker logs
-    if not any(isinstance(h, logging.StreamHandler) for h in root.handlers):
-        sh = logging.StreamHandler()
-        sh.setFormatter(formatter)
-        root.addHandler(sh)
-
-    # Optional rotating file handler
-    if log_file:
-        log_dir = os.path.dirname(log_file)
-        if log_dir:
-            os.makedirs(log_dir, exist_ok=True)
-        # 30MB per file, keep 3 backups
-        fh = logging.handlers.RotatingFileHandler(
-            log_file,
-            maxBytes=30 * 1024 * 1024,
-            backupCount=3,
-            encoding="utf-8",
+setup_logging(get_config().get("log_file", ""))
+
+
+def _install_reload_signal() -> None:
+    """Reload config on SIGHUP in a worker thread; listeners may block."""
+    if not hasattr(signal, "SIGHUP"):
+        return
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(
+            signal.SIGHUP, lambda: loop.run_in_executor(None, reload_config)
         )
-        fh.setFormatter(formatter)
-        root.addHandler(fh)
+    except (NotImplementedError, RuntimeError):
+        # Not in the main thread (e.g. test clients); /admin/reload still works
+        logging.getLogger(__name__).info("SIGHUP reload not available")
+
 
+@asynccontextmanager
+async def _lifespan(_: FastAPI) -> AsyncIterator[None]:
+    # Recover persisted tasks before accepting new webhooks
+    webhook_service.start_review_queue()
+    _install_reload_signal()
+    yield
+    webhook_service.stop_review_queue()
 
-_setup_logging(get_config().get("log_file", ""))
 
 app = FastAPI(
     title="code-review-bot",
     description="GitLab AI code review via Claude Code",
+    lifespan=_lifespan,
 )
 
 app.include_router(webhook.router, tags=["webhook"])
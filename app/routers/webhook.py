@@ -1,18 +1,24 @@
-"""Webhook routes: /webhook, /health."""
+"""Webhook routes: /webhook, /health, /metrics, /admin/reload, /admin/status."""
 
 import hmac
 import logging
 
 from fastapi import APIRouter, Request
-from fastapi.responses import PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse
 
-from app.config import get_config
+from app.config import get_config, reload_config
+from app.services import queue_ipc
 from app.services import webhook as webhook_service
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Enqueueing, reload, status and metrics may block on the worker daemon socket
+# or the shared queue's SQLite lock, so they run in the threadpool, never on
+# the event loop.
+
 
 def _authenticate_webhook(request: Request) -> PlainTextResponse | None:
     """Authenticate GitLab webhook requests using X-Gitlab-Token."""
@@ -58,7 +64,7 @@ async def webhook_handler(request: Request) -> PlainTextResponse:
 
     if object_kind == "push":
         logger.info("[Webhook] dispatching to push handler")
-        body, status = webhook_service.handle_push_webhook(data)
+        body, status = await run_in_threadpool(webhook_service.handle_push_webhook, data)
         return PlainTextResponse(content=body, status_code=status)
 
     if object_kind != "merge_request":
@@ -69,7 +75,7 @@ async def webhook_handler(request: Request) -> PlainTextResponse:
         )
 
     logger.info("[Webhook] dispatching to MR handler")
-    body, status = webhook_service.handle_mr_webhook(data)
+    body, status = await run_in_threadpool(webhook_service.handle_mr_webhook, data)
     return PlainTextResponse(content=body, status_code=status)
 
 
@@ -77,3 +83,41 @@ async def webhook_handler(request: Request) -> PlainTextResponse:
 async def health() -> dict:
     """Health check endpoint."""
     return {"status": "ok"}
+
+
+@router.get("/metrics")
+async def metrics_handler(request: Request) -> PlainTextResponse:
+    """Prometheus metrics; requires a bearer token only when METRICS_TOKEN is set."""
+    expected = get_config().get("metrics_token", "")
+    if expected:
+        actual = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(actual, f"Bearer {expected}"):
+            return PlainTextResponse(content="Unauthorized", status_code=401)
+
+    try:
+        body = await run_in_threadpool(webhook_service.render_metrics)
+    except queue_ipc.QueueUnavailable as exc:
+        logger.warning("[Metrics] worker daemon unavailable: %s", exc)
+        return PlainTextResponse(content="Review worker unavailable", status_code=503)
+    return PlainTextResponse(content=body, media_type="text/plain; version=0.0.4")
+
+
+@router.post("/admin/reload")
+async def reload_handler(request: Request) -> PlainTextResponse:
+    """Reload configuration; authenticated with the webhook secret."""
+    auth_response = _authenticate_webhook(request)
+    if auth_response is not None:
+        return auth_response
+
+    await run_in_threadpool(reload_config)
+    return PlainTextResponse(content="Config reloaded", status_code=200)
+
+
+@router.get("/admin/status", response_model=None)
+async def status_handler(request: Request) -> JSONResponse | PlainTextResponse:
+    """Queue depth and running review progress; authenticated with the webhook secret."""
+    auth_response = _authenticate_webhook(request)
+    if auth_response is not None:
+        return auth_response
+
+    return JSONResponse(content=await run_in_threadpool(webhook_service.review_status))
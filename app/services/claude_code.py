@@ -1,12 +1,24 @@
 """Claude Code integration: prepare git diff and run read-only review."""
 
+import json
 import logging
 import os
+import queue
 import re
 import shutil
 import subprocess
 import threading
 import time
+from collections import Counter, deque
+from collections.abc import Callable, Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from app.services import metrics, model_health, process, tracing
+from app.services.diff_chunks import split_diff
+from app.services.diff_filter import DiffFilter, drop_unreviewable
+from app.services.review_cache import ReviewCache, review_cache_key, skills_tree_hash
 
 logger = logging.getLogger(__name__)
 
@@ -15,9 +27,54 @@ _PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(
 _FALLBACK_NOTE_TEMPLATE = (
     "\n\n> 备注：主模型失败，本次使用备用模型 {model} 完成审查。"
 )
+_HEDGE_NOTE_TEMPLATE = (
+    "\n\n> 备注：主模型响应较慢，本次采用并行启动的备用模型 {model} 的审查结果。"
+)
 _DEFAULT_SKILLS_ROOT = "claude-skills"
+_STAGE_SECONDS = metrics.histogram(
+    "review_stage_seconds",
+    "Duration of review stages: mirror, diff, workspace and claude.",
+    ("stage",),
+)
+_CLAUDE_RUN_SECONDS = metrics.histogram(
+    "claude_run_seconds",
+    "Duration of single Claude Code runs by model and outcome (ok, error, timeout, cancelled).",
+    ("model", "outcome"),
+)
+_CLAUDE_FALLBACKS = metrics.counter(
+    "claude_fallbacks_total",
+    "Claude Code runs completed by a fallback model instead of the primary one.",
+    ("model",),
+)
+_CLAUDE_HEDGES = metrics.counter(
+    "claude_hedges_total",
+    "Fallback models started in parallel because the running model was slow.",
+    ("model",),
+)
+_SHA_RE = re.compile(r"[0-9a-f]{7,64}")
 _MIRROR_LOCKS: dict[str, threading.Lock] = {}
 _MIRROR_LOCKS_LOCK = threading.Lock()
+# Live task workspace paths per project, in every workspace mode; guarded by
+# the project's mirror lock
+_ACTIVE_WORKSPACES: dict[str, set[str]] = {}
+
+
+@dataclass
+class _MirrorFetchState:
+    """Single-flight bookkeeping for one project's mirror."""
+
+    # Branches wanted by tasks waiting on the mirror lock; guarded by _MIRROR_LOCKS_LOCK
+    wanted: Counter = field(default_factory=Counter)
+    # Branch -> monotonic start time of its last successful fetch; guarded by the mirror lock
+    fetched_at: dict[str, float] = field(default_factory=dict)
+    # Start time of the last clone or full fetch, which covers every branch
+    full_fetch_at: float = float("-inf")
+
+    def fresh_since(self, branch: str) -> float:
+        return max(self.full_fetch_at, self.fetched_at.get(branch, float("-inf")))
+
+
+_MIRROR_FETCH_STATES: dict[str, _MirrorFetchState] = {}
 
 
 def _redact(text: str, secrets: list[str]) -> str:
@@ -73,6 +130,13 @@ def _mirror_lock(project_id: object) -> threading.Lock:
         return _MIRROR_LOCKS.setdefault(key, threading.Lock())
 
 
+def _mirror_fetch_state(project_id: object) -> _MirrorFetchState:
+    """Return the per-project single-flight fetch state."""
+    key = str(project_id)
+    with _MIRROR_LOCKS_LOCK:
+        return _MIRROR_FETCH_STATES.setdefault(key, _MirrorFetchState())
+
+
 def _mirror_path(repo_workspace: str, project_id: object) -> str:
     """Return the bare mirror path for a project."""
     return _safe_child_path(repo_workspace, "mirrors", f"{_slug(project_id)}.git")
@@ -126,22 +190,100 @@ def _run_git(
     """Run a git command and return stdout; raise on failures."""
     safe_args = _redact(" ".join(args[:3]), secrets)
     logger.info("[git] running: git %s", safe_args)
-    result = subprocess.run(
-        ["git", *args],
-        cwd=cwd,
-        text=True,
-        encoding="utf-8",
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        timeout=timeout,
-        check=False,
-    )
+    with tracing.span(f"git {args[0]}", args=safe_args) as span:
+        result = process.run(
+            ["git", *args],
+            cwd=cwd,
+            text=True,
+            encoding="utf-8",
+            timeout=timeout,
+        )
+        span.set_attribute("exit_code", result.returncode)
     if result.returncode != 0:
         stderr = _redact(result.stderr or result.stdout or "Unknown git error", secrets)
         raise RuntimeError(f"git {' '.join(args[:2])} failed: {stderr.strip()}")
     return result.stdout or ""
 
 
+def _clone_mirror(
+    repo_url: str,
+    mirror_path: str,
+    *,
+    timeout: int,
+    secrets: list[str],
+    mirror_filter: str = "",
+) -> None:
+    """Create the bare mirror, optionally as a partial clone."""
+    args = ["clone", "--mirror"]
+    if mirror_filter:
+        args.append(f"--filter={mirror_filter}")
+    _run_git([*args, repo_url, mirror_path], timeout=timeout, secrets=secrets)
+
+
+def _missing_commits(
+    mirror_path: str,
+    shas: Sequence[str],
+    *,
+    timeout: int,
+    secrets: list[str],
+) -> list[str]:
+    """Return the SHAs that are not yet present as commits in the mirror."""
+    missing: list[str] = []
+    for sha in shas:
+        try:
+            _run_git(
+                ["cat-file", "-e", f"{sha}^{{commit}}"],
+                cwd=mirror_path,
+                timeout=timeout,
+                secrets=secrets,
+            )
+        except RuntimeError:
+            missing.append(sha)
+    return missing
+
+
+def _branch_refspecs(branches: Sequence[str]) -> list[str]:
+    return [f"+refs/heads/{branch}:refs/heads/{branch}" for branch in branches]
+
+
+def _fetch_mirror(
+    mirror_path: str,
+    project_id: object,
+    *,
+    branches: Sequence[str],
+    shas: Sequence[str],
+    timeout: int,
+    secrets: list[str],
+) -> None:
+    """Fetch the given branches, then any required SHAs still missing."""
+    if branches:
+        logger.info(
+            "[Mirror] fetching project_id=%s branches=%s",
+            project_id,
+            ",".join(branches),
+        )
+        _run_git(
+            ["fetch", "--no-tags", "origin", *_branch_refspecs(branches)],
+            cwd=mirror_path,
+            timeout=timeout,
+            secrets=secrets,
+        )
+
+    missing = _missing_commits(mirror_path, shas, timeout=timeout, secrets=secrets)
+    if missing:
+        logger.info(
+            "[Mirror] fetching pinned commits project_id=%s count=%s",
+            project_id,
+            len(missing),
+        )
+        _run_git(
+            ["fetch", "--no-tags", "origin", *missing],
+            cwd=mirror_path,
+            timeout=timeout,
+            secrets=secrets,
+        )
+
+
 def _prepare_mirror(
     repo_url: str,
     repo_workspace: str,
@@ -149,49 +291,178 @@ def _prepare_mirror(
     *,
     timeout: int,
     secrets: list[str],
+    fresh_branches: Sequence[str] = (),
+    hint_branches: Sequence[str] = (),
+    shas: Sequence[str] = (),
+    mirror_filter: str = "",
+    requested_at: float | None = None,
 ) -> str:
-    """Clone or refresh the per-project bare mirror under a project lock."""
+    """
+    Clone or refresh the per-project bare mirror under a project lock.
+
+    Refreshes are narrowed and single-flight:
+    - fresh_branches must have been fetched at or after requested_at (the
+      task's enqueue time); a fetch by another task that started after that
+      point is reused instead of fetching again.
+    - hint_branches are only fetched when some of shas are missing.
+    - whoever fetches also takes the branches wanted by tasks waiting on the
+      lock, so a burst of tasks for one project shares one fetch.
+    A failed narrow fetch falls back to a full fetch, then to a reclone.
+    """
     mirror_path = _mirror_path(repo_workspace, project_id)
     os.makedirs(os.path.dirname(mirror_path), exist_ok=True)
+    if requested_at is None:
+        requested_at = time.monotonic()
 
-    with _mirror_lock(project_id):
-        if not os.path.isdir(mirror_path):
-            if os.path.exists(mirror_path):
-                shutil.rmtree(mirror_path)
-            logger.info("[Mirror] cloning project_id=%s", project_id)
-            _run_git(
-                ["clone", "--mirror", repo_url, mirror_path],
+    state = _mirror_fetch_state(project_id)
+    own_wants = list(dict.fromkeys([*fresh_branches, *hint_branches]))
+    with _MIRROR_LOCKS_LOCK:
+        state.wanted.update(own_wants)
+    try:
+        with _mirror_lock(project_id):
+            _refresh_mirror_locked(
+                repo_url,
+                mirror_path,
+                project_id,
+                state,
                 timeout=timeout,
                 secrets=secrets,
+                fresh_branches=fresh_branches,
+                hint_branches=hint_branches,
+                shas=shas,
+                mirror_filter=mirror_filter,
+                requested_at=requested_at,
             )
-            return mirror_path
+    finally:
+        with _MIRROR_LOCKS_LOCK:
+            state.wanted.subtract(own_wants)
+            state.wanted += Counter()
 
-        logger.info("[Mirror] fetching project_id=%s", project_id)
+    return mirror_path
+
+
+def _refresh_mirror_locked(
+    repo_url: str,
+    mirror_path: str,
+    project_id: object,
+    state: _MirrorFetchState,
+    *,
+    timeout: int,
+    secrets: list[str],
+    fresh_branches: Sequence[str],
+    hint_branches: Sequence[str],
+    shas: Sequence[str],
+    mirror_filter: str,
+    requested_at: float,
+) -> None:
+    """Bring the mirror up to date for one task; caller holds the mirror lock."""
+    started_at = time.monotonic()
+    if not os.path.isdir(mirror_path):
+        if os.path.exists(mirror_path):
+            shutil.rmtree(mirror_path)
+        logger.info("[Mirror] cloning project_id=%s", project_id)
+        _clone_mirror(
+            repo_url,
+            mirror_path,
+            timeout=timeout,
+            secrets=secrets,
+            mirror_filter=mirror_filter,
+        )
+        state.full_fetch_at = started_at
+        return
+
+    stale = [
+        branch
+        for branch in fresh_branches
+        if state.fresh_since(branch) < requested_at
+    ]
+    missing = _missing_commits(mirror_path, shas, timeout=timeout, secrets=secrets)
+    if not stale and not missing:
+        logger.info("[Mirror] up to date, skip fetch project_id=%s", project_id)
+        return
+
+    with _MIRROR_LOCKS_LOCK:
+        waiting = [branch for branch, count in state.wanted.items() if count > 0]
+    branches = list(dict.fromkeys([
+        *stale,
+        *(hint_branches if missing else []),
+        *waiting,
+    ]))
+
+    try:
+        _run_git(
+            ["remote", "set-url", "origin", repo_url],
+            cwd=mirror_path,
+            timeout=timeout,
+            secrets=secrets,
+        )
         try:
-            _run_git(
-                ["remote", "set-url", "origin", repo_url],
-                cwd=mirror_path,
+            _fetch_mirror(
+                mirror_path,
+                project_id,
+                branches=branches,
+                shas=missing,
                 timeout=timeout,
                 secrets=secrets,
             )
+        except RuntimeError:
+            logger.warning(
+                "[Mirror] narrow fetch failed, fetching all refs project_id=%s",
+                project_id,
+            )
             _run_git(
                 ["fetch", "origin", "--prune"],
                 cwd=mirror_path,
                 timeout=timeout,
                 secrets=secrets,
             )
-        except subprocess.TimeoutExpired:
-            raise
-        except Exception:
-            logger.warning("[Mirror] refresh failed, recloning project_id=%s", project_id)
-            shutil.rmtree(mirror_path, ignore_errors=True)
-            _run_git(
-                ["clone", "--mirror", repo_url, mirror_path],
-                timeout=timeout,
-                secrets=secrets,
+            state.full_fetch_at = started_at
+    except subprocess.TimeoutExpired:
+        raise
+    except Exception:
+        if _ACTIVE_WORKSPACES.get(str(project_id)):
+            # Worktrees and --shared clones use the mirror's object store, and
+            # a clone in progress reads it: recloning would pull it out from under them
+            logger.warning(
+                "[Mirror] refresh failed with live workspaces project_id=%s",
+                project_id,
             )
+            raise
+        logger.warning("[Mirror] refresh failed, recloning project_id=%s", project_id)
+        shutil.rmtree(mirror_path, ignore_errors=True)
+        _clone_mirror(
+            repo_url,
+            mirror_path,
+            timeout=timeout,
+            secrets=secrets,
+            mirror_filter=mirror_filter,
+        )
+        state.full_fetch_at = started_at
+        return
 
-    return mirror_path
+    for branch in branches:
+        state.fetched_at[branch] = started_at
+
+
+def _is_sha(ref: str) -> bool:
+    """Return whether ref is a usable (non-zero) full or abbreviated SHA."""
+    return bool(_SHA_RE.fullmatch(ref)) and set(ref) != {"0"}
+
+
+def _resolve_commit(
+    mirror_path: str,
+    ref: str,
+    *,
+    timeout: int,
+    secrets: list[str],
+) -> str:
+    """Resolve a branch ref or SHA in the mirror to a full commit SHA."""
+    return _run_git(
+        ["rev-parse", "--verify", f"{ref}^{{commit}}"],
+        cwd=mirror_path,
+        timeout=timeout,
+        secrets=secrets,
+    ).strip()
 
 
 def _prepare_task_workspace(
@@ -200,43 +471,218 @@ def _prepare_task_workspace(
     project_id: object,
     workspace_key: str,
     checkout_branch: str,
+    head_sha: str,
     *,
     timeout: int,
     secrets: list[str],
+    mode: str = "worktree",
 ) -> str:
-    """Create an isolated workspace for one review task and checkout branch."""
+    """
+    Create an isolated workspace for one review task at head_sha.
+
+    worktree: `git worktree add --detach` on the bare mirror, no objects copied.
+    shared: `git clone --shared`, borrowing mirror objects via alternates.
+    clone: full local clone (previous behaviour).
+    """
     workspace_path = _task_workspace_path(repo_workspace, project_id, workspace_key)
     if os.path.exists(workspace_path):
-        shutil.rmtree(workspace_path)
+        _remove_task_workspace(
+            mirror_path,
+            workspace_path,
+            project_id,
+            timeout=timeout,
+            secrets=secrets,
+            mode=mode,
+        )
     os.makedirs(os.path.dirname(workspace_path), exist_ok=True)
 
+    if mode == "worktree":
+        with _mirror_lock(project_id):
+            # Drop registrations whose directories are already gone
+            _run_git(
+                ["worktree", "prune"],
+                cwd=mirror_path,
+                timeout=timeout,
+                secrets=secrets,
+            )
+            try:
+                _run_git(
+                    ["worktree", "add", "--detach", workspace_path, head_sha],
+                    cwd=mirror_path,
+                    timeout=timeout,
+                    secrets=secrets,
+                )
+            except Exception:
+                shutil.rmtree(workspace_path, ignore_errors=True)
+                _run_git(
+                    ["worktree", "prune"],
+                    cwd=mirror_path,
+                    timeout=timeout,
+                    secrets=secrets,
+                )
+                raise
+            _ACTIVE_WORKSPACES.setdefault(str(project_id), set()).add(workspace_path)
+        return workspace_path
+
+    clone_args = ["clone", "--no-checkout"]
+    if mode == "shared":
+        clone_args.append("--shared")
+    with _mirror_lock(project_id):
+        _ACTIVE_WORKSPACES.setdefault(str(project_id), set()).add(workspace_path)
     try:
         _run_git(
-            ["clone", "--no-checkout", mirror_path, workspace_path],
+            [*clone_args, mirror_path, workspace_path],
             timeout=timeout,
             secrets=secrets,
         )
         _run_git(
-            ["checkout", "--force", "-B", checkout_branch, f"origin/{checkout_branch}"],
+            ["checkout", "--force", "-B", checkout_branch, head_sha],
             cwd=workspace_path,
             timeout=timeout,
             secrets=secrets,
         )
     except Exception:
-        shutil.rmtree(workspace_path, ignore_errors=True)
+        _remove_task_workspace(
+            mirror_path,
+            workspace_path,
+            project_id,
+            timeout=timeout,
+            secrets=secrets,
+            mode=mode,
+        )
         raise
 
     return workspace_path
 
 
-def _git_diff(repo_path: str, diff_ref: str, *, timeout: int, secrets: list[str]) -> str:
+def _discard_live_workspace(project_id: object, workspace_path: str) -> None:
+    """Unregister a live workspace; the caller holds the project's mirror lock."""
+    live = _ACTIVE_WORKSPACES.get(str(project_id))
+    if live is not None:
+        live.discard(workspace_path)
+        if not live:
+            _ACTIVE_WORKSPACES.pop(str(project_id), None)
+
+
+def _remove_task_workspace(
+    mirror_path: str,
+    workspace_path: str,
+    project_id: object,
+    *,
+    timeout: int,
+    secrets: list[str],
+    mode: str = "worktree",
+) -> None:
+    """Remove a task workspace; never raises."""
+    if mode != "worktree":
+        shutil.rmtree(workspace_path, ignore_errors=True)
+        with _mirror_lock(project_id):
+            _discard_live_workspace(project_id, workspace_path)
+        return
+
+    with _mirror_lock(project_id):
+        _discard_live_workspace(project_id, workspace_path)
+        try:
+            _run_git(
+                ["worktree", "remove", "--force", workspace_path],
+                cwd=mirror_path,
+                timeout=timeout,
+                secrets=secrets,
+            )
+        except Exception:
+            # Unregistered or half-created worktree: delete and prune metadata
+            shutil.rmtree(workspace_path, ignore_errors=True)
+            try:
+                _run_git(
+                    ["worktree", "prune"],
+                    cwd=mirror_path,
+                    timeout=timeout,
+                    secrets=secrets,
+                )
+            except Exception:
+                logger.warning("[Workspace] worktree prune failed path=%s", workspace_path)
+
+
+def _git_diff(
+    repo_path: str,
+    diff_ref: str,
+    *,
+    timeout: int,
+    secrets: list[str],
+    pathspecs: Sequence[str] = (),
+) -> str:
     """Return a git diff for the supplied ref range."""
     return _run_git(
-        ["diff", "--no-color", diff_ref],
+        ["diff", "--no-color", diff_ref, "--", *pathspecs],
+        cwd=repo_path,
+        timeout=timeout,
+        secrets=secrets,
+    )
+
+
+def _git_changed_files(
+    repo_path: str,
+    diff_ref: str,
+    *,
+    timeout: int,
+    secrets: list[str],
+    pathspecs: Sequence[str] = (),
+) -> list[str]:
+    """Return the paths changed in the ref range."""
+    output = _run_git(
+        ["diff", "--name-only", "-z", diff_ref, "--", *pathspecs],
         cwd=repo_path,
         timeout=timeout,
         secrets=secrets,
     )
+    return [path for path in output.split("\0") if path]
+
+
+def _filtered_diff(
+    repo_path: str,
+    diff_ref: str,
+    diff_filter: DiffFilter | None,
+    *,
+    timeout: int,
+    secrets: list[str],
+) -> tuple[str, list[tuple[str, str]]]:
+    """
+    Return the diff to review and (path, reason) for every skipped file.
+
+    Path rules are applied by git pathspecs while the diff is produced;
+    binary and oversized file sections are dropped afterwards.
+    """
+    if diff_filter is None:
+        return _git_diff(repo_path, diff_ref, timeout=timeout, secrets=secrets), []
+
+    skipped: list[tuple[str, str]] = []
+    pathspecs = diff_filter.pathspecs()
+    if pathspecs:
+        kept = set(
+            _git_changed_files(
+                repo_path, diff_ref, timeout=timeout, secrets=secrets, pathspecs=pathspecs
+            )
+        )
+        skipped = [
+            (path, "匹配过滤规则")
+            for path in _git_changed_files(
+                repo_path, diff_ref, timeout=timeout, secrets=secrets
+            )
+            if path not in kept
+        ]
+    diff = _git_diff(
+        repo_path, diff_ref, timeout=timeout, secrets=secrets, pathspecs=pathspecs
+    )
+    diff, dropped = drop_unreviewable(diff, diff_filter.max_file_bytes)
+    return diff, skipped + dropped
+
+
+def _skipped_files_context(skipped: Sequence[tuple[str, str]]) -> str:
+    """Describe files left out of the diff for the reviewer."""
+    if not skipped:
+        return ""
+    lines = "".join(f"- {path}（{reason}）\n" for path, reason in skipped)
+    return f"已跳过的文件（未包含在 diff 中，无需审查）：\n{lines}"
 
 
 def _review_prompt(review_context: str) -> str:
@@ -253,6 +699,140 @@ def _review_prompt(review_context: str) -> str:
     )
 
 
+def _merge_prompt(review_context: str) -> str:
+    """Build the prompt that merges per-chunk findings into one review."""
+    return (
+        "请使用 Claude Code 的 git-review skill 的输出格式和问题分级，"
+        "将 stdin 中同一次变更各部分的审查结果合并为一份完整的中文代码审查报告。\n"
+        "去除重复问题，保留每个问题对应的文件和行号，按严重程度重新整理；"
+        "不要重新审查代码，不要修改文件，不要运行 git 命令。\n\n"
+        f"{review_context}"
+    )
+
+
+def _review_stdin(review_context: str, diff: str) -> str:
+    """Build the Claude Code stdin for one diff (or diff chunk)."""
+    return (
+        f"{review_context}\n\n"
+        "以下是本次变更的 git diff：\n\n"
+        "```diff\n"
+        f"{diff or '(empty diff)'}\n"
+        "```\n"
+    )
+
+
+class _ClaudeTimeout(subprocess.TimeoutExpired):
+    """
+    Claude Code ran out of time; .output holds the review text produced so far.
+
+    Other timeouts (git, for example) may carry raw command output, so only
+    this type is marked as holding a partial review.
+    """
+
+    partial_review = True
+
+
+class _ClaudeStalled(_ClaudeTimeout):
+    """Claude Code produced no output for the stall timeout."""
+
+    def __str__(self) -> str:
+        return f"Claude Code stalled: no output for {self.timeout}s"
+
+
+class _ClaudeCancelled(RuntimeError):
+    """A hedged Claude Code run lost to another model and was killed."""
+
+
+class _ClaudeOutput:
+    """
+    Incremental reader of Claude Code print-mode output.
+
+    With stream-json, assistant text blocks are collected as they arrive and
+    the final "result" event wins; lines that are not JSON (text mode, or a
+    CLI that does not stream) are kept verbatim.
+    """
+
+    def __init__(self, stream_json: bool, on_progress: Callable[[str], None]) -> None:
+        self.stream_json = stream_json
+        self.on_progress = on_progress
+        self.texts: list[str] = []
+        self.raw: list[str] = []
+        self.result: str | None = None
+        self.error: str | None = None
+        self.tool_calls = 0
+
+    def feed(self, line: str) -> None:
+        event = None
+        if self.stream_json and line.strip():
+            try:
+                event = json.loads(line)
+            except ValueError:
+                event = None
+        if not isinstance(event, dict):
+            self.raw.append(line)
+            return
+
+        kind = event.get("type")
+        if kind == "assistant":
+            for block in (event.get("message") or {}).get("content") or []:
+                if not isinstance(block, dict):
+                    continue
+                if block.get("type") == "text":
+                    self.texts.append(block.get("text", ""))
+                elif block.get("type") == "tool_use":
+                    self.tool_calls += 1
+            self.on_progress(
+                f"claude running: {self.tool_calls} tool calls, "
+                f"{len(self.partial())} chars of review text"
+            )
+        elif kind == "result":
+            if event.get("is_error"):
+                self.error = str(event.get("result") or event.get("subtype") or "error")
+            else:
+                self.result = str(event.get("result") or "")
+
+    def partial(self) -> str:
+        """Return whatever review text has been produced so far."""
+        return ("\n\n".join(text for text in self.texts if text) or "".join(self.raw)).strip()
+
+    def text(self) -> str:
+        """Return the final review text."""
+        if self.result is not None and self.result.strip():
+            return self.result.strip()
+        return self.partial()
+
+
+def _pump_lines(pipe, sink: queue.SimpleQueue) -> None:
+    """Forward lines from a pipe to sink, then a None sentinel."""
+    try:
+        for line in pipe:
+            sink.put(line)
+    finally:
+        sink.put(None)
+
+
+def _drain_lines(sink: queue.SimpleQueue) -> str:
+    """Join the lines collected so far by _pump_lines."""
+    lines: list[str] = []
+    while True:
+        try:
+            line = sink.get_nowait()
+        except queue.Empty:
+            break
+        if line is None:
+            break
+        lines.append(line)
+    return "".join(lines)
+
+
+def _feed_stdin(pipe, content: str) -> None:
+    try:
+        pipe.write(content)
+        pipe.close()
+    except (BrokenPipeError, OSError):
+        pass
+
+
 def _run_claude_cmd(
     claude_cmd: str,
     prompt: str,
@@ -263,9 +843,24 @@ def _run_claude_cmd(
     secrets: list[str],
     skills_root: str = _DEFAULT_SKILLS_ROOT,
     model: str = "",
+    output_mode: str = "stream",
+    stall_timeout: int = 0,
+    on_progress: Callable[[str], None] | None = None,
+    limits: process.ProcessLimits | None = None,
+    cancel: threading.Event | None = None,
 ) -> str:
-    """Run Claude Code in print mode and return review text."""
+    """
+    Run Claude Code in print mode and return review text.
+
+    Output is read incrementally. In "stream" mode (stream-json) a run that
+    produces no output for stall_timeout seconds is killed early; on either
+    timeout the text produced so far is attached to the raised
+    TimeoutExpired as .output. The CLI runs in its own process group under
+    limits, and the whole group is killed on timeout, on cancellation of the
+    calling thread, or when cancel is set.
+    """
     resolved_skills_root = _validate_claude_skills(skills_root)
+    stream_json = output_mode == "stream"
     cmd = [claude_cmd, "--add-dir", resolved_skills_root]
     if model:
         cmd.extend(["--model", model])
@@ -273,41 +868,108 @@ def _run_claude_cmd(
         "-p",
         prompt,
         "--output-format",
-        "text",
+        "stream-json" if stream_json else "text",
         "--no-session-persistence",
         "--permission-mode",
         "dontAsk",
         "--tools",
         _CLAUDE_TOOLS,
     ])
+    if stream_json:
+        # print mode only emits stream-json events with --verbose
+        cmd.append("--verbose")
     logger.info(
         "[claude] running: %s --add-dir %s%s -p ...",
         claude_cmd,
         resolved_skills_root,
         f" --model {model}" if model else "",
     )
-    result = subprocess.run(
+    report = on_progress or (lambda _message: None)
+    report(f"claude starting ({_model_label(model)})")
+    output = _ClaudeOutput(stream_json, report)
+    proc = process.popen(
         cmd,
-        input=stdin_content,
+        limits=limits,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
         cwd=repo_path,
         text=True,
         encoding="utf-8",
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        timeout=timeout,
-        check=False,
         env=os.environ.copy(),
     )
-    stdout = result.stdout or ""
-    stderr = result.stderr or ""
-    if result.returncode != 0:
-        detail = _redact(stderr or stdout or "Unknown Claude Code error", secrets)
+    lines: queue.SimpleQueue = queue.SimpleQueue()
+    stderr_lines: queue.SimpleQueue = queue.SimpleQueue()
+    helpers = [
+        threading.Thread(target=_feed_stdin, args=(proc.stdin, stdin_content), daemon=True),
+        threading.Thread(target=_pump_lines, args=(proc.stdout, lines), daemon=True),
+        threading.Thread(target=_pump_lines, args=(proc.stderr, stderr_lines), daemon=True),
+    ]
+    for helper in helpers:
+        helper.start()
+
+    started = time.monotonic()
+    deadline = started + timeout
+    last_output = started
+    # Stall detection needs incremental events; text mode prints only at exit
+    stall = stall_timeout if stream_json and stall_timeout > 0 else 0
+    try:
+        while True:
+            now = time.monotonic()
+            wait = deadline - now
+            if stall:
+                wait = min(wait, last_output + stall - now)
+            if cancel is not None and cancel.is_set():
+                process.kill_tree(proc)
+                raise _ClaudeCancelled("Claude Code run cancelled")
+            if wait <= 0:
+                process.kill_tree(proc)
+                partial = output.partial()
+                if now >= deadline:
+                    logger.warning("[claude] timed out after %ss", timeout)
+                    raise _ClaudeTimeout(cmd[:1], timeout, output=partial)
+                logger.warning("[claude] stalled: no output for %ss, killed", stall)
+                raise _ClaudeStalled(cmd[:1], stall, output=partial)
+            try:
+                line = lines.get(timeout=min(wait, 0.5))
+            except queue.Empty:
+                if proc.poll() is not None:
+                    # Leader exited but helpers still hold stdout open
+                    process.reap_group(proc)
+                continue
+            if line is None:
+                break
+            last_output = time.monotonic()
+            output.feed(line)
+    except BaseException:
+        if proc.poll() is None:
+            process.kill_tree(proc)
+        raise
+
+    try:
+        # The CLI can close stdout and keep running; hold it to the same deadline
+        returncode = proc.wait(timeout=max(0, deadline - time.monotonic()))
+    except subprocess.TimeoutExpired:
+        process.kill_tree(proc)
+        logger.warning("[claude] timed out after %ss", timeout)
+        raise _ClaudeTimeout(cmd[:1], timeout, output=output.partial()) from None
+    process.reap_group(proc)
+    for helper in helpers:
+        helper.join(timeout=1)
+    stderr = _drain_lines(stderr_lines)
+    stdout = output.text()
+    tracing.current_span().set_attribute("exit_code", returncode)
+    if returncode != 0 or output.error is not None:
+        detail = _redact(
+            output.error or stderr or stdout or "Unknown Claude Code error", secrets
+        )
         raise RuntimeError(f"Claude Code failed: {detail.strip()}")
-    if not stdout.strip():
+    if not stdout:
         detail = _redact(stderr, secrets)
         raise RuntimeError(f"Claude Code returned empty output: {detail.strip()}")
+    tracing.current_span().set_attribute("output_chars", len(stdout))
     logger.info("[claude] done, output len=%s", len(stdout))
-    return stdout.strip()
+    return stdout
 
 
 def _model_label(model: str) -> str:
@@ -316,11 +978,167 @@ def _model_label(model: str) -> str:
 
 def _claude_error_detail(exc: Exception, secrets: list[str]) -> str:
     """Return a concise, redacted Claude execution failure detail."""
+    if isinstance(exc, _ClaudeStalled):
+        return f"stalled, no output for {exc.timeout}s"
     if isinstance(exc, subprocess.TimeoutExpired):
         return f"timed out after {exc.timeout}s"
     return _redact(str(exc), secrets)
 
 
+def _fallback_models(model_fallbacks: Sequence[str] | None) -> list[str]:
+    """Return the models to try in order; "" means Claude Code's default."""
+    models = [model.strip() for model in (model_fallbacks or []) if model.strip()]
+    return models or [""]
+
+
+@dataclass(frozen=True)
+class HedgePolicy:
+    """
+    When to start the next fallback model alongside a slow one.
+
+    The hedge delay for a model is the given percentile of its recent
+    successful run times, or default_delay until min_samples runs are known.
+    """
+
+    percentile: float = 95.0
+    default_delay: float = 120.0
+    min_samples: int = 10
+
+
+class _LatencyWindow:
+    """Recent successful Claude Code run durations per model."""
+
+    def __init__(self, size: int = 50) -> None:
+        self.size = size
+        self._samples: dict[str, deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.setdefault(model, deque(maxlen=self.size))
+            samples.append(seconds)
+
+    def percentile(self, model: str, pct: float, min_samples: int) -> float | None:
+        with self._lock:
+            samples = sorted(self._samples.get(model, ()))
+        if not samples or len(samples) < min_samples:
+            return None
+        rank = min(len(samples) - 1, max(0, round(pct / 100 * len(samples)) - 1))
+        return samples[rank]
+
+
+_MODEL_LATENCY = _LatencyWindow()
+
+
+def _hedge_delay(model: str, hedge: HedgePolicy) -> float:
+    observed = _MODEL_LATENCY.percentile(model, hedge.percentile, hedge.min_samples)
+    return hedge.default_delay if observed is None else observed
+
+
+def _all_models_failed(
+    failures: Sequence[str],
+    timeouts: Sequence[subprocess.TimeoutExpired],
+    attempts: int,
+) -> Exception:
+    """Return the error to raise after every model failed."""
+    if len(timeouts) == attempts:
+        logger.warning("[claude] all models timed out: %s", "; ".join(failures))
+        return max(timeouts, key=lambda exc: len(exc.output or ""))
+    return RuntimeError(
+        "Claude Code failed for all configured models: " + "; ".join(failures)
+    )
+
+
+def _run_claude_hedged(
+    models: Sequence[str],
+    run_model: Callable[[str, threading.Event, Callable[[str], None]], tuple[str, bool]],
+    *,
+    hedge: HedgePolicy,
+    secrets: list[str],
+    on_progress: Callable[[str], None],
+) -> tuple[str, bool]:
+    """
+    Run models with hedging: the first success wins.
+
+    The next model starts early when the running ones exceed the hedge delay,
+    or immediately when all running ones have failed. Losers are cancelled,
+    which kills their process groups.
+    """
+    outcomes: queue.SimpleQueue = queue.SimpleQueue()
+    cancels: list[threading.Event] = []
+
+    def _start(index: int) -> None:
+        cancel = threading.Event()
+        cancels.append(cancel)
+        label = _model_label(models[index])
+
+        def _attempt() -> None:
+            try:
+                result = run_model(
+                    models[index],
+                    cancel,
+                    lambda message: on_progress(f"{label}: {message}"),
+                )
+            except Exception as exc:
+                outcomes.put((index, None, exc))
+            else:
+                outcomes.put((index, result, None))
+
+        threading.Thread(
+            target=tracing.bind(_attempt), daemon=True, name=f"claude-hedge-{label}"
+        ).start()
+
+    failures: list[str] = []
+    timeouts: list[subprocess.TimeoutExpired] = []
+    _start(0)
+    running, next_index = 1, 1
+    hedge_at = time.monotonic() + _hedge_delay(models[0], hedge)
+    try:
+        while running:
+            try:
+                if next_index < len(models):
+                    outcome = outcomes.get(timeout=max(0.0, hedge_at - time.monotonic()))
+                else:
+                    outcome = outcomes.get()
+            except queue.Empty:
+                logger.info(
+                    "[claude] hedging: %s slower than %.0fs, starting %s in parallel",
+                    _model_label(models[next_index - 1]),
+                    _hedge_delay(models[next_index - 1], hedge),
+                    _model_label(models[next_index]),
+                )
+                _CLAUDE_HEDGES.inc(model=_model_label(models[next_index]))
+                _start(next_index)
+                running += 1
+                next_index += 1
+                hedge_at = time.monotonic() + _hedge_delay(models[next_index - 1], hedge)
+                continue
+
+            index, result, exc = outcome
+            running -= 1
+            if exc is None:
+                return result
+            if not isinstance(exc, (RuntimeError, subprocess.TimeoutExpired)):
+                raise exc
+            if isinstance(exc, subprocess.TimeoutExpired):
+                timeouts.append(exc)
+            detail = _claude_error_detail(exc, secrets)
+            failures.append(f"{_model_label(models[index])}: {detail}")
+            logger.warning(
+                "[claude] model %s failed: %s", _model_label(models[index]), detail
+            )
+            if running == 0 and next_index < len(models):
+                _start(next_index)
+                running += 1
+                next_index += 1
+                hedge_at = time.monotonic() + _hedge_delay(models[next_index - 1], hedge)
+    finally:
+        for cancel in cancels:
+            cancel.set()
+
+    raise _all_models_failed(failures, timeouts, len(models))
+
+
 def _run_claude_with_fallbacks(
     claude_cmd: str,
     prompt: str,
@@ -330,31 +1148,107 @@ def _run_claude_with_fallbacks(
     *,
     secrets: list[str],
     skills_root: str = _DEFAULT_SKILLS_ROOT,
-    model_fallbacks: list[str] | None = None,
+    model_fallbacks: Sequence[str] | None = None,
     retry_delay_seconds: int = 2,
-) -> str:
-    """Run Claude Code, retrying execution failures with fallback models."""
-    models = [model.strip() for model in (model_fallbacks or []) if model.strip()]
-    if not models:
-        models = [""]
+    output_mode: str = "stream",
+    stall_timeout: int = 0,
+    on_progress: Callable[[str], None] | None = None,
+    limits: process.ProcessLimits | None = None,
+    hedge: HedgePolicy | None = None,
+) -> tuple[str, bool]:
+    """
+    Run Claude Code, retrying execution failures with fallback models.
+
+    Returns the review text and whether the primary model produced it; a
+    fallback result carries a note and is not cached.
+
+    With a hedge policy, fallbacks also start in parallel once the running
+    model exceeds its latency percentile (see _run_claude_hedged).
+    Models whose circuit is open (see model_health) are skipped.
+    When every model timed out or stalled, the TimeoutExpired with the most
+    partial output is re-raised so the caller can still post it.
+    """
+    # Deployment errors must not count against the models' health
+    _validate_claude_skills(skills_root)
+    configured = _fallback_models(model_fallbacks)
+    health = model_health.get_model_health()
+    models = health.select(configured)
+    if models != configured:
+        logger.info(
+            "[claude] skipping models with open circuits: %s",
+            ", ".join(_model_label(model) for model in configured if model not in models),
+        )
+    report = on_progress or (lambda _message: None)
+    # Models that failed in this call; a fallback that wins while the primary
+    # is still running is a hedge win, not a failover
+    failed: set[str] = set(configured) - set(models)
+
+    def _run_model(
+        model: str,
+        cancel: threading.Event | None = None,
+        progress: Callable[[str], None] = report,
+    ) -> tuple[str, bool]:
+        started = time.monotonic()
+        try:
+            with tracing.span(
+                "claude.run",
+                model=_model_label(model),
+                fallback=model != configured[0],
+                stdin_bytes=len(stdin_content.encode("utf-8")),
+            ):
+                result = _run_claude_cmd(
+                    claude_cmd,
+                    prompt,
+                    stdin_content,
+                    repo_path,
+                    timeout,
+                    secrets=secrets,
+                    skills_root=skills_root,
+                    model=model,
+                    output_mode=output_mode,
+                    stall_timeout=stall_timeout,
+                    on_progress=progress,
+                    limits=limits,
+                    cancel=cancel,
+                )
+        except _ClaudeCancelled:
+            _CLAUDE_RUN_SECONDS.observe(
+                time.monotonic() - started, model=_model_label(model), outcome="cancelled"
+            )
+            raise
+        except (RuntimeError, subprocess.TimeoutExpired) as exc:
+            elapsed = time.monotonic() - started
+            timed_out = isinstance(exc, subprocess.TimeoutExpired)
+            _CLAUDE_RUN_SECONDS.observe(
+                elapsed, model=_model_label(model), outcome="timeout" if timed_out else "error"
+            )
+            health.record_failure(model, _claude_error_detail(exc, secrets), elapsed)
+            failed.add(model)
+            raise
+        elapsed = time.monotonic() - started
+        _CLAUDE_RUN_SECONDS.observe(elapsed, model=_model_label(model), outcome="ok")
+        _MODEL_LATENCY.record(model, elapsed)
+        health.record_success(model, elapsed)
+        if model != configured[0]:
+            _CLAUDE_FALLBACKS.inc(model=_model_label(model))
+            note = _FALLBACK_NOTE_TEMPLATE if configured[0] in failed else _HEDGE_NOTE_TEMPLATE
+            result += note.format(model=_model_label(model))
+            return result, False
+        return result, True
+
+    if hedge is not None and len(models) > 1:
+        return _run_claude_hedged(
+            models, _run_model, hedge=hedge, secrets=secrets, on_progress=report
+        )
 
     failures: list[str] = []
+    timeouts: list[subprocess.TimeoutExpired] = []
     for index, model in enumerate(models):
         try:
-            result = _run_claude_cmd(
-                claude_cmd,
-                prompt,
-                stdin_content,
-                repo_path,
-                timeout,
-                secrets=secrets,
-                skills_root=skills_root,
-                model=model,
-            )
-            if index > 0:
-                result += _FALLBACK_NOTE_TEMPLATE.format(model=_model_label(model))
-            return result
+            return _run_model(model)
         except (RuntimeError, subprocess.TimeoutExpired) as exc:
+            if isinstance(exc, subprocess.TimeoutExpired):
+                timeouts.append(exc)
             detail = _claude_error_detail(exc, secrets)
             failures.append(f"{_model_label(model)}: {detail}")
             if index == len(models) - 1:
@@ -370,10 +1264,131 @@ def _run_claude_with_fallbacks(
             if retry_delay_seconds > 0:
                 time.sleep(retry_delay_seconds)
 
-    raise RuntimeError(
-        "Claude Code failed for all configured models: " + "; ".join(failures)
+    raise _all_models_failed(failures, timeouts, len(models))
+
+
+def _run_chunked_review(
+    claude_cmd: str,
+    review_context: str,
+    chunks: Sequence[str],
+    repo_path: str,
+    timeout: int,
+    *,
+    secrets: list[str],
+    skills_root: str = _DEFAULT_SKILLS_ROOT,
+    model_fallbacks: Sequence[str] | None = None,
+    retry_delay_seconds: int = 2,
+    concurrency: int = 3,
+    output_mode: str = "stream",
+    stall_timeout: int = 0,
+    on_progress: Callable[[str], None] | None = None,
+    limits: process.ProcessLimits | None = None,
+    hedge: HedgePolicy | None = None,
+) -> tuple[str, bool]:
+    """
+    Review diff chunks in parallel, then merge the findings in one more pass.
+
+    Failed chunks are listed in the result instead of failing the review; if
+    the merge pass fails, the per-chunk findings are concatenated. The
+    returned flag is False for such partial results and whenever a fallback
+    model was used.
+    """
+    total = len(chunks)
+    logger.info(
+        "[claude] large diff split into %s chunks, concurrency=%s", total, concurrency
+    )
+    report = on_progress or (lambda _message: None)
+    run_kwargs = dict(
+        secrets=secrets,
+        skills_root=skills_root,
+        model_fallbacks=model_fallbacks,
+        retry_delay_seconds=retry_delay_seconds,
+        output_mode=output_mode,
+        stall_timeout=stall_timeout,
+        limits=limits,
+        hedge=hedge,
     )
 
+    def _review_chunk(index: int, chunk: str) -> tuple[str, bool]:
+        chunk_context = (
+            f"{review_context}"
+            f"分段审查：第 {index}/{total} 部分（仅包含本次变更的部分文件或 hunk）\n"
+        )
+        diff_bytes = len(chunk.encode("utf-8"))
+        with tracing.span("chunk", index=index, total=total, diff_bytes=diff_bytes):
+            return _run_claude_with_fallbacks(
+                claude_cmd,
+                _review_prompt(chunk_context),
+                _review_stdin(chunk_context, chunk),
+                repo_path,
+                timeout,
+                on_progress=lambda message: report(f"chunk {index}/{total}: {message}"),
+                **run_kwargs,
+            )
+
+    findings: list[str] = []
+    failures: list[str] = []
+    errors: list[Exception] = []
+    clean = True
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(concurrency, total)),
+        thread_name_prefix="review-chunk",
+    ) as pool:
+        futures = [
+            pool.submit(tracing.bind(_review_chunk), index, chunk)
+            for index, chunk in enumerate(chunks, start=1)
+        ]
+        for index, future in enumerate(futures, start=1):
+            try:
+                finding, chunk_clean = future.result()
+            except (RuntimeError, subprocess.TimeoutExpired) as exc:
+                errors.append(exc)
+                failures.append(f"第 {index} 部分：{_claude_error_detail(exc, secrets)}")
+            else:
+                findings.append(f"### 第 {index}/{total} 部分\n\n{finding}")
+                clean = clean and chunk_clean
+
+    if not findings:
+        if all(isinstance(exc, subprocess.TimeoutExpired) for exc in errors):
+            raise errors[0]
+        raise RuntimeError(
+            "Claude Code failed for all diff chunks: " + "; ".join(failures)
+        )
+
+    report(f"merging findings of {len(findings)}/{total} chunks")
+    merge_stdin = (
+        f"{review_context}\n\n"
+        "以下是各部分的审查结果：\n\n" + "\n\n".join(findings)
+    )
+    try:
+        with tracing.span("merge", chunks=len(findings)):
+            result, merge_clean = _run_claude_with_fallbacks(
+                claude_cmd,
+                _merge_prompt(review_context),
+                merge_stdin,
+                repo_path,
+                timeout,
+                on_progress=report,
+                **run_kwargs,
+            )
+    except (RuntimeError, subprocess.TimeoutExpired) as exc:
+        logger.warning(
+            "[claude] merge pass failed, concatenating chunk findings: %s",
+            _claude_error_detail(exc, secrets),
+        )
+        result, merge_clean = "\n\n".join(findings), False
+
+    if failures:
+        result += "\n\n> 备注：以下部分审查失败，未包含在结果中：" + "；".join(failures)
+    return result, clean and merge_clean and not failures
+
+
+@contextmanager
+def _stage(name: str, **attributes: object) -> Iterator[tracing.Span | tracing.NoopSpan]:
+    """Time a review stage in review_stage_seconds and as a trace span."""
+    with _STAGE_SECONDS.time(stage=name), tracing.span(name, **attributes) as span:
+        yield span
+
 
 def _run_review_common(
     *,
@@ -383,55 +1398,159 @@ def _run_review_common(
     repo_workspace: str,
     workspace_key: str,
     checkout_branch: str,
-    diff_ref: str,
+    base_ref: str,
+    head_ref: str,
+    merge_base: bool,
+    fresh_branches: Sequence[str] = (),
+    hint_branches: Sequence[str] = (),
     review_context: str,
     claude_cmd: str,
     timeout: int,
     secrets: list[str],
     skills_root: str = _DEFAULT_SKILLS_ROOT,
-    model_fallbacks: list[str] | None = None,
+    model_fallbacks: Sequence[str] | None = None,
     retry_delay_seconds: int = 2,
+    workspace_mode: str = "worktree",
+    mirror_filter: str = "",
+    requested_at: float | None = None,
+    review_cache: ReviewCache | None = None,
+    chunk_tokens: int = 0,
+    chunk_concurrency: int = 3,
+    diff_filter: DiffFilter | None = None,
+    output_mode: str = "stream",
+    stall_timeout: int = 0,
+    on_progress: Callable[[str], None] | None = None,
+    limits: process.ProcessLimits | None = None,
+    hedge: HedgePolicy | None = None,
 ) -> str:
-    """Prepare repository, collect diff, and run Claude Code review."""
+    """
+    Prepare repository, collect diff, and run Claude Code review.
+
+    base_ref/head_ref are branch refs or SHAs; they are pinned to commit SHAs
+    right after the mirror refresh so later fetches cannot shift the review.
+    merge_base selects a three-dot (MR) instead of a two-dot (push) diff.
+
+    The diff is taken from the mirror first so a review_cache hit (same
+    normalized diff, prompt template, models and skills tree) returns without
+    creating a workspace or running Claude Code. Diffs larger than
+    chunk_tokens (estimated) are reviewed in parallel chunks and merged.
+    diff_filter drops generated, vendored, binary and oversized files; the
+    skipped paths are listed in the review context. on_progress receives
+    stage and Claude Code progress messages.
+    """
+    report = on_progress or (lambda _message: None)
     os.makedirs(repo_workspace, exist_ok=True)
-    mirror_path = _prepare_mirror(
-        repo_url,
-        repo_workspace,
-        project_id or project_path,
-        timeout=timeout,
-        secrets=secrets,
-    )
-    repo_path = _prepare_task_workspace(
-        mirror_path,
-        repo_workspace,
-        project_id or project_path,
-        workspace_key or diff_ref,
-        checkout_branch,
-        timeout=timeout,
-        secrets=secrets,
-    )
-    try:
-        diff = _git_diff(repo_path, diff_ref, timeout=timeout, secrets=secrets)
-        stdin_content = (
-            f"{review_context}\n\n"
-            "以下是本次变更的 git diff：\n\n"
-            "```diff\n"
-            f"{diff or '(empty diff)'}\n"
-            "```\n"
+    project_key = project_id or project_path
+    report("refreshing mirror")
+    with _stage("mirror", project_id=project_key):
+        mirror_path = _prepare_mirror(
+            repo_url,
+            repo_workspace,
+            project_key,
+            timeout=timeout,
+            secrets=secrets,
+            fresh_branches=fresh_branches,
+            hint_branches=hint_branches,
+            shas=[ref for ref in (base_ref, head_ref) if _is_sha(ref)],
+            mirror_filter=mirror_filter,
+            requested_at=requested_at,
         )
-        return _run_claude_with_fallbacks(
-            claude_cmd,
-            _review_prompt(review_context),
-            stdin_content,
-            repo_path,
-            timeout,
+        head_sha = _resolve_commit(mirror_path, head_ref, timeout=timeout, secrets=secrets)
+        base_sha = _resolve_commit(mirror_path, base_ref, timeout=timeout, secrets=secrets)
+    diff_ref = f"{base_sha}{'...' if merge_base else '..'}{head_sha}"
+    report("collecting diff")
+    with _stage("diff", diff_ref=diff_ref) as span:
+        diff, skipped = _filtered_diff(
+            mirror_path, diff_ref, diff_filter, timeout=timeout, secrets=secrets
+        )
+        span.set_attributes(diff_bytes=len(diff.encode("utf-8")), skipped_files=len(skipped))
+    if skipped:
+        logger.info("[diff] skipped %s files by diff filter", len(skipped))
+        review_context += _skipped_files_context(skipped)
+
+    cache_key = ""
+    if review_cache is not None:
+        cache_key = review_cache_key(
+            project_id=project_key,
+            diff=diff,
+            prompt=_review_prompt(""),
+            models=_fallback_models(model_fallbacks),
+            skills_hash=skills_tree_hash(_validate_claude_skills(skills_root)),
+        )
+        cached = review_cache.get(cache_key)
+        tracing.current_span().set_attribute("cache_hit", cached is not None)
+        if cached is not None:
+            logger.info(
+                "[cache] review cache hit project_id=%s diff=%s",
+                project_key,
+                diff_ref,
+            )
+            return cached
+
+    report("preparing workspace")
+    with _stage("workspace", mode=workspace_mode):
+        repo_path = _prepare_task_workspace(
+            mirror_path,
+            repo_workspace,
+            project_key,
+            workspace_key or diff_ref,
+            checkout_branch,
+            head_sha,
+            timeout=timeout,
             secrets=secrets,
-            skills_root=skills_root,
-            model_fallbacks=model_fallbacks,
-            retry_delay_seconds=retry_delay_seconds,
+            mode=workspace_mode,
         )
+    try:
+        chunks = split_diff(diff, chunk_tokens)
+        with _stage("claude", chunks=len(chunks)):
+            if len(chunks) > 1:
+                result, clean = _run_chunked_review(
+                    claude_cmd,
+                    review_context,
+                    chunks,
+                    repo_path,
+                    timeout,
+                    secrets=secrets,
+                    skills_root=skills_root,
+                    model_fallbacks=model_fallbacks,
+                    retry_delay_seconds=retry_delay_seconds,
+                    concurrency=chunk_concurrency,
+                    output_mode=output_mode,
+                    stall_timeout=stall_timeout,
+                    on_progress=report,
+                    limits=limits,
+                    hedge=hedge,
+                )
+            else:
+                result, clean = _run_claude_with_fallbacks(
+                    claude_cmd,
+                    _review_prompt(review_context),
+                    _review_stdin(review_context, diff),
+                    repo_path,
+                    timeout,
+                    secrets=secrets,
+                    skills_root=skills_root,
+                    model_fallbacks=model_fallbacks,
+                    retry_delay_seconds=retry_delay_seconds,
+                    output_mode=output_mode,
+                    stall_timeout=stall_timeout,
+                    on_progress=report,
+                    limits=limits,
+                    hedge=hedge,
+                )
     finally:
-        shutil.rmtree(repo_path, ignore_errors=True)
+        _remove_task_workspace(
+            mirror_path,
+            repo_path,
+            project_key,
+            timeout=timeout,
+            secrets=secrets,
+            mode=workspace_mode,
+        )
+
+    if review_cache is not None and clean:
+        review_cache.put(cache_key, result)
+    return result
 
 
 def run_claude_review(
@@ -447,10 +1566,30 @@ def run_claude_review(
     timeout: int = 300,
     *,
     token: str = "",
-    model_fallbacks: list[str] | None = None,
+    model_fallbacks: Sequence[str] | None = None,
     retry_delay_seconds: int = 2,
+    workspace_mode: str = "worktree",
+    head_sha: str = "",
+    mirror_filter: str = "",
+    requested_at: float | None = None,
+    review_cache: ReviewCache | None = None,
+    chunk_tokens: int = 0,
+    chunk_concurrency: int = 3,
+    diff_filter: DiffFilter | None = None,
+    output_mode: str = "stream",
+    stall_timeout: int = 0,
+    on_progress: Callable[[str], None] | None = None,
+    limits: process.ProcessLimits | None = None,
+    hedge: HedgePolicy | None = None,
 ) -> str:
-    """Run Claude Code review for a merge request."""
+    """
+    Run Claude Code review for a merge request.
+
+    head_sha is the webhook's last_commit; when given, the review is pinned to
+    it and the source branch is only fetched if that commit is missing.
+    requested_at is the monotonic enqueue time; a mirror fetch started after
+    it by another task is reused.
+    """
     logger.info(
         "[MR Review] start source=%s target=%s path=%s",
         source_branch,
@@ -471,7 +1610,11 @@ def run_claude_review(
         repo_workspace=repo_workspace,
         workspace_key=workspace_key or f"mr-{source_branch}-{target_branch}",
         checkout_branch=source_branch,
-        diff_ref=f"origin/{target_branch}...origin/{source_branch}",
+        base_ref=f"refs/heads/{target_branch}",
+        head_ref=head_sha or f"refs/heads/{source_branch}",
+        merge_base=True,
+        fresh_branches=[target_branch] if head_sha else [target_branch, source_branch],
+        hint_branches=[source_branch] if head_sha else [],
         review_context=review_context,
         claude_cmd=claude_cmd,
         timeout=timeout,
@@ -479,6 +1622,18 @@ def run_claude_review(
         skills_root=skills_root,
         model_fallbacks=model_fallbacks,
         retry_delay_seconds=retry_delay_seconds,
+        workspace_mode=workspace_mode,
+        mirror_filter=mirror_filter,
+        requested_at=requested_at,
+        review_cache=review_cache,
+        chunk_tokens=chunk_tokens,
+        chunk_concurrency=chunk_concurrency,
+        diff_filter=diff_filter,
+        output_mode=output_mode,
+        stall_timeout=stall_timeout,
+        on_progress=on_progress,
+        limits=limits,
+        hedge=hedge,
     )
 
 
@@ -496,8 +1651,20 @@ def run_claude_review_push(
     timeout: int = 300,
     *,
     token: str = "",
-    model_fallbacks: list[str] | None = None,
+    model_fallbacks: Sequence[str] | None = None,
     retry_delay_seconds: int = 2,
+    workspace_mode: str = "worktree",
+    mirror_filter: str = "",
+    requested_at: float | None = None,
+    review_cache: ReviewCache | None = None,
+    chunk_tokens: int = 0,
+    chunk_concurrency: int = 3,
+    diff_filter: DiffFilter | None = None,
+    output_mode: str = "stream",
+    stall_timeout: int = 0,
+    on_progress: Callable[[str], None] | None = None,
+    limits: process.ProcessLimits | None = None,
+    hedge: HedgePolicy | None = None,
 ) -> str:
     """Run Claude Code review for a push commit range."""
     logger.info(
@@ -522,7 +1689,10 @@ def run_claude_review_push(
         repo_workspace=repo_workspace,
         workspace_key=workspace_key or f"push-{branch}-{after_sha[:12]}",
         checkout_branch=branch,
-        diff_ref=f"{before_sha}..{after_sha}",
+        base_ref=before_sha,
+        head_ref=after_sha,
+        merge_base=False,
+        hint_branches=[branch],
         review_context=review_context,
         claude_cmd=claude_cmd,
         timeout=timeout,
@@ -530,4 +1700,89 @@ def run_claude_review_push(
         skills_root=skills_root,
         model_fallbacks=model_fallbacks,
         retry_delay_seconds=retry_delay_seconds,
+        workspace_mode=workspace_mode,
+        mirror_filter=mirror_filter,
+        requested_at=requested_at,
+        review_cache=review_cache,
+        chunk_tokens=chunk_tokens,
+        chunk_concurrency=chunk_concurrency,
+        diff_filter=diff_filter,
+        output_mode=output_mode,
+        stall_timeout=stall_timeout,
+        on_progress=on_progress,
+        limits=limits,
+        hedge=hedge,
     )
+
+
+def prefetch_mirror(
+    repo_url: str,
+    repo_workspace: str,
+    project_id: object,
+    *,
+    fresh_branches: Sequence[str] = (),
+    hint_branches: Sequence[str] = (),
+    shas: Sequence[str] = (),
+    timeout: int = 300,
+    token: str = "",
+    mirror_filter: str = "",
+    requested_at: float | None = None,
+) -> None:
+    """
+    Warm the project mirror for a queued review.
+
+    Uses the same single-flight refresh as the review itself, so when the
+    worker later calls _prepare_mirror with the same requested_at it finds
+    the refs fresh and the commits present, and skips the fetch.
+    """
+    os.makedirs(repo_workspace, exist_ok=True)
+    _prepare_mirror(
+        repo_url,
+        repo_workspace,
+        project_id,
+        timeout=timeout,
+        secrets=[token, repo_url],
+        fresh_branches=fresh_branches,
+        hint_branches=hint_branches,
+        shas=[sha for sha in shas if _is_sha(sha)],
+        mirror_filter=mirror_filter,
+        requested_at=requested_at,
+    )
+
+
+def sweep_task_workspaces(repo_workspace: str, *, timeout: int = 60) -> int:
+    """
+    Remove task workspaces not owned by a live task; return how many.
+
+    Workspaces of a process killed mid-review (kill -9, OOM) are never
+    removed by _remove_task_workspace. Call before workers start; worktree
+    registrations of removed directories are pruned from their mirrors.
+    """
+    root = os.path.join(os.path.abspath(repo_workspace), "workspaces")
+    try:
+        project_dirs = sorted(os.listdir(root))
+    except OSError:
+        return 0
+    live = {path for paths in list(_ACTIVE_WORKSPACES.values()) for path in list(paths)}
+
+    removed = 0
+    for project_dir in project_dirs:
+        project_root = os.path.join(root, project_dir)
+        if not os.path.isdir(project_root):
+            continue
+        orphans = [
+            os.path.join(project_root, name)
+            for name in sorted(os.listdir(project_root))
+            if os.path.join(project_root, name) not in live
+        ]
+        for path in orphans:
+            logger.warning("[Workspace] removing orphaned workspace path=%s", path)
+            shutil.rmtree(path, ignore_errors=True)
+        removed += len(orphans)
+        mirror_path = _safe_child_path(repo_workspace, "mirrors", f"{project_dir}.git")
+        if orphans and os.path.isdir(mirror_path):
+            try:
+                _run_git(["worktree", "prune"], cwd=mirror_path, timeout=timeout, secrets=[])
+            except Exception:
+                logger.warning("[Workspace] worktree prune failed mirror=%s", mirror_path)
+    return removed
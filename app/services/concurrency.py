@@ -0,0 +1,49 @@
+"""AIMD concurrency limit driven by Claude Code run outcomes."""
+
+import time
+
+
+class AimdLimit:
+    """
+    Additive-increase / multiplicative-decrease concurrency limit.
+
+    Every successful run within latency_target raises the limit by
+    1/limit, so it grows by about one per "round" of runs. A failed run,
+    timeout or run slower than latency_target multiplies it by backoff.
+    Runs that started before the last decrease do not decrease it again:
+    they were already running at the old concurrency, and a burst of them
+    failing together is one congestion event. latency_target <= 0 ignores
+    latency.
+    """
+
+    def __init__(
+        self,
+        *,
+        initial: int,
+        minimum: int,
+        maximum: int,
+        latency_target: float = 0.0,
+        backoff: float = 0.5,
+    ) -> None:
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self._limit = float(min(self.maximum, max(self.minimum, initial)))
+        self._last_decrease = float("-inf")
+
+    @property
+    def value(self) -> int:
+        return int(self._limit)
+
+    def sample(self, *, ok: bool, seconds: float, now: float | None = None) -> int:
+        """Record one run and return the (possibly changed) limit."""
+        now = time.monotonic() if now is None else now
+        congested = not ok or (0 < self.latency_target < seconds)
+        if congested:
+            if now - seconds > self._last_decrease:
+                self._limit = max(self.minimum, self._limit * self.backoff)
+                self._last_decrease = now
+        else:
+            self._limit = min(self.maximum, self._limit + 1 / self._limit)
+        return self.value
@@ -0,0 +1,75 @@
+"""Split large git diffs into reviewable chunks."""
+
+import re
+
+# Rough size heuristic; diffs are mostly ASCII code, about 4 chars per token
+_CHARS_PER_TOKEN = 4
+_FILE_HEADER_RE = re.compile(r"^diff --git ", re.MULTILINE)
+_HUNK_RE = re.compile(r"^@@ ", re.MULTILINE)
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the model token count of text."""
+    return (len(text) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+
+
+def _split_at(text: str, pattern: re.Pattern) -> list[str]:
+    """Split text before every match of pattern, keeping any leading text."""
+    starts = [match.start() for match in pattern.finditer(text)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    return [text[start:end] for start, end in zip(starts, starts[1:] + [len(text)])]
+
+
+def split_files(diff: str) -> list[str]:
+    """Split a diff into per-file sections (any leading text is kept first)."""
+    return [part for part in _split_at(diff, _FILE_HEADER_RE) if part]
+
+
+def _split_file(file_diff: str, max_tokens: int) -> list[str]:
+    """Split one file's diff by hunk, repeating the file header in every piece."""
+    parts = _split_at(file_diff, _HUNK_RE)
+    header, hunks = parts[0], parts[1:]
+    if not hunks:
+        return [file_diff]
+
+    pieces: list[str] = []
+    current = ""
+    for hunk in hunks:
+        if current and estimate_tokens(header + current + hunk) > max_tokens:
+            pieces.append(header + current)
+            current = ""
+        current += hunk
+    pieces.append(header + current)
+    return pieces
+
+
+def split_diff(diff: str, max_tokens: int) -> list[str]:
+    """
+    Group a diff into chunks of at most max_tokens (estimated).
+
+    Whole files are packed together in diff order; a file larger than the
+    budget is split at hunk boundaries. A single hunk is never split, so a
+    chunk can exceed the budget when one hunk alone does. max_tokens <= 0
+    returns the diff as one chunk.
+    """
+    if max_tokens <= 0 or estimate_tokens(diff) <= max_tokens:
+        return [diff]
+
+    units: list[str] = []
+    for file_diff in split_files(diff):
+        if estimate_tokens(file_diff) > max_tokens:
+            units.extend(_split_file(file_diff, max_tokens))
+        else:
+            units.append(file_diff)
+
+    chunks: list[str] = []
+    current = ""
+    for unit in units:
+        if current and estimate_tokens(current + unit) > max_tokens:
+            chunks.append(current)
+            current = ""
+        current += unit
+    if current:
+        chunks.append(current)
+    return chunks
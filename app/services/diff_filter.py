@@ -0,0 +1,98 @@
+"""Path and size rules for the diff sent to Claude Code."""
+
+import re
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+
+from app.services.diff_chunks import split_files
+
+_FILE_PATH_RE = re.compile(r"^diff --git a/(.*?) b/", re.MULTILINE)
+_BINARY_RE = re.compile(r"^(Binary files .* differ|GIT binary patch)$", re.MULTILINE)
+
+
+@dataclass(frozen=True)
+class DiffFilter:
+    """
+    Which changed files are reviewed.
+
+    Patterns follow .gitignore conventions: a pattern without "/" matches at
+    any depth, a trailing "/" matches a whole directory, and a leading "/"
+    anchors to the repository root. An empty include list means all files.
+    max_file_bytes caps one file's diff; 0 disables the cap.
+    """
+
+    include: tuple[str, ...] = ()
+    exclude: tuple[str, ...] = ()
+    max_file_bytes: int = 0
+
+    def pathspecs(self) -> list[str]:
+        """Return git pathspecs (glob magic) implementing include/exclude."""
+        specs = [_glob_pathspec(pattern) for pattern in self.include]
+        specs.extend(
+            _glob_pathspec(pattern, exclude=True) for pattern in self.exclude
+        )
+        return specs
+
+
+def _glob_pathspec(pattern: str, *, exclude: bool = False) -> str:
+    anchored = "/" in pattern.strip("/") or pattern.startswith("/")
+    pattern = pattern.strip("/") + ("/**" if pattern.endswith("/") else "")
+    if not anchored:
+        pattern = f"**/{pattern}"
+    return f":({'exclude,glob' if exclude else 'glob'}){pattern}"
+
+
+def diff_filter_for_project(
+    *,
+    include: Sequence[str],
+    exclude: Sequence[str],
+    max_file_bytes: int,
+    project_rules: Mapping[str, Mapping],
+    project_keys: Sequence[object],
+) -> DiffFilter:
+    """
+    Build the filter for one project.
+
+    project_rules maps a project id or path to overrides; any of "include",
+    "exclude" and "max_file_bytes" given there replaces the global value.
+    The rules are validated when config loads (see app.config).
+    """
+    override: Mapping = {}
+    for key in project_keys:
+        if str(key) in project_rules:
+            override = project_rules[str(key)]
+            break
+    return DiffFilter(
+        include=_patterns(override.get("include", include)),
+        exclude=_patterns(override.get("exclude", exclude)),
+        max_file_bytes=int(override.get("max_file_bytes", max_file_bytes)),
+    )
+
+
+def _patterns(value: str | Sequence[str]) -> tuple[str, ...]:
+    """Accept a comma-separated string or a list of patterns."""
+    items = value.split(",") if isinstance(value, str) else value
+    return tuple(item.strip() for item in items if item and item.strip())
+
+
+def _file_path(section: str) -> str:
+    match = _FILE_PATH_RE.match(section)
+    return match.group(1) if match else section.split("\n", 1)[0]
+
+
+def drop_unreviewable(diff: str, max_file_bytes: int) -> tuple[str, list[tuple[str, str]]]:
+    """
+    Remove binary and oversized file sections from a diff.
+
+    Returns the remaining diff and (path, reason) for every dropped file.
+    """
+    kept: list[str] = []
+    skipped: list[tuple[str, str]] = []
+    for section in split_files(diff):
+        if _BINARY_RE.search(section):
+            skipped.append((_file_path(section), "二进制文件"))
+        elif max_file_bytes > 0 and len(section.encode("utf-8")) > max_file_bytes:
+            skipped.append((_file_path(section), f"diff 超过 {max_file_bytes} 字节"))
+        else:
+            kept.append(section)
+    return "".join(kept), skipped
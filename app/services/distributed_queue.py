@@ -0,0 +1,649 @@
+"""Review queue shared by several service replicas through one SQLite file."""
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+from app.services.review_queue import (
+    QUEUE_WAIT_SECONDS,
+    ReviewTask,
+    WorkerPool,
+    effective_class,
+    task_sort_key,
+)
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS shared_review_tasks (
+        task_id TEXT PRIMARY KEY,
+        project_id TEXT NOT NULL,
+        dedupe_key TEXT NOT NULL DEFAULT '',
+        review_type TEXT NOT NULL DEFAULT '',
+        payload TEXT NOT NULL,
+        priority INTEGER NOT NULL DEFAULT 0,
+        weight REAL NOT NULL DEFAULT 1,
+        size_hint INTEGER NOT NULL DEFAULT 0,
+        enqueued_at REAL NOT NULL,
+        state TEXT NOT NULL DEFAULT 'pending',
+        lease_owner TEXT NOT NULL DEFAULT '',
+        lease_id TEXT NOT NULL DEFAULT '',
+        lease_expires REAL NOT NULL DEFAULT 0,
+        started_at REAL NOT NULL DEFAULT 0,
+        attempts INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS shared_review_tasks_state "
+    "ON shared_review_tasks (state, project_id)",
+    "CREATE INDEX IF NOT EXISTS shared_review_tasks_dedupe "
+    "ON shared_review_tasks (dedupe_key, state)",
+    """
+    CREATE TABLE IF NOT EXISTS shared_review_vtime (
+        project_id TEXT PRIMARY KEY,
+        vtime REAL NOT NULL
+    )
+    """,
+)
+
+# Project id of the row holding the global virtual clock
+_CLOCK_ROW = ""
+
+
+def default_node_id() -> str:
+    """Return hostname-pid, unique per replica process."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class DistributedReviewQueue(WorkerPool):
+    """
+    Review queue whose state lives in a SQLite file shared by all replicas.
+
+    Any replica accepts webhooks and any replica's workers may run a task.
+    A worker claims a task in one write transaction that also enforces the
+    per-project concurrency limit and the priority / fair-share order of
+    ReviewQueue across every replica. A claim is a lease: the owning
+    replica renews it by heartbeat every lease_seconds / 3, and a lease
+    that expires (the replica died or hung) puts the task back to pending
+    for another replica, up to max_attempts claims. Finishing deletes the
+    row only while the lease is still held, so a task re-claimed elsewhere
+    is not dropped by a late original. Pending tasks with the same
+    dedupe_key supersede each other across replicas.
+
+    Tasks are stored as their payload and rebuilt with restore on the
+    replica that runs them. The file must live on storage every replica
+    can lock (a shared volume on one host, or a filesystem with reliable
+    POSIX locks); the rollback journal is used instead of WAL so it also
+    works where shared memory is not available.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        restore: Callable[[dict], ReviewTask | None],
+        node_id: str = "",
+        max_pending: int = 100,
+        worker_count: int = 3,
+        project_concurrency: int = 2,
+        min_workers: int = 0,
+        latency_target: float = 0.0,
+        aging_seconds: float = 600.0,
+        sjf_seconds_per_file: float = 0.0,
+        lease_seconds: float = 60.0,
+        max_attempts: int = 3,
+        poll_interval: float = 1.0,
+        start_workers: bool = True,
+    ) -> None:
+        super().__init__(
+            worker_count=worker_count,
+            min_workers=min_workers,
+            latency_target=latency_target,
+            start_workers=start_workers,
+        )
+        self.path = path
+        self.node_id = node_id or default_node_id()
+        self.max_pending = max(1, max_pending)
+        self.project_concurrency = max(1, project_concurrency)
+        self.aging_seconds = max(0.0, aging_seconds)
+        self.sjf_seconds_per_file = max(0.0, sjf_seconds_per_file)
+        self.lease_seconds = max(3.0, lease_seconds)
+        self.max_attempts = max(1, max_attempts)
+        self.poll_interval = max(0.05, poll_interval)
+        self._restore = restore
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=30.0, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=DELETE")
+        with self._transaction() as conn:
+            for statement in _SCHEMA:
+                conn.execute(statement)
+        # task_id -> (task, lease_id) for tasks running on this replica
+        self._running: dict[str, tuple[ReviewTask, str]] = {}
+        self._closed = threading.Event()
+        self._heartbeat = threading.Thread(
+            target=self._heartbeat_loop, daemon=True, name="review-lease-heartbeat"
+        )
+        self._heartbeat.start()
+        if self._start_workers:
+            with self._condition:
+                self._ensure_workers_locked()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run a write transaction; BEGIN IMMEDIATE serializes replicas."""
+        with self._db_lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        with self._db_lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    @property
+    def pending_count(self) -> int:
+        """Return queued-but-not-running task count across replicas."""
+        (count,) = self._query(
+            "SELECT COUNT(*) FROM shared_review_tasks WHERE state = 'pending'"
+        )[0]
+        return count
+
+    @property
+    def active_count(self) -> int:
+        """Return running task count across replicas."""
+        (count,) = self._query(
+            "SELECT COUNT(*) FROM shared_review_tasks WHERE state = 'running'"
+        )[0]
+        return count
+
+    def snapshot(self) -> dict:
+        """Return shared queue depth and running tasks of every replica."""
+        now = time.time()
+        rows = self._query(
+            "SELECT task_id, project_id, review_type, state, lease_owner, started_at, "
+            "priority, payload FROM shared_review_tasks"
+        )
+        pending_by_project: dict[str, int] = {}
+        active = []
+        with self._condition:
+            local = {task_id: task for task_id, (task, _lease) in self._running.items()}
+            workers = self._workers_snapshot_locked()
+        for task_id, project_id, review_type, state, owner, started_at, priority, payload in rows:
+            if state == "pending":
+                pending_by_project[project_id] = pending_by_project.get(project_id, 0) + 1
+                continue
+            task = local.get(task_id)
+            active.append(
+                {
+                    "task_id": task_id,
+                    "project_id": project_id,
+                    "review_type": review_type,
+                    "mr_iid": _payload_field(payload, "mr_iid"),
+                    "priority": priority,
+                    "node": owner,
+                    "running_seconds": round(now - started_at, 1),
+                    "progress": task.progress if task is not None else "",
+                }
+            )
+        return {
+            "node": self.node_id,
+            "pending": sum(pending_by_project.values()),
+            "pending_by_project": pending_by_project,
+            "active": active,
+            "workers": workers,
+        }
+
+    def set_limits(
+        self,
+        *,
+        max_pending: int,
+        worker_count: int,
+        project_concurrency: int,
+        min_workers: int = 0,
+        latency_target: float = 0.0,
+        aging_seconds: float = 600.0,
+        sjf_seconds_per_file: float = 0.0,
+    ) -> None:
+        """
+        Update this replica's limits and start or retire workers as needed.
+
+        Replicas should share the same max_pending, project_concurrency and
+        scheduling settings; each claim applies the claiming replica's.
+        """
+        with self._condition:
+            self.max_pending = max(1, max_pending)
+            self.worker_count = max(1, worker_count)
+            self.project_concurrency = max(1, project_concurrency)
+            self.aging_seconds = max(0.0, aging_seconds)
+            self.sjf_seconds_per_file = max(0.0, sjf_seconds_per_file)
+            self._configure_adaptive_locked(min_workers, latency_target)
+            if self._start_workers:
+                self._ensure_workers_locked()
+            self._condition.notify_all()
+
+    def try_enqueue(
+        self,
+        task: ReviewTask,
+        *,
+        on_accepted: Callable[[], None] | None = None,
+    ) -> bool:
+        """
+        Store a task if the shared queue has room; return False when full.
+
+        Pending tasks with the same dedupe_key are restored and absorbed
+        before the write transaction, which only runs SQL; on_accepted is
+        called after it commits.
+        """
+        absorbed: dict[str, ReviewTask | None] = {}
+        while True:
+            if task.dedupe_key:
+                for older_id, older_payload in self._query(
+                    "SELECT task_id, payload FROM shared_review_tasks "
+                    "WHERE dedupe_key = ? AND state = 'pending' ORDER BY enqueued_at",
+                    (task.dedupe_key,),
+                ):
+                    if older_id not in absorbed:
+                        older = self._restore_payload(older_id, older_payload)
+                        if older is not None:
+                            task.absorb(older)
+                        absorbed[older_id] = older
+
+            with self._transaction() as conn:
+                older_ids = []
+                if task.dedupe_key:
+                    older_ids = [
+                        older_id
+                        for (older_id,) in conn.execute(
+                            "SELECT task_id FROM shared_review_tasks "
+                            "WHERE dedupe_key = ? AND state = 'pending'",
+                            (task.dedupe_key,),
+                        )
+                    ]
+                if any(older_id not in absorbed for older_id in older_ids):
+                    # Another replica queued one since we looked; absorb it too
+                    continue
+                (pending,) = conn.execute(
+                    "SELECT COUNT(*) FROM shared_review_tasks WHERE state = 'pending'"
+                ).fetchone()
+                if pending - len(older_ids) >= self.max_pending:
+                    logger.warning(
+                        "[queue] shared queue full pending=%s max=%s project_id=%s",
+                        pending,
+                        self.max_pending,
+                        task.project_id,
+                    )
+                    return False
+
+                conn.executemany(
+                    "DELETE FROM shared_review_tasks WHERE task_id = ?",
+                    [(older_id,) for older_id in older_ids],
+                )
+                task.enqueued_at = time.time()
+                conn.execute(
+                    "INSERT INTO shared_review_tasks "
+                    "(task_id, project_id, dedupe_key, review_type, payload, "
+                    "priority, weight, size_hint, enqueued_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        task.task_id,
+                        str(task.project_id),
+                        task.dedupe_key,
+                        task.review_type,
+                        json.dumps(task.payload, ensure_ascii=False),
+                        task.priority,
+                        task.weight,
+                        task.size_hint,
+                        task.enqueued_at,
+                    ),
+                )
+            break
+
+        if on_accepted is not None:
+            try:
+                on_accepted()
+            except Exception:
+                logger.exception("failed to run review task acceptance callback")
+        with self._condition:
+            self._condition.notify_all()
+        # Rows a worker claimed in the meantime still run; only deleted ones are superseded
+        for older_id in older_ids:
+            older = absorbed[older_id]
+            if older is None:
+                continue
+            older.mark_superseded()
+            try:
+                older.report_superseded()
+            except Exception:
+                logger.exception("failed to report superseded review task")
+        return True
+
+    def recover(self, restore: Callable[[dict], ReviewTask | None] | None = None) -> int:
+        """
+        Release leases a previous process with this node_id still holds.
+
+        Other replicas' tasks are recovered by lease expiry instead. Returns
+        the number of tasks put back to pending.
+        """
+        if restore is not None:
+            self._restore = restore
+        with self._transaction() as conn:
+            released = conn.execute(
+                "UPDATE shared_review_tasks SET state = 'pending', lease_owner = '', "
+                "lease_id = '' WHERE state = 'running' AND lease_owner = ?",
+                (self.node_id,),
+            ).rowcount
+        if released:
+            logger.info("[queue] released %s leases of a previous run", released)
+            with self._condition:
+                self._condition.notify_all()
+        return released
+
+    def close(self) -> None:
+        """Stop heartbeats; leases of tasks still running here will expire."""
+        self._closed.set()
+
+    def wait_for_idle(self, timeout: float = 5.0) -> bool:
+        """Wait until the shared queue is empty and no tasks are running."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            (count,) = self._query("SELECT COUNT(*) FROM shared_review_tasks")[0]
+            if count == 0:
+                return True
+            time.sleep(0.05)
+        return False
+
+    def _restore_payload(self, task_id: str, payload: str) -> ReviewTask | None:
+        try:
+            task = self._restore(json.loads(payload))
+        except Exception:
+            logger.exception("[queue] failed to restore task_id=%s", task_id)
+            return None
+        if task is not None:
+            task.task_id = task_id
+        return task
+
+    def _worker(self) -> None:
+        logger.info("[queue] worker started node=%s", self.node_id)
+        while True:
+            with self._condition:
+                if self._retire_locked():
+                    logger.info("[queue] worker retired")
+                    return
+            try:
+                claimed = self._claim()
+            except sqlite3.Error:
+                logger.exception("[queue] claim failed")
+                claimed = None
+            if claimed is None:
+                with self._condition:
+                    self._condition.wait(self.poll_interval)
+                continue
+
+            task, lease_id = claimed
+            try:
+                task.run()
+            finally:
+                self._finish(task, lease_id)
+
+    def _claim(self) -> tuple[ReviewTask, str] | None:
+        """Lease the next runnable task, or return None when there is none."""
+        while True:
+            row = self._lease_next()
+            if row is None:
+                return None
+            task_id, payload, lease_id = row
+            task = self._restore_payload(task_id, payload)
+            if task is not None:
+                with self._condition:
+                    self._running[task_id] = (task, lease_id)
+                return task, lease_id
+            self._delete_leased(task_id, lease_id)
+
+    def _lease_next(self) -> tuple[str, str, str] | None:
+        now = time.time()
+        # Idle workers poll every poll_interval; only take the write lock
+        # when there is something to claim or expire
+        if not self._has_claimable(now):
+            return None
+        with self._transaction() as conn:
+            dropped = self._expire_leases(conn, now)
+            leased = self._lease_locked(conn, now)
+        for task_id, payload, attempts in dropped:
+            self._abandon(task_id, payload, attempts)
+        if leased is None:
+            return None
+        task_id, payload, lease_id, review_type, enqueued_at = leased
+        # Wall clock: the task may have been enqueued on another replica
+        QUEUE_WAIT_SECONDS.observe(max(0.0, now - enqueued_at), review_type=review_type)
+        return task_id, payload, lease_id
+
+    def _has_claimable(self, now: float) -> bool:
+        """Read-only check for a pending task under its project limit or an expired lease."""
+        (claimable,) = self._query(
+            "SELECT EXISTS (SELECT 1 FROM shared_review_tasks "
+            "WHERE state = 'running' AND lease_expires < ?) "
+            "OR EXISTS (SELECT 1 FROM shared_review_tasks AS pending "
+            "WHERE pending.state = 'pending' AND (SELECT COUNT(*) FROM shared_review_tasks "
+            "AS running WHERE running.state = 'running' "
+            "AND running.project_id = pending.project_id) < ?)",
+            (now, self.project_concurrency),
+        )[0]
+        return bool(claimable)
+
+    def _lease_locked(
+        self, conn: sqlite3.Connection, now: float
+    ) -> tuple[str, str, str, str, float] | None:
+        """Lease the next task inside the write transaction."""
+        running = dict(
+            conn.execute(
+                "SELECT project_id, COUNT(*) FROM shared_review_tasks "
+                "WHERE state = 'running' GROUP BY project_id"
+            ).fetchall()
+        )
+        heads: dict[str, tuple[tuple[int, float], str, float]] = {}
+        for task_id, project_id, priority, weight, size_hint, enqueued_at in conn.execute(
+            "SELECT task_id, project_id, priority, weight, size_hint, enqueued_at "
+            "FROM shared_review_tasks WHERE state = 'pending'"
+        ):
+            if running.get(project_id, 0) >= self.project_concurrency:
+                continue
+            key = task_sort_key(
+                priority,
+                enqueued_at,
+                size_hint,
+                aging_seconds=self.aging_seconds,
+                sjf_seconds_per_file=self.sjf_seconds_per_file,
+            )
+            if project_id not in heads or key < heads[project_id][0]:
+                heads[project_id] = (key, task_id, weight)
+        if not heads:
+            return None
+
+        vtimes = dict(conn.execute("SELECT project_id, vtime FROM shared_review_vtime"))
+        clock = vtimes.get(_CLOCK_ROW, 0.0)
+        _rank, project_id = min(
+            (
+                (
+                    effective_class(key, self.aging_seconds),
+                    max(vtimes.get(project_id, clock), clock),
+                    key,
+                ),
+                project_id,
+            )
+            for project_id, (key, _task_id, _weight) in heads.items()
+        )
+        _key, task_id, weight = heads[project_id]
+
+        # Start-time fair queuing: an idle project restarts at the clock
+        start = max(vtimes.get(project_id, clock), clock)
+        conn.executemany(
+            "INSERT OR REPLACE INTO shared_review_vtime (project_id, vtime) VALUES (?, ?)",
+            [(_CLOCK_ROW, start), (project_id, start + 1 / max(0.01, weight))],
+        )
+        conn.execute(
+            "DELETE FROM shared_review_vtime WHERE project_id != ? AND vtime <= ?",
+            (_CLOCK_ROW, start),
+        )
+
+        lease_id = uuid.uuid4().hex
+        conn.execute(
+            "UPDATE shared_review_tasks SET state = 'running', lease_owner = ?, "
+            "lease_id = ?, lease_expires = ?, started_at = ?, attempts = attempts + 1 "
+            "WHERE task_id = ?",
+            (self.node_id, lease_id, now + self.lease_seconds, now, task_id),
+        )
+        payload, review_type, enqueued_at = conn.execute(
+            "SELECT payload, review_type, enqueued_at FROM shared_review_tasks "
+            "WHERE task_id = ?",
+            (task_id,),
+        ).fetchone()
+        return task_id, payload, lease_id, review_type, enqueued_at
+
+    def _expire_leases(
+        self, conn: sqlite3.Connection, now: float
+    ) -> list[tuple[str, str, int]]:
+        """
+        Requeue tasks whose owner stopped renewing the lease.
+
+        Tasks out of attempts are deleted and returned as (task_id, payload,
+        attempts), to be reported failed once the transaction has committed.
+        """
+        expired = conn.execute(
+            "SELECT task_id, lease_owner, attempts, payload FROM shared_review_tasks "
+            "WHERE state = 'running' AND lease_expires < ?",
+            (now,),
+        ).fetchall()
+        dropped: list[tuple[str, str, int]] = []
+        for task_id, owner, attempts, payload in expired:
+            if attempts >= self.max_attempts:
+                logger.error(
+                    "[queue] dropping task_id=%s: lease of %s expired after %s attempts",
+                    task_id,
+                    owner,
+                    attempts,
+                )
+                conn.execute("DELETE FROM shared_review_tasks WHERE task_id = ?", (task_id,))
+                dropped.append((task_id, payload, attempts))
+                continue
+            logger.warning(
+                "[queue] lease of %s expired, requeueing task_id=%s", owner, task_id
+            )
+            conn.execute(
+                "UPDATE shared_review_tasks SET state = 'pending', lease_owner = '', "
+                "lease_id = '' WHERE task_id = ?",
+                (task_id,),
+            )
+        return dropped
+
+    def _abandon(self, task_id: str, payload: str, attempts: int) -> None:
+        """Report a dropped task as failed so its commit status does not stay pending."""
+        task = self._restore_payload(task_id, payload)
+        if task is None:
+            return
+        try:
+            task.abandon(
+                RuntimeError(
+                    f"review abandoned: worker lease expired after {attempts} attempts"
+                )
+            )
+        except Exception:
+            logger.exception("[queue] failed to report dropped task_id=%s", task_id)
+
+    def _finish(self, task: ReviewTask, lease_id: str) -> None:
+        with self._condition:
+            self._running.pop(task.task_id, None)
+        try:
+            if not self._delete_leased(task.task_id, lease_id):
+                logger.warning(
+                    "[queue] lease lost for task_id=%s; it was requeued elsewhere",
+                    task.task_id,
+                )
+        except sqlite3.Error:
+            logger.exception("[queue] failed to finish task_id=%s", task.task_id)
+        with self._condition:
+            self._condition.notify_all()
+
+    def _delete_leased(self, task_id: str, lease_id: str) -> bool:
+        with self._transaction() as conn:
+            return (
+                conn.execute(
+                    "DELETE FROM shared_review_tasks WHERE task_id = ? AND lease_id = ?",
+                    (task_id, lease_id),
+                ).rowcount
+                > 0
+            )
+
+    def _heartbeat_loop(self) -> None:
+        while not self._closed.wait(self.lease_seconds / 3):
+            with self._condition:
+                leases = [lease_id for _task, lease_id in self._running.values()]
+            if not leases:
+                continue
+            try:
+                with self._transaction() as conn:
+                    renewed = conn.execute(
+                        "UPDATE shared_review_tasks SET lease_expires = ? "
+                        f"WHERE lease_id IN ({','.join('?' * len(leases))})",
+                        (time.time() + self.lease_seconds, *leases),
+                    ).rowcount
+            except sqlite3.Error:
+                logger.exception("[queue] lease heartbeat failed")
+                continue
+            if renewed < len(leases):
+                logger.warning(
+                    "[queue] %s of %s leases were lost", len(leases) - renewed, len(leases)
+                )
+
+
+def _payload_field(payload: str, key: str) -> object:
+    try:
+        return json.loads(payload).get(key)
+    except (ValueError, AttributeError):
+        return None
+
+
+_queue_lock = threading.Lock()
+_distributed_queue: DistributedReviewQueue | None = None
+
+
+def get_distributed_queue(
+    path: str,
+    *,
+    restore: Callable[[dict], ReviewTask | None],
+    **kwargs,
+) -> DistributedReviewQueue:
+    """
+    Return the process-global distributed queue.
+
+    Arguments are only used when the queue is first created.
+    """
+    global _distributed_queue
+    if not path:
+        raise RuntimeError("REVIEW_QUEUE_BACKEND=shared requires REVIEW_QUEUE_DB")
+    with _queue_lock:
+        if _distributed_queue is None:
+            _distributed_queue = DistributedReviewQueue(path, restore=restore, **kwargs)
+        return _distributed_queue
+
+
+def reset_distributed_queue() -> None:
+    """Reset the process-global queue; intended for tests."""
+    global _distributed_queue
+    with _queue_lock:
+        _distributed_queue = None
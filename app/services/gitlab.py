@@ -1,11 +1,228 @@
 """GitLab API: comments and commit status."""
 
+import email.utils
 import logging
+import random
+import threading
+import time
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from app.config import add_reload_listener, get_config
+from app.services import metrics, tracing
 
 logger = logging.getLogger(__name__)
 
+_API_SECONDS = metrics.histogram(
+    "gitlab_api_request_seconds",
+    "Duration of GitLab API requests by endpoint and HTTP status (error: no response).",
+    ("endpoint", "status"),
+)
+
+# 429 and gateway errors mean the request was not processed; 500/504 may have been
+_RETRY_STATUSES_SAFE = frozenset({429, 502, 503})
+_RETRY_STATUSES_IDEMPOTENT = frozenset({429, 500, 502, 503, 504})
+_MAX_RETRY_DELAY_SECONDS = 60.0
+
+
+class _TokenBucket:
+    """Thread-safe token bucket shared by every caller of one client."""
+
+    def __init__(self, rate_per_second: float, capacity: float | None = None) -> None:
+        self.rate = max(0.0, rate_per_second)
+        self.capacity = max(1.0, capacity if capacity is not None else self.rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a request may be sent."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity,
+                    self._tokens + (now - self._updated) * self.rate,
+                )
+                self._updated = now
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                else:
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause_until(self, deadline: float) -> None:
+        """Hold back all callers until the monotonic deadline."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, deadline)
+
+
+def _retry_after_seconds(resp: requests.Response) -> float | None:
+    """Parse Retry-After (seconds or HTTP date) or RateLimit-Reset headers."""
+    retry_after = resp.headers.get("Retry-After", "").strip()
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            try:
+                parsed = email.utils.parsedate_to_datetime(retry_after)
+            except (TypeError, ValueError):
+                parsed = None
+            if parsed is not None:
+                return max(0.0, parsed.timestamp() - time.time())
+
+    reset = resp.headers.get("RateLimit-Reset", "").strip()
+    if reset:
+        try:
+            return max(0.0, float(reset) - time.time())
+        except ValueError:
+            return None
+    return None
+
+
+class GitLabClient:
+    """
+    Pooled GitLab API client shared by all worker threads.
+
+    Keeps connections alive through one requests.Session, retries throttled
+    and gateway failures with exponential backoff, honours Retry-After and
+    RateLimit-* headers, and paces requests with a shared token bucket.
+    """
+
+    def __init__(
+        self,
+        *,
+        pool_size: int = 10,
+        max_retries: int = 3,
+        backoff_seconds: float = 0.5,
+        rate_per_second: float = 10.0,
+    ) -> None:
+        self.max_retries = max(0, max_retries)
+        self.backoff_seconds = max(0.0, backoff_seconds)
+        self._bucket = _TokenBucket(rate_per_second)
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=max(1, pool_size),
+            pool_maxsize=max(1, pool_size),
+        )
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def post(
+        self,
+        url: str,
+        token: str,
+        payload: dict,
+        *,
+        timeout: int = 10,
+        idempotent: bool = True,
+        endpoint: str = "other",
+    ) -> requests.Response:
+        """POST JSON with retries; return the last response.
+
+        endpoint labels the request in metrics and trace spans.
+        """
+        retry_statuses = (
+            _RETRY_STATUSES_IDEMPOTENT if idempotent else _RETRY_STATUSES_SAFE
+        )
+        headers = {"PRIVATE-TOKEN": token}
+        with tracing.span("gitlab.post", endpoint=endpoint) as span:
+            attempt = 0
+            while True:
+                self._bucket.acquire()
+                started = time.monotonic()
+                try:
+                    resp = self._session.post(
+                        url, json=payload, headers=headers, timeout=timeout
+                    )
+                except (requests.ConnectionError, requests.Timeout) as exc:
+                    _API_SECONDS.observe(
+                        time.monotonic() - started, endpoint=endpoint, status="error"
+                    )
+                    retryable = idempotent or isinstance(exc, requests.ConnectTimeout)
+                    if not retryable or attempt >= self.max_retries:
+                        raise
+                    delay = self._backoff(attempt)
+                    logger.warning(
+                        "[GitLab] request error, retrying in %.1fs attempt=%s: %s",
+                        delay,
+                        attempt + 1,
+                        exc,
+                    )
+                else:
+                    _API_SECONDS.observe(
+                        time.monotonic() - started, endpoint=endpoint, status=resp.status_code
+                    )
+                    self._observe_rate_limit(resp)
+                    if resp.status_code not in retry_statuses or attempt >= self.max_retries:
+                        span.set_attributes(status=resp.status_code, retries=attempt)
+                        return resp
+                    delay = _retry_after_seconds(resp)
+                    if delay is None:
+                        delay = self._backoff(attempt)
+                    delay = min(delay, _MAX_RETRY_DELAY_SECONDS)
+                    logger.warning(
+                        "[GitLab] status=%s, retrying in %.1fs attempt=%s",
+                        resp.status_code,
+                        delay,
+                        attempt + 1,
+                    )
+                    if resp.status_code == 429:
+                        self._bucket.pause_until(time.monotonic() + delay)
+                time.sleep(delay)
+                attempt += 1
+
+    def _backoff(self, attempt: int) -> float:
+        base = self.backoff_seconds * (2**attempt)
+        return min(_MAX_RETRY_DELAY_SECONDS, base + random.uniform(0, base / 2))
+
+    def _observe_rate_limit(self, resp: requests.Response) -> None:
+        """Pause the shared bucket when GitLab reports an exhausted quota."""
+        remaining = resp.headers.get("RateLimit-Remaining", "").strip()
+        if remaining != "0":
+            return
+        delay = _retry_after_seconds(resp)
+        if delay:
+            logger.warning("[GitLab] rate limit exhausted, pausing %.1fs", delay)
+            self._bucket.pause_until(
+                time.monotonic() + min(delay, _MAX_RETRY_DELAY_SECONDS)
+            )
+
+
+_client_lock = threading.Lock()
+_client: GitLabClient | None = None
+
+
+def get_gitlab_client() -> GitLabClient:
+    """Return the process-global GitLab API client."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            cfg = get_config()
+            _client = GitLabClient(
+                pool_size=cfg.get("gitlab_api_pool_size", 10),
+                max_retries=cfg.get("gitlab_api_retries", 3),
+                rate_per_second=cfg.get("gitlab_api_rate_limit", 10),
+            )
+        return _client
+
+
+def reset_gitlab_client() -> None:
+    """Reset the process-global client; the next call picks up current config."""
+    global _client
+    with _client_lock:
+        _client = None
+
+
+add_reload_listener(lambda _cfg: reset_gitlab_client())
+
 
 def post_comment(
     gitlab_url: str,
@@ -18,9 +235,10 @@ def post_comment(
     """Post a comment on the given MR."""
     base = gitlab_url.rstrip("/")
     url = f"{base}/api/v4/projects/{project_id}/merge_requests/{mr_iid}/notes"
-    headers = {"PRIVATE-TOKEN": token}
     logger.info("[MR] Posting comment project_id=%s mr_iid=%s", project_id, mr_iid)
-    resp = requests.post(url, json={"body": message}, headers=headers, timeout=timeout)
+    resp = get_gitlab_client().post(
+        url, token, {"body": message}, timeout=timeout, idempotent=False, endpoint="mr_note"
+    )
     logger.info("[MR] Comment response status=%s", resp.status_code)
     if not resp.ok:
         logger.warning("[MR] Comment failed response=%s", resp.text[:500])
@@ -37,9 +255,15 @@ def post_commit_comment(
     """Post a comment on the given commit (used for push review results)."""
     base = gitlab_url.rstrip("/")
     url = f"{base}/api/v4/projects/{project_id}/repository/commits/{sha}/comments"
-    headers = {"PRIVATE-TOKEN": token}
     logger.info("[Push] Posting commit comment project_id=%s sha=%s", project_id, sha[:8])
-    resp = requests.post(url, json={"note": message}, headers=headers, timeout=timeout)
+    resp = get_gitlab_client().post(
+        url,
+        token,
+        {"note": message},
+        timeout=timeout,
+        idempotent=False,
+        endpoint="commit_comment",
+    )
     logger.info("[Push] Commit comment response status=%s", resp.status_code)
     if not resp.ok:
         logger.warning("[Push] Comment failed response=%s", resp.text[:500])
@@ -56,7 +280,6 @@ def set_commit_status(
 ) -> None:
     """Set commit status for GitLab pipeline / gate display."""
     url = f"{gitlab_url.rstrip('/')}/api/v4/projects/{project_id}/statuses/{sha}"
-    headers = {"PRIVATE-TOKEN": token}
     data = {
         "state": state,
         "context": "code-review-bot",
@@ -68,7 +291,7 @@ def set_commit_status(
         state,
         description,
     )
-    resp = requests.post(url, json=data, headers=headers, timeout=timeout)
+    resp = get_gitlab_client().post(url, token, data, timeout=timeout, endpoint="commit_status")
     logger.info("[Status] Set result status=%s", resp.status_code)
     if not resp.ok:
         logger.warning("[Status] Set failed response=%s", resp.text[:500])
@@ -0,0 +1,171 @@
+"""Per-model circuit breakers for Claude Code runs."""
+
+import logging
+import threading
+import time
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+@dataclass
+class _Breaker:
+    state: str = CLOSED
+    consecutive_failures: int = 0
+    opened_at: float = 0.0
+    probe_started_at: float | None = None
+    successes: int = 0
+    failures: int = 0
+    last_error: str = ""
+
+
+class ModelHealth:
+    """
+    Process-wide closed/open/half-open breaker per model.
+
+    failure_threshold consecutive failures open a model's circuit; tasks
+    then skip it. After cooldown_seconds the circuit is half-open: the next
+    task probes the model first, and the outcome closes or re-opens it. A
+    probe that never reports back is retried after another cooldown.
+    failure_threshold <= 0 disables the breakers.
+
+    Listeners are called with (model, ok, seconds) for every recorded run,
+    outside the lock, whether or not the breakers are enabled.
+    """
+
+    def __init__(self, *, failure_threshold: int = 3, cooldown_seconds: float = 60.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = max(0.0, cooldown_seconds)
+        self._breakers: dict[str, _Breaker] = {}
+        self._listeners: list[Callable[[str, bool, float], None]] = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener: Callable[[str, bool, float], None]) -> None:
+        with self._lock:
+            if listener not in self._listeners:
+                self._listeners.append(listener)
+
+    def _notify(self, model: str, ok: bool, seconds: float) -> None:
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(model, ok, seconds)
+            except Exception:
+                logger.exception("[health] listener failed")
+
+    def configure(self, *, failure_threshold: int, cooldown_seconds: float) -> None:
+        with self._lock:
+            self.failure_threshold = failure_threshold
+            self.cooldown_seconds = max(0.0, cooldown_seconds)
+            if failure_threshold <= 0:
+                self._breakers.clear()
+
+    def select(self, models: Sequence[str]) -> list[str]:
+        """
+        Return the models a task should try, in order.
+
+        Open circuits are skipped; a half-open model due for a probe is kept
+        in its configured position. When every circuit is open the full list
+        is returned, so reviews still run rather than fail outright.
+        """
+        if self.failure_threshold <= 0:
+            return list(models)
+        now = time.monotonic()
+        selected: list[str] = []
+        with self._lock:
+            for model in models:
+                breaker = self._breakers.get(model)
+                if breaker is None or breaker.state == CLOSED:
+                    selected.append(model)
+                elif self._take_probe(model, breaker, now):
+                    selected.append(model)
+        if not selected:
+            logger.warning(
+                "[health] all model circuits open, trying every model: %s",
+                ", ".join(model or "default" for model in models),
+            )
+            return list(models)
+        return selected
+
+    def _take_probe(self, model: str, breaker: _Breaker, now: float) -> bool:
+        if breaker.state == OPEN:
+            if now - breaker.opened_at < self.cooldown_seconds:
+                return False
+            breaker.state = HALF_OPEN
+            logger.info("[health] model %s half-open, sending probe", model or "default")
+        elif (
+            breaker.probe_started_at is not None
+            and now - breaker.probe_started_at < self.cooldown_seconds
+        ):
+            return False
+        breaker.probe_started_at = now
+        return True
+
+    def record_success(self, model: str, seconds: float = 0.0) -> None:
+        self._notify(model, True, seconds)
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            breaker = self._breakers.setdefault(model, _Breaker())
+            if breaker.state != CLOSED:
+                logger.info("[health] model %s recovered, closing circuit", model or "default")
+            breaker.state = CLOSED
+            breaker.consecutive_failures = 0
+            breaker.probe_started_at = None
+            breaker.successes += 1
+
+    def record_failure(self, model: str, error: str = "", seconds: float = 0.0) -> None:
+        self._notify(model, False, seconds)
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            breaker = self._breakers.setdefault(model, _Breaker())
+            breaker.consecutive_failures += 1
+            breaker.failures += 1
+            breaker.last_error = error[:500]
+            if breaker.state == HALF_OPEN or (
+                breaker.state == CLOSED
+                and breaker.consecutive_failures >= self.failure_threshold
+            ):
+                logger.warning(
+                    "[health] opening circuit for model %s after %s consecutive failures",
+                    model or "default",
+                    breaker.consecutive_failures,
+                )
+                breaker.state = OPEN
+                breaker.opened_at = time.monotonic()
+                breaker.probe_started_at = None
+
+    def snapshot(self) -> dict[str, dict]:
+        """Return breaker state per model seen so far ("" is the default model)."""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                model: {
+                    "state": breaker.state,
+                    "consecutive_failures": breaker.consecutive_failures,
+                    "successes": breaker.successes,
+                    "failures": breaker.failures,
+                    "open_seconds": (
+                        round(now - breaker.opened_at, 1)
+                        if breaker.state != CLOSED
+                        else 0.0
+                    ),
+                    "last_error": breaker.last_error,
+                }
+                for model, breaker in self._breakers.items()
+            }
+
+
+_model_health = ModelHealth()
+
+
+def get_model_health() -> ModelHealth:
+    """Return the process-global model health tracker."""
+    return _model_health
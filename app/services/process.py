@@ -0,0 +1,143 @@
+"""Review subprocesses: own process group, tree kill and resource limits."""
+
+import logging
+import os
+import signal
+import subprocess
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - non-POSIX
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+_TERM_GRACE_SECONDS = 2.0
+
+
+@dataclass(frozen=True)
+class ProcessLimits:
+    """Per-process rlimits; 0 leaves a limit unchanged."""
+
+    address_space_mb: int = 0
+    cpu_seconds: int = 0
+    open_files: int = 0
+
+    def rlimits(self) -> list[tuple[int, int]]:
+        """Return (resource, value) pairs to apply."""
+        if resource is None:
+            return []
+        pairs = [
+            (resource.RLIMIT_AS, self.address_space_mb * 1024 * 1024),
+            (resource.RLIMIT_CPU, self.cpu_seconds),
+            (resource.RLIMIT_NOFILE, self.open_files),
+        ]
+        return [(kind, value) for kind, value in pairs if value > 0]
+
+
+def _apply_limits(pid: int, limits: ProcessLimits | None) -> None:
+    """
+    Apply rlimits to a freshly started child.
+
+    prlimit runs right after the fork/exec instead of in a preexec_fn, which
+    is unsafe with the worker threads this service runs; the limits are in
+    place long before the CLI spawns its own helpers, which inherit them.
+    """
+    if limits is None or resource is None or not hasattr(resource, "prlimit"):
+        return
+    for kind, value in limits.rlimits():
+        try:
+            _soft, hard = resource.prlimit(pid, kind)
+            if hard != resource.RLIM_INFINITY:
+                value = min(value, hard)
+            resource.prlimit(pid, kind, (value, value))
+        except (OSError, ValueError) as exc:
+            logger.warning("[process] failed to set rlimit %s pid=%s: %s", kind, pid, exc)
+
+
+def popen(
+    cmd: Sequence[str],
+    *,
+    limits: ProcessLimits | None = None,
+    **kwargs,
+) -> subprocess.Popen:
+    """Start cmd as the leader of a new session (and process group)."""
+    proc = subprocess.Popen(list(cmd), start_new_session=True, **kwargs)
+    _apply_limits(proc.pid, limits)
+    return proc
+
+
+def _signal_group(pgid: int, sig: int) -> bool:
+    try:
+        os.killpg(pgid, sig)
+    except (ProcessLookupError, PermissionError):
+        return False
+    return True
+
+
+def kill_tree(proc: subprocess.Popen) -> None:
+    """
+    Terminate the whole process group led by proc and reap proc.
+
+    SIGTERM first so the CLI can clean up, SIGKILL for anything still alive
+    after a short grace period.
+    """
+    if _signal_group(proc.pid, signal.SIGTERM):
+        try:
+            proc.wait(timeout=_TERM_GRACE_SECONDS)
+        except subprocess.TimeoutExpired:
+            pass
+    _signal_group(proc.pid, signal.SIGKILL)
+    if proc.poll() is None:
+        proc.kill()
+    proc.wait()
+
+
+def reap_group(proc: subprocess.Popen) -> None:
+    """Kill helpers the exited leader left behind in its process group."""
+    # The group id cannot be reused while any member is alive
+    if _signal_group(proc.pid, signal.SIGKILL):
+        logger.info("[process] killed leftover processes pgid=%s", proc.pid)
+
+
+def run(
+    cmd: Sequence[str],
+    *,
+    input: str | None = None,
+    timeout: float | None = None,
+    limits: ProcessLimits | None = None,
+    **kwargs,
+) -> subprocess.CompletedProcess:
+    """
+    subprocess.run replacement that kills the whole tree on timeout.
+
+    Also kills the tree when the caller is interrupted, and reaps helpers left
+    in the group after a normal exit.
+    """
+    proc = popen(
+        cmd,
+        limits=limits,
+        stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        **kwargs,
+    )
+    try:
+        stdout, stderr = proc.communicate(input=input, timeout=timeout)
+    except subprocess.TimeoutExpired as exc:
+        kill_tree(proc)
+        try:
+            stdout, stderr = proc.communicate(timeout=_TERM_GRACE_SECONDS)
+        except subprocess.TimeoutExpired:
+            # A helper that escaped the group still holds the pipes
+            stdout, stderr = None, None
+        raise subprocess.TimeoutExpired(
+            exc.cmd, exc.timeout, output=stdout, stderr=stderr
+        ) from None
+    except BaseException:
+        kill_tree(proc)
+        raise
+    reap_group(proc)
+    return subprocess.CompletedProcess(proc.args, proc.returncode, stdout, stderr)
@@ -0,0 +1,113 @@
+"""Unix socket channel between webhook ingress processes and the worker daemon."""
+
+import json
+import logging
+import os
+import socket
+import socketserver
+import stat
+import threading
+from collections.abc import Callable, Mapping
+
+logger = logging.getLogger(__name__)
+
+# Requests carry one task payload; anything larger is not a review task
+_MAX_MESSAGE_BYTES = 4 * 1024 * 1024
+
+Handler = Callable[[dict], dict]
+
+
+class QueueUnavailable(OSError):
+    """The worker daemon could not be reached or did not answer."""
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """One newline-terminated JSON request and reply per connection."""
+
+    server: "_UnixServer"
+
+    def handle(self) -> None:
+        line = self.rfile.readline(_MAX_MESSAGE_BYTES + 1)
+        try:
+            request = json.loads(line)
+            handler = self.server.handlers.get(request.get("op", ""))
+            if handler is None:
+                reply = {"ok": False, "error": f"unknown op {request.get('op')!r}"}
+            else:
+                reply = {"ok": True, **handler(request)}
+        except (ValueError, AttributeError) as exc:
+            reply = {"ok": False, "error": f"bad request: {exc}"}
+        except Exception as exc:
+            logger.exception("[ipc] request failed")
+            reply = {"ok": False, "error": str(exc)}
+        self.wfile.write(json.dumps(reply, ensure_ascii=False).encode("utf-8") + b"\n")
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    handlers: Mapping[str, Handler] = {}
+
+
+class QueueServer:
+    """
+    Serve queue operations to ingress processes on a Unix socket.
+
+    handlers maps an op name to a function taking the request and returning
+    a JSON-serializable dict. The socket is created mode 0600, so only the
+    service user can submit tasks.
+    """
+
+    def __init__(self, path: str, handlers: Mapping[str, Handler]) -> None:
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        _remove_stale_socket(path)
+        self._server = _UnixServer(path, _RequestHandler)
+        self._server.handlers = handlers
+        os.chmod(path, 0o600)
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True, name="queue-ipc-server"
+        )
+        self._thread.start()
+        logger.info("[ipc] serving review queue on %s", path)
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        _remove_stale_socket(self.path)
+
+
+def _remove_stale_socket(path: str) -> None:
+    try:
+        if stat.S_ISSOCK(os.lstat(path).st_mode):
+            os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+class QueueClient:
+    """Send queue operations to the worker daemon."""
+
+    def __init__(self, path: str, *, timeout: float = 10.0) -> None:
+        self.path = path
+        self.timeout = timeout
+
+    def call(self, op: str, **fields) -> dict:
+        """Send one request and return the reply; raise QueueUnavailable on failure."""
+        message = json.dumps({"op": op, **fields}, ensure_ascii=False).encode("utf-8")
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(self.timeout)
+                sock.connect(self.path)
+                sock.sendall(message + b"\n")
+                reply = sock.makefile("rb").readline(_MAX_MESSAGE_BYTES + 1)
+        except OSError as exc:
+            raise QueueUnavailable(f"worker daemon at {self.path}: {exc}") from exc
+        try:
+            data = json.loads(reply)
+        except ValueError as exc:
+            raise QueueUnavailable(f"worker daemon at {self.path}: bad reply") from exc
+        if not data.get("ok"):
+            raise QueueUnavailable(f"worker daemon at {self.path}: {data.get('error')}")
+        return data
@@ -0,0 +1,238 @@
+"""Content-addressed cache of review results."""
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections.abc import Sequence
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS review_results (
+    cache_key TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    used_at REAL NOT NULL
+)
+"""
+
+# Blob ids change on rebase without changing the patch. Hunk headers stay in
+# the key: a review cites line numbers, so shifted hunks need a fresh review.
+_INDEX_LINE_RE = re.compile(r"^index [0-9a-f]+\.\.[0-9a-f]+.*$", re.MULTILINE)
+
+_skills_hash_lock = threading.Lock()
+_skills_hashes: dict[str, tuple[tuple[int, int], str]] = {}
+
+
+def normalize_diff(diff: str) -> str:
+    """Drop the parts of a diff that differ between identical patches."""
+    return _INDEX_LINE_RE.sub("", diff)
+
+
+def _skills_tree_stamp(skills_root: str) -> tuple[int, int]:
+    """Return (entry count, max mtime_ns) of the skills tree, without reading files."""
+    count, newest = 0, 0
+    for dirpath, dirnames, filenames in os.walk(skills_root):
+        dirnames[:] = [name for name in dirnames if name != ".git"]
+        for name in (".", *filenames):
+            try:
+                mtime = os.stat(os.path.join(dirpath, name)).st_mtime_ns
+            except OSError:
+                continue
+            count += 1
+            newest = max(newest, mtime)
+    return count, newest
+
+
+def skills_tree_hash(skills_root: str) -> str:
+    """
+    Hash every file under the skills root by relative path and content.
+
+    The hash is memoized per root and recomputed only when the number of
+    entries or the newest mtime in the tree changes.
+    """
+    stamp = _skills_tree_stamp(skills_root)
+    with _skills_hash_lock:
+        cached = _skills_hashes.get(skills_root)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    result = _hash_skills_tree(skills_root)
+    with _skills_hash_lock:
+        _skills_hashes[skills_root] = (stamp, result)
+    return result
+
+
+def _hash_skills_tree(skills_root: str) -> str:
+    digest = hashlib.sha256()
+    for dirpath, dirnames, filenames in os.walk(skills_root):
+        dirnames[:] = sorted(name for name in dirnames if name != ".git")
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            digest.update(os.path.relpath(path, skills_root).encode("utf-8"))
+            digest.update(b"\0")
+            try:
+                with open(path, "rb") as handle:
+                    digest.update(hashlib.sha256(handle.read()).digest())
+            except OSError:
+                continue
+    return digest.hexdigest()
+
+
+def review_cache_key(
+    *,
+    project_id: object,
+    diff: str,
+    prompt: str,
+    models: Sequence[str],
+    skills_hash: str,
+) -> str:
+    """Build the cache key for one review input."""
+    digest = hashlib.sha256()
+    for part in (
+        str(project_id),
+        hashlib.sha256(normalize_diff(diff).encode("utf-8")).hexdigest(),
+        prompt,
+        ",".join(models),
+        skills_hash,
+    ):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ReviewCache:
+    """
+    SQLite store of review results keyed by review_cache_key.
+
+    Entries older than ttl_seconds are treated as misses and purged; when
+    more than max_entries are stored, the least recently used are evicted.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        ttl_seconds: float = 7 * 24 * 3600,
+        max_entries: int = 1000,
+    ) -> None:
+        self.path = path
+        self.ttl_seconds = max(0.0, ttl_seconds)
+        self.max_entries = max(1, max_entries)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> str | None:
+        """Return the cached result for key, or None on a miss."""
+        now = time.time()
+        try:
+            return self._get(key, now)
+        except sqlite3.Error:
+            logger.exception("[cache] lookup failed")
+            return None
+
+    def _get(self, key: str, now: float) -> str | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result, created_at FROM review_results WHERE cache_key = ?",
+                (key,),
+            ).fetchone()
+            if row is not None and self._expired(row[1], now):
+                with self._conn:
+                    self._conn.execute(
+                        "DELETE FROM review_results WHERE cache_key = ?", (key,)
+                    )
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE review_results SET used_at = ? WHERE cache_key = ?",
+                    (now, key),
+                )
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, result: str) -> None:
+        """Store a result and evict expired or excess entries."""
+        try:
+            self._put(key, result, time.time())
+        except sqlite3.Error:
+            logger.exception("[cache] store failed")
+
+    def _put(self, key: str, result: str, now: float) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO review_results "
+                "(cache_key, result, created_at, used_at) VALUES (?, ?, ?, ?)",
+                (key, result, now, now),
+            )
+            if self.ttl_seconds:
+                self._conn.execute(
+                    "DELETE FROM review_results WHERE created_at < ?",
+                    (now - self.ttl_seconds,),
+                )
+            self._conn.execute(
+                "DELETE FROM review_results WHERE cache_key IN ("
+                "SELECT cache_key FROM review_results "
+                "ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def stats(self) -> dict[str, int]:
+        """Return hit/miss counters and the current entry count."""
+        with self._lock:
+            (entries,) = self._conn.execute(
+                "SELECT COUNT(*) FROM review_results"
+            ).fetchone()
+            return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return bool(self.ttl_seconds) and created_at < now - self.ttl_seconds
+
+
+_cache_lock = threading.Lock()
+_review_cache: ReviewCache | None = None
+
+
+def get_review_cache(
+    path: str,
+    *,
+    ttl_seconds: float = 7 * 24 * 3600,
+    max_entries: int = 1000,
+) -> ReviewCache | None:
+    """
+    Return the process-global review cache, or None when path is empty.
+
+    Arguments are only used when the cache is first created.
+    """
+    global _review_cache
+    if not path:
+        return None
+    with _cache_lock:
+        if _review_cache is None:
+            _review_cache = ReviewCache(
+                path, ttl_seconds=ttl_seconds, max_entries=max_entries
+            )
+        return _review_cache
+
+
+def reset_review_cache() -> None:
+    """Reset the process-global cache and skills hashes; intended for tests."""
+    global _review_cache
+    with _cache_lock:
+        _review_cache = None
+    with _skills_hash_lock:
+        _skills_hashes.clear()
@@ -1,15 +1,51 @@
-"""In-memory review queue for single-instance deployments."""
+"""Review queue for single-instance deployments, optionally persisted to disk."""
 
+import abc
+import contextvars
+import heapq
 import logging
+import math
 import subprocess
 import threading
 import time
-from collections import deque
+import uuid
+from collections import OrderedDict
 from collections.abc import Callable
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+
+from app.services import metrics, tracing
+from app.services.concurrency import AimdLimit
+from app.services.review_store import ReviewStore
 
 logger = logging.getLogger(__name__)
 
+QUEUE_WAIT_SECONDS = metrics.histogram(
+    "review_queue_wait_seconds",
+    "Time review tasks spent queued before a worker started them.",
+    ("review_type",),
+)
+_TASKS_TOTAL = metrics.counter(
+    "review_tasks_total",
+    "Review tasks finished, by outcome (success, timeout, error, superseded).",
+    ("review_type", "outcome"),
+)
+
+_current_task: contextvars.ContextVar["ReviewTask | None"] = contextvars.ContextVar(
+    "current_review_task", default=None
+)
+
+
+def _partial_output(exc: subprocess.TimeoutExpired) -> str:
+    """
+    Return text a timed-out review produced before it was stopped.
+
+    Only Claude Code timeouts carry review text; a git timeout's .output is
+    raw command output (a partial diff, say) and is never posted.
+    """
+    if not getattr(exc, "partial_review", False):
+        return ""
+    return exc.output if isinstance(exc.output, str) else ""
+
 
 @dataclass
 class ReviewTask:
@@ -20,12 +56,22 @@ class ReviewTask:
     run_review: Callable[[], str]
     on_start: Callable[[], None]
     on_success: Callable[[str], None]
-    on_timeout: Callable[[], None]
+    on_timeout: Callable[[str], None]
     on_error: Callable[[Exception], None]
     on_superseded: Callable[[], None] | None = None
+    on_coalesce: Callable[["ReviewTask"], None] | None = None
+    prefetch: Callable[[], None] | None = None
     dedupe_key: str = ""
     review_type: str = "review"
     mr_iid: int | None = None
+    payload: dict = field(default_factory=dict)
+    priority: int = 0
+    weight: float = 1.0
+    size_hint: int = 0
+    task_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    enqueued_at: float = 0.0
+    started_at: float | None = None
+    progress: str = ""
     _superseded: bool = False
 
     @property
@@ -37,34 +83,228 @@ class ReviewTask:
         """Mark this pending task as replaced by a newer task."""
         self._superseded = True
 
+    def absorb(self, older: "ReviewTask") -> None:
+        """Merge a superseded pending task into this one; must not block."""
+        if self.on_coalesce is not None:
+            self.on_coalesce(older)
+
+    def set_progress(self, message: str) -> None:
+        """Record the latest progress message of a running task."""
+        self.progress = message
+
     def report_superseded(self) -> None:
         """Invoke the optional superseded callback."""
         if self.on_superseded is not None:
             self.on_superseded()
 
+    def abandon(self, exc: Exception) -> None:
+        """Report a task that will never run (e.g. out of attempts) as failed."""
+        logger.error("[%s queue] task abandoned: %s", self.review_type, exc)
+        _TASKS_TOTAL.inc(review_type=self.review_type, outcome="error")
+        self.on_error(exc)
+
     def run(self) -> None:
         """Run the review and invoke callbacks for status reporting."""
         if self.superseded:
             logger.info("[%s queue] task skipped: superseded", self.review_type)
+            _TASKS_TOTAL.inc(review_type=self.review_type, outcome="superseded")
             self.report_superseded()
             return
 
         logger.info("[%s queue] task starting", self.review_type)
-        try:
-            self.on_start()
-            result = self.run_review()
-            self.on_success(result)
-            logger.info("[%s queue] task completed", self.review_type)
-        except subprocess.TimeoutExpired:
-            self.on_timeout()
-            logger.warning("%s review timeout", self.review_type)
-        except Exception as exc:
-            logger.exception("%s review task error", self.review_type)
-            self.on_error(exc)
-
-
-class ReviewQueue:
-    """Global FIFO worker pool with per-project concurrency limits."""
+        self.started_at = time.time()
+        token = _current_task.set(self)
+        outcome = "error"
+        with tracing.trace(
+            f"review.{self.review_type}",
+            task_id=self.task_id,
+            project_id=self.project_id,
+            commit_sha=self.commit_sha,
+            mr_iid=self.mr_iid,
+            priority=self.priority,
+        ) as span:
+            try:
+                self.on_start()
+                result = self.run_review()
+                outcome = "success"
+                self.on_success(result)
+                logger.info("[%s queue] task completed", self.review_type)
+            except subprocess.TimeoutExpired as exc:
+                outcome = "timeout"
+                span.set_error(exc)
+                self.on_timeout(_partial_output(exc))
+                logger.warning("%s review timeout", self.review_type)
+            except Exception as exc:
+                span.set_error(exc)
+                logger.exception("%s review task error", self.review_type)
+                self.on_error(exc)
+            finally:
+                span.set_attribute("outcome", outcome)
+                _current_task.reset(token)
+                _TASKS_TOTAL.inc(review_type=self.review_type, outcome=outcome)
+
+
+def current_progress_reporter() -> Callable[[str], None]:
+    """Return set_progress of the task running in this thread, or a no-op."""
+    task = _current_task.get()
+    if task is None:
+        return lambda _message: None
+    return task.set_progress
+
+
+def task_sort_key(
+    priority: int,
+    enqueued_at: float,
+    size_hint: int,
+    *,
+    aging_seconds: float,
+    sjf_seconds_per_file: float,
+) -> tuple[int, float]:
+    """
+    Return a task's static scheduling key; smaller runs first.
+
+    With aging the class is folded into time: a task of class p ranks like
+    one of class 0 that arrived p * aging_seconds later, so the order never
+    changes while tasks wait. The size delay is capped at one aging period.
+    """
+    delay = sjf_seconds_per_file * size_hint
+    if aging_seconds > 0:
+        delay = min(delay, aging_seconds)
+        return 0, enqueued_at + priority * aging_seconds + delay
+    return priority, enqueued_at + delay
+
+
+def effective_class(key: tuple[int, float], aging_seconds: float) -> int:
+    """
+    Return the priority class of a task_sort_key.
+
+    With aging, classes are fixed aging_seconds-wide buckets of the aged
+    time, so a task's class never changes while it waits and ready projects
+    can be kept in a heap.
+    """
+    if aging_seconds > 0:
+        return math.floor(key[1] / aging_seconds)
+    return key[0]
+
+
+class WorkerPool(abc.ABC):
+    """
+    Worker threads with an optional adaptive limit.
+
+    With min_workers below worker_count the number of workers adapts
+    between the two (see AimdLimit and observe_claude_run); surplus workers
+    retire after finishing their current task. Subclasses implement _worker
+    and call _retire_locked between tasks.
+    """
+
+    def __init__(
+        self,
+        *,
+        worker_count: int,
+        min_workers: int = 0,
+        latency_target: float = 0.0,
+        start_workers: bool = True,
+    ) -> None:
+        self.worker_count = max(1, worker_count)
+        self._worker_limit = self.worker_count
+        self._adaptive: AimdLimit | None = None
+        self._configure_adaptive_locked(min_workers, latency_target)
+        self._start_workers = start_workers
+        self._condition = threading.Condition()
+        self._workers: list[threading.Thread] = []
+        self._worker_seq = 0
+
+    def _configure_adaptive_locked(self, min_workers: int, latency_target: float) -> None:
+        """Enable the adaptive worker limit when min_workers < worker_count."""
+        if not 0 < min_workers < self.worker_count:
+            self._adaptive = None
+            self._worker_limit = self.worker_count
+            return
+        current = self._worker_limit
+        if self._adaptive is not None:
+            current = self._adaptive.value
+        self._adaptive = AimdLimit(
+            initial=current,
+            minimum=min_workers,
+            maximum=self.worker_count,
+            latency_target=latency_target,
+        )
+        self._worker_limit = self._adaptive.value
+
+    def observe_claude_run(self, model: str, ok: bool, seconds: float) -> None:
+        """Feed one Claude Code run outcome to the adaptive worker limit."""
+        with self._condition:
+            if self._adaptive is None:
+                return
+            limit = self._adaptive.sample(ok=ok, seconds=seconds)
+            if limit == self._worker_limit:
+                return
+            logger.info(
+                "[queue] worker limit %s -> %s (model=%s ok=%s %.1fs)",
+                self._worker_limit,
+                limit,
+                model or "default",
+                ok,
+                seconds,
+            )
+            self._worker_limit = limit
+            if self._start_workers:
+                self._ensure_workers_locked()
+            # Wake idle workers so surplus ones retire
+            self._condition.notify_all()
+
+    def _ensure_workers_locked(self) -> None:
+        while len(self._workers) < self._worker_limit:
+            self._worker_seq += 1
+            thread = threading.Thread(
+                target=self._worker,
+                daemon=True,
+                name=f"review-worker-{self._worker_seq}",
+            )
+            self._workers.append(thread)
+            thread.start()
+
+    def _retire_locked(self) -> bool:
+        """Remove the calling worker if the pool is above its limit."""
+        if len(self._workers) <= self._worker_limit:
+            return False
+        self._workers.remove(threading.current_thread())
+        return True
+
+    def _workers_snapshot_locked(self) -> dict:
+        return {
+            "limit": self._worker_limit,
+            "threads": len(self._workers),
+            "max": self.worker_count,
+            "adaptive": self._adaptive is not None,
+        }
+
+    @abc.abstractmethod
+    def _worker(self) -> None:
+        """Run tasks until _retire_locked tells this worker to stop."""
+
+
+class ReviewQueue(WorkerPool):
+    """
+    Global worker pool with per-project concurrency limits.
+
+    Pending tasks live in per-project sub-queues ordered by priority class
+    (lower runs first), then arrival. Every aging_seconds of waiting lifts
+    a task one class, so low classes cannot starve; with sjf_seconds_per_file
+    set, a task's size_hint (changed files) delays it by up to one aging
+    period, favouring small reviews. Projects that have pending work and
+    spare concurrency are ready; the next task comes from the ready project
+    whose head task has the best effective class, ties broken by weighted
+    fair queuing: each dispatch advances the project's virtual time by
+    1/weight, and the least-advanced project goes first. Ready projects sit
+    in a heap keyed on (class, virtual time, head key), so picking a task is
+    O(log ready projects + log depth). A dedupe index maps each dedupe_key to
+    its live pending task, so superseding is O(1) and replaced tasks leave
+    the queue immediately.
+
+    When a ReviewStore is attached, accepted tasks are persisted with their
+    payload and removed once finished, so a restart can recover them.
+    """
 
     def __init__(
         self,
@@ -72,18 +312,39 @@ class ReviewQueue:
         *,
         worker_count: int = 3,
         project_concurrency: int = 2,
+        min_workers: int = 0,
+        latency_target: float = 0.0,
+        aging_seconds: float = 600.0,
+        sjf_seconds_per_file: float = 0.0,
         start_workers: bool = True,
+        store: ReviewStore | None = None,
     ) -> None:
+        super().__init__(
+            worker_count=worker_count,
+            min_workers=min_workers,
+            latency_target=latency_target,
+            start_workers=start_workers,
+        )
         self.max_pending = max(1, max_pending)
-        self.worker_count = max(1, worker_count)
         self.project_concurrency = max(1, project_concurrency)
-        self._start_workers = start_workers
-        self._condition = threading.Condition()
-        self._queue: deque[ReviewTask] = deque()
-        self._workers: list[threading.Thread] = []
+        self.aging_seconds = max(0.0, aging_seconds)
+        self.sjf_seconds_per_file = max(0.0, sjf_seconds_per_file)
+        self._store = store
+        self._project_queues: dict[int, OrderedDict[str, ReviewTask]] = {}
+        # (sort key, seq, task_id); entries of removed tasks are skipped lazily
+        self._project_heaps: dict[int, list[tuple[tuple[int, float], int, str]]] = {}
+        self._project_vtime: dict[int, float] = {}
+        self._project_weight: dict[int, float] = {}
+        self._virtual_clock = 0.0
+        self._push_seq = 0
+        self._dedupe_index: dict[str, ReviewTask] = {}
+        # project_id -> rank of its live ready-heap entry; other entries are stale
+        self._ready: dict[int, tuple[int, float, tuple[int, float]]] = {}
+        self._ready_heap: list[tuple[tuple[int, float, tuple[int, float]], int, int]] = []
         self._pending_count = 0
         self._active_count = 0
         self._active_by_project: dict[int, int] = {}
+        self._active_tasks: dict[str, ReviewTask] = {}
 
         if self._start_workers:
             self._ensure_workers()
@@ -106,18 +367,64 @@ class ReviewQueue:
         with self._condition:
             return set(self._active_by_project)
 
+    def snapshot(self) -> dict:
+        """Return queue depth and the progress of running tasks."""
+        now = time.time()
+        with self._condition:
+            pending_by_project = {
+                str(project_id): len(project_queue)
+                for project_id, project_queue in self._project_queues.items()
+            }
+            active = [
+                {
+                    "task_id": task.task_id,
+                    "project_id": task.project_id,
+                    "review_type": task.review_type,
+                    "commit_sha": task.commit_sha,
+                    "mr_iid": task.mr_iid,
+                    "priority": task.priority,
+                    "running_seconds": round(now - (task.started_at or now), 1),
+                    "progress": task.progress,
+                }
+                for task in self._active_tasks.values()
+            ]
+            return {
+                "pending": self._pending_count,
+                "pending_by_project": pending_by_project,
+                "active": active,
+                "workers": self._workers_snapshot_locked(),
+            }
+
     def set_limits(
         self,
         *,
         max_pending: int,
         worker_count: int,
         project_concurrency: int,
+        min_workers: int = 0,
+        latency_target: float = 0.0,
+        aging_seconds: float = 600.0,
+        sjf_seconds_per_file: float = 0.0,
     ) -> None:
-        """Update queue limits and start extra workers if needed."""
+        """Update queue limits and start or retire workers as needed."""
         with self._condition:
             self.max_pending = max(1, max_pending)
             self.worker_count = max(1, worker_count)
+            self._configure_adaptive_locked(min_workers, latency_target)
+            aging_seconds = max(0.0, aging_seconds)
+            sjf_seconds_per_file = max(0.0, sjf_seconds_per_file)
+            if (aging_seconds, sjf_seconds_per_file) != (
+                self.aging_seconds,
+                self.sjf_seconds_per_file,
+            ):
+                self.aging_seconds = aging_seconds
+                self.sjf_seconds_per_file = sjf_seconds_per_file
+                self._rebuild_heaps_locked()
+            previous_concurrency = self.project_concurrency
             self.project_concurrency = max(1, project_concurrency)
+            if self.project_concurrency > previous_concurrency:
+                for project_id in self._project_queues:
+                    self._mark_ready_locked(project_id)
             if self._start_workers:
                 self._ensure_workers_locked()
             self._condition.notify_all()
@@ -128,17 +435,18 @@ class ReviewQueue:
         *,
         on_accepted: Callable[[], None] | None = None,
     ) -> bool:
-        """Append a task if capacity allows; return False when full."""
+        """
+        Append a task if capacity allows; return False when full.
+
+        on_accepted is called under the queue lock and must not block.
+        """
         superseded_tasks: list[ReviewTask] = []
         with self._condition:
             supersede_candidates: list[ReviewTask] = []
             if task.dedupe_key:
-                for pending in self._queue:
-                    if (
-                        pending.dedupe_key == task.dedupe_key
-                        and not pending.superseded
-                    ):
-                        supersede_candidates.append(pending)
+                pending = self._dedupe_index.get(task.dedupe_key)
+                if pending is not None:
+                    supersede_candidates.append(pending)
 
             projected_pending = self._pending_count - len(supersede_candidates)
             if projected_pending >= self.max_pending:
@@ -151,19 +459,32 @@ class ReviewQueue:
                 return False
 
             for pending in supersede_candidates:
+                task.absorb(pending)
                 pending.mark_superseded()
                 superseded_tasks.append(pending)
-                self._pending_count -= 1
-
-            self._queue.append(task)
-            self._pending_count += 1
+                self._remove_pending_locked(pending)
+                if self._store is not None:
+                    self._store.remove(pending.task_id)
+
+            self._push_locked(task)
+            if self._store is not None:
+                self._store.add(
+                    task.task_id,
+                    task.project_id,
+                    task.payload,
+                    dedupe_key=task.dedupe_key,
+                    review_type=task.review_type,
+                )
+            # Runs before any worker can start the task, so it must not block
+            if on_accepted is not None:
+                try:
+                    on_accepted()
+                except Exception:
+                    logger.exception("failed to run review task acceptance callback")
             if self._start_workers:
                 self._ensure_workers_locked()
             self._condition.notify_all()
 
-        if on_accepted is not None:
-            on_accepted()
-
         for pending in superseded_tasks:
             try:
                 pending.report_superseded()
@@ -172,6 +493,76 @@ class ReviewQueue:
 
         return True
 
+    def recover(self, restore: Callable[[dict], ReviewTask | None]) -> int:
+        """
+        Re-queue tasks persisted by a previous process; return the count.
+
+        Tasks that were running when the process died are queued ahead of
+        pending ones of the same priority class, so they resume first and
+        re-acquire their project slots. Rows sharing a dedupe_key are
+        superseded and coalesced as in try_enqueue, newest row winning.
+        """
+        if self._store is None:
+            return 0
+
+        restored: dict[str, ReviewTask] = {}
+        latest: dict[str, ReviewTask] = {}
+        superseded_tasks: list[ReviewTask] = []
+        for stored in self._store.load():
+            try:
+                task = restore(stored.payload)
+            except Exception:
+                logger.exception("[queue] failed to restore task_id=%s", stored.task_id)
+                task = None
+            if task is None:
+                self._store.remove(stored.task_id)
+                continue
+
+            task.task_id = stored.task_id
+            # Rows load oldest first, so a later row supersedes an earlier one
+            older = latest.get(task.dedupe_key) if task.dedupe_key else None
+            if older is not None:
+                task.absorb(older)
+                older.mark_superseded()
+                superseded_tasks.append(older)
+                del restored[older.task_id]
+                self._store.remove(older.task_id)
+                # Persist the coalesced payload in place of the stored one
+                self._store.add(
+                    task.task_id,
+                    task.project_id,
+                    task.payload,
+                    dedupe_key=task.dedupe_key,
+                    review_type=task.review_type,
+                    enqueued_at=stored.enqueued_at,
+                )
+            if task.dedupe_key:
+                latest[task.dedupe_key] = task
+            restored[task.task_id] = task
+
+        # Queue survivors only after deduping so no superseded row starts
+        with self._condition:
+            for task in restored.values():
+                self._push_locked(task)
+            if self._start_workers:
+                self._ensure_workers_locked()
+            self._condition.notify_all()
+
+        for older in superseded_tasks:
+            try:
+                older.report_superseded()
+            except Exception:
+                logger.exception("failed to report superseded review task")
+
+        if restored:
+            logger.info("[queue] recovered %s persisted review tasks", len(restored))
+        return len(restored)
+
+    def close(self) -> None:
+        """Flush persisted queue state; unfinished tasks are kept for recovery."""
+        if self._store is not None:
+            self._store.flush()
+
     def drain_all(self) -> None:
         """Synchronously drain all runnable tasks; intended for tests."""
         while True:
@@ -181,7 +572,7 @@ class ReviewQueue:
             try:
                 task.run()
             finally:
-                self._finish_task(task.project_id)
+                self._finish_task(task)
 
     def wait_for_idle(self, timeout: float = 5.0) -> bool:
         """Wait until all queues are empty and no tasks are running."""
@@ -198,29 +589,24 @@ class ReviewQueue:
         with self._condition:
             self._ensure_workers_locked()
 
-    def _ensure_workers_locked(self) -> None:
-        while len(self._workers) < self.worker_count:
-            index = len(self._workers) + 1
-            thread = threading.Thread(
-                target=self._worker,
-                daemon=True,
-                name=f"review-worker-{index}",
-            )
-            self._workers.append(thread)
-            thread.start()
-
     def _worker(self) -> None:
         logger.info("[queue] worker started")
         while True:
             task = self._wait_for_next_ready()
+            if task is None:
+                logger.info("[queue] worker retired")
+                return
             try:
                 task.run()
             finally:
-                self._finish_task(task.project_id)
+                self._finish_task(task)
 
-    def _wait_for_next_ready(self) -> ReviewTask:
+    def _wait_for_next_ready(self) -> ReviewTask | None:
+        """Return the next task, or None when this worker should retire."""
         with self._condition:
             while True:
+                if self._retire_locked():
+                    return None
                 task = self._pop_next_ready_locked()
                 if task is not None:
                     return task
@@ -230,32 +616,162 @@ class ReviewQueue:
         with self._condition:
             return self._pop_next_ready_locked()
 
+    def _sort_key(self, task: ReviewTask) -> tuple[int, float]:
+        return task_sort_key(
+            task.priority,
+            task.enqueued_at,
+            task.size_hint,
+            aging_seconds=self.aging_seconds,
+            sjf_seconds_per_file=self.sjf_seconds_per_file,
+        )
+
+    def _push_heap_locked(self, task: ReviewTask) -> None:
+        self._push_seq += 1
+        heapq.heappush(
+            self._project_heaps.setdefault(task.project_id, []),
+            (self._sort_key(task), self._push_seq, task.task_id),
+        )
+
+    def _rebuild_heaps_locked(self) -> None:
+        self._project_heaps.clear()
+        for project_queue in self._project_queues.values():
+            for task in project_queue.values():
+                self._push_heap_locked(task)
+        self._ready.clear()
+        self._ready_heap.clear()
+        for project_id in self._project_queues:
+            self._mark_ready_locked(project_id)
+
+    def _head_locked(self, project_id: int) -> tuple[tuple[int, float], ReviewTask] | None:
+        """Return (sort key, task) of a project's next task, dropping stale entries."""
+        heap = self._project_heaps.get(project_id)
+        project_queue = self._project_queues.get(project_id)
+        while heap and project_queue:
+            key, _seq, task_id = heap[0]
+            task = project_queue.get(task_id)
+            if task is not None:
+                return key, task
+            heapq.heappop(heap)
+        return None
+
+    def _push_locked(self, task: ReviewTask) -> None:
+        project_queue = self._project_queues.get(task.project_id)
+        if project_queue is None:
+            project_queue = self._project_queues[task.project_id] = OrderedDict()
+            # A project returning from idle starts at the current virtual time
+            self._project_vtime[task.project_id] = max(
+                self._project_vtime.get(task.project_id, 0.0), self._virtual_clock
+            )
+        task.enqueued_at = time.monotonic()
+        project_queue[task.task_id] = task
+        self._project_weight[task.project_id] = max(0.01, task.weight)
+        self._push_heap_locked(task)
+        self._pending_count += 1
+        if task.dedupe_key:
+            self._dedupe_index[task.dedupe_key] = task
+        self._mark_ready_locked(task.project_id)
+
+    def _remove_pending_locked(self, task: ReviewTask) -> None:
+        """Drop a pending task from its project queue and the dedupe index."""
+        project_queue = self._project_queues.get(task.project_id)
+        if project_queue is None or project_queue.pop(task.task_id, None) is None:
+            return
+        if not project_queue:
+            # A stale ready entry is discarded on the next pop
+            self._project_queues.pop(task.project_id, None)
+            self._project_heaps.pop(task.project_id, None)
+            if self._project_vtime.get(task.project_id, 0.0) <= self._virtual_clock:
+                self._project_vtime.pop(task.project_id, None)
+                self._project_weight.pop(task.project_id, None)
+        if self._dedupe_index.get(task.dedupe_key) is task:
+            del self._dedupe_index[task.dedupe_key]
+        self._pending_count -= 1
+
+    def _ready_rank_locked(
+        self, project_id: int
+    ) -> tuple[int, float, tuple[int, float]] | None:
+        """Return a project's scheduling rank, or None when it cannot run now."""
+        if self._active_by_project.get(project_id, 0) >= self.project_concurrency:
+            return None
+        head = self._head_locked(project_id)
+        if head is None:
+            return None
+        key, _task = head
+        return (
+            effective_class(key, self.aging_seconds),
+            self._project_vtime.get(project_id, self._virtual_clock),
+            key,
+        )
+
+    def _mark_ready_locked(self, project_id: int) -> None:
+        """Mark a project ready if it has work and a free slot."""
+        if project_id not in self._project_queues:
+            return
+        rank = self._ready_rank_locked(project_id)
+        if rank is None:
+            return
+        # A new, better head task needs a fresh entry; a worse rank is
+        # repaired lazily when its entry reaches the top
+        current = self._ready.get(project_id)
+        if current is not None and current <= rank:
+            return
+        self._ready[project_id] = rank
+        self._push_seq += 1
+        heapq.heappush(self._ready_heap, (rank, self._push_seq, project_id))
+
     def _pop_next_ready_locked(self) -> ReviewTask | None:
-        for task in list(self._queue):
-            if task.superseded:
-                self._queue.remove(task)
+        while self._ready_heap:
+            rank, _seq, project_id = self._ready_heap[0]
+            if self._ready.get(project_id) != rank:
+                heapq.heappop(self._ready_heap)
                 continue
-
-            active_for_project = self._active_by_project.get(task.project_id, 0)
-            if active_for_project >= self.project_concurrency:
+            current = self._ready_rank_locked(project_id)
+            if current is None:
+                heapq.heappop(self._ready_heap)
+                del self._ready[project_id]
                 continue
-
-            self._queue.remove(task)
-            self._pending_count -= 1
-            self._active_count += 1
-            self._active_by_project[task.project_id] = active_for_project + 1
-            return task
-
-        return None
-
-    def _finish_task(self, project_id: int) -> None:
+            if current != rank:
+                # Head task superseded or removed since the entry was pushed
+                self._ready[project_id] = current
+                self._push_seq += 1
+                heapq.heapreplace(self._ready_heap, (current, self._push_seq, project_id))
+                continue
+            break
+        else:
+            return None
+
+        heapq.heappop(self._ready_heap)
+        del self._ready[project_id]
+        _key, task = self._head_locked(project_id)
+        now = time.monotonic()
+        QUEUE_WAIT_SECONDS.observe(now - task.enqueued_at, review_type=task.review_type)
+        heapq.heappop(self._project_heaps[project_id])
+        vtime = self._project_vtime.get(project_id, self._virtual_clock)
+        self._virtual_clock = max(self._virtual_clock, vtime)
+        self._project_vtime[project_id] = vtime + 1 / self._project_weight.get(project_id, 1.0)
+        self._remove_pending_locked(task)
+        active_for_project = self._active_by_project.get(project_id, 0)
+        self._active_count += 1
+        self._active_by_project[project_id] = active_for_project + 1
+        self._active_tasks[task.task_id] = task
+        self._mark_ready_locked(project_id)
+        if self._store is not None:
+            self._store.mark_running(task.task_id)
+        return task
+
+    def _finish_task(self, task: ReviewTask) -> None:
         with self._condition:
             self._active_count -= 1
+            self._active_tasks.pop(task.task_id, None)
+            project_id = task.project_id
             active_for_project = self._active_by_project.get(project_id, 0) - 1
             if active_for_project > 0:
                 self._active_by_project[project_id] = active_for_project
             else:
                 self._active_by_project.pop(project_id, None)
+            self._mark_ready_locked(project_id)
+            if self._store is not None:
+                self._store.remove(task.task_id)
             self._condition.notify_all()
 
 
@@ -268,21 +784,33 @@ def get_review_queue(
     *,
     worker_count: int = 3,
     project_concurrency: int = 2,
+    min_workers: int = 0,
+    latency_target: float = 0.0,
+    aging_seconds: float = 600.0,
+    sjf_seconds_per_file: float = 0.0,
+    store_path: str = "",
 ) -> ReviewQueue:
-    """Return the process-global review queue."""
+    """
+    Return the process-global review queue.
+
+    Arguments are only used when the queue is first created; use set_limits
+    to change limits later. An empty store_path keeps the queue in memory.
+    """
     global _review_queue
+    queue = _review_queue
+    if queue is not None:
+        return queue
     with _queue_lock:
         if _review_queue is None:
             _review_queue = ReviewQueue(
                 max_pending=max_pending,
                 worker_count=worker_count,
                 project_concurrency=project_concurrency,
-            )
-        else:
-            _review_queue.set_limits(
-                max_pending=max_pending,
-                worker_count=worker_count,
-                project_concurrency=project_concurrency,
+                min_workers=min_workers,
+                latency_target=latency_target,
+                aging_seconds=aging_seconds,
+                sjf_seconds_per_file=sjf_seconds_per_file,
+                store=ReviewStore(store_path) if store_path else None,
             )
         return _review_queue
 
@@ -0,0 +1,207 @@
+"""SQLite-backed persistence for queued review tasks."""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+_MAX_RETRY_DELAY_SECONDS = 5.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS review_tasks (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id TEXT NOT NULL UNIQUE,
+    project_id TEXT NOT NULL,
+    dedupe_key TEXT NOT NULL DEFAULT '',
+    review_type TEXT NOT NULL DEFAULT '',
+    state TEXT NOT NULL DEFAULT 'pending',
+    payload TEXT NOT NULL,
+    enqueued_at REAL NOT NULL
+)
+"""
+
+
+@dataclass
+class StoredTask:
+    """A persisted review task row."""
+
+    task_id: str
+    state: str
+    payload: dict
+    enqueued_at: float
+
+
+class ReviewStore:
+    """
+    Durable task log with batched, write-behind commits.
+
+    Writes are buffered and committed by a background thread in one
+    transaction per batch, so webhook bursts cost one fsync per batch
+    instead of one per task.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        flush_interval: float = 0.05,
+        batch_size: int = 200,
+    ) -> None:
+        self.path = path
+        self.flush_interval = max(0.0, flush_interval)
+        self.batch_size = max(1, batch_size)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+        self._db_lock = threading.Lock()
+        self._condition = threading.Condition()
+        self._ops: list[tuple[str, tuple]] = []
+        self._submitted = 0
+        self._committed = 0
+        self._closed = False
+        self._writer = threading.Thread(
+            target=self._write_loop,
+            daemon=True,
+            name="review-store-writer",
+        )
+        self._writer.start()
+
+    def add(
+        self,
+        task_id: str,
+        project_id: object,
+        payload: dict,
+        *,
+        dedupe_key: str = "",
+        review_type: str = "",
+        enqueued_at: float | None = None,
+    ) -> None:
+        """Persist a newly accepted pending task."""
+        self._submit(
+            "INSERT OR REPLACE INTO review_tasks "
+            "(task_id, project_id, dedupe_key, review_type, state, payload, enqueued_at) "
+            "VALUES (?, ?, ?, ?, 'pending', ?, ?)",
+            (
+                task_id,
+                str(project_id),
+                dedupe_key,
+                review_type,
+                json.dumps(payload, ensure_ascii=False),
+                time.time() if enqueued_at is None else enqueued_at,
+            ),
+        )
+
+    def mark_running(self, task_id: str) -> None:
+        """Record that a worker picked up the task."""
+        self._submit(
+            "UPDATE review_tasks SET state = 'running' WHERE task_id = ?",
+            (task_id,),
+        )
+
+    def remove(self, task_id: str) -> None:
+        """Forget a finished or superseded task."""
+        self._submit("DELETE FROM review_tasks WHERE task_id = ?", (task_id,))
+
+    def load(self) -> list[StoredTask]:
+        """Return persisted tasks, interrupted running tasks first."""
+        self.flush()
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT task_id, state, payload, enqueued_at FROM review_tasks "
+                "ORDER BY CASE state WHEN 'running' THEN 0 ELSE 1 END, seq"
+            ).fetchall()
+        tasks: list[StoredTask] = []
+        for task_id, state, payload, enqueued_at in rows:
+            try:
+                data = json.loads(payload)
+            except ValueError:
+                logger.warning("[store] dropping unreadable task task_id=%s", task_id)
+                self.remove(task_id)
+                continue
+            tasks.append(StoredTask(task_id, state, data, enqueued_at))
+        return tasks
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Block until all buffered writes are committed.
+
+        Returns False on timeout, including while failed batches are being
+        retried; a failed batch never counts as committed.
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            target = self._submitted
+            self._condition.notify_all()
+            while self._committed < target:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def close(self) -> None:
+        """Flush pending writes and stop the writer thread."""
+        self.flush()
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._writer.join(timeout=5.0)
+        with self._db_lock:
+            self._conn.close()
+
+    def _submit(self, sql: str, params: tuple) -> None:
+        with self._condition:
+            self._ops.append((sql, params))
+            self._submitted += 1
+            if len(self._ops) == 1 or len(self._ops) >= self.batch_size:
+                self._condition.notify_all()
+
+    def _write_loop(self) -> None:
+        retry_delay = 0.0
+        while True:
+            with self._condition:
+                while not self._ops and not self._closed:
+                    self._condition.wait()
+                if self._closed and not self._ops:
+                    return
+                if len(self._ops) < self.batch_size and self.flush_interval:
+                    # Let a burst accumulate into one transaction.
+                    self._condition.wait(self.flush_interval)
+                batch, self._ops = self._ops, []
+
+            try:
+                with self._db_lock, self._conn:
+                    for sql, params in batch:
+                        self._conn.execute(sql, params)
+            except sqlite3.Error:
+                retry_delay = min(_MAX_RETRY_DELAY_SECONDS, retry_delay * 2 or 0.1)
+                logger.exception(
+                    "[store] failed to commit %s writes, retrying in %.1fs",
+                    len(batch),
+                    retry_delay,
+                )
+                retry_at = time.monotonic() + retry_delay
+                with self._condition:
+                    # Keep write order: the failed batch goes before newer writes
+                    self._ops = batch + self._ops
+                    while not self._closed and (remaining := retry_at - time.monotonic()) > 0:
+                        self._condition.wait(remaining)
+                    if self._closed:
+                        logger.error("[store] closing, dropping %s writes", len(self._ops))
+                        return
+                continue
+
+            retry_delay = 0.0
+            with self._condition:
+                self._committed += len(batch)
+                self._condition.notify_all()
@@ -0,0 +1,66 @@
+"""Background dispatcher for GitLab status and comment updates."""
+
+import logging
+import queue
+import threading
+import zlib
+from collections.abc import Callable
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class StatusDispatcher:
+    """
+    Run GitLab reporting calls off the request path.
+
+    Calls are sharded by key onto a fixed set of threads, so updates for the
+    same commit keep their order (queued -> running -> result) while
+    different commits are reported in parallel.
+    """
+
+    def __init__(self, shard_count: int = 4) -> None:
+        self._shards: list[queue.SimpleQueue] = []
+        for index in range(max(1, shard_count)):
+            shard: queue.SimpleQueue = queue.SimpleQueue()
+            thread = threading.Thread(
+                target=self._run_shard,
+                args=(shard,),
+                daemon=True,
+                name=f"status-dispatcher-{index + 1}",
+            )
+            self._shards.append(shard)
+            thread.start()
+
+    def submit(self, key: str, fn: Callable[[], None]) -> Future:
+        """Queue fn behind earlier calls with the same key."""
+        future: Future = Future()
+        shard = self._shards[zlib.crc32(key.encode("utf-8")) % len(self._shards)]
+        shard.put((future, fn))
+        return future
+
+    def _run_shard(self, shard: queue.SimpleQueue) -> None:
+        while True:
+            future, fn = shard.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                fn()
+            except Exception as exc:
+                logger.exception("[dispatcher] GitLab update failed")
+                future.set_exception(exc)
+            else:
+                future.set_result(None)
+
+
+_dispatcher_lock = threading.Lock()
+_dispatcher: StatusDispatcher | None = None
+
+
+def get_status_dispatcher() -> StatusDispatcher:
+    """Return the process-global status dispatcher."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = StatusDispatcher()
+        return _dispatcher
@@ -0,0 +1,374 @@
+"""Span tracing for review tasks, exported as JSON lines and/or OTLP/HTTP JSON."""
+
+import abc
+import contextvars
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from collections.abc import Callable, Iterator, Mapping
+from contextlib import contextmanager
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "code-review-bot"
+# Traces waiting for the OTLP exporter before new ones are dropped
+_OTLP_QUEUE_TRACES = 100
+
+
+class Span:
+    """A timed operation inside one review trace."""
+
+    __slots__ = (
+        "trace",
+        "span_id",
+        "parent_id",
+        "name",
+        "attributes",
+        "start_time",
+        "end_time",
+        "_started",
+        "error",
+    )
+
+    def __init__(self, trace: "_Trace", name: str, parent_id: str, attributes: dict) -> None:
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start_time = time.time()
+        self.end_time = 0.0
+        self._started = time.monotonic()
+        self.error = ""
+
+    def set_attribute(self, key: str, value: object) -> None:
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes: object) -> None:
+        self.attributes.update(attributes)
+
+    def set_error(self, exc: BaseException) -> None:
+        self.error = f"{type(exc).__name__}: {exc}"[:500]
+
+    def _end(self) -> None:
+        self.end_time = self.start_time + (time.monotonic() - self._started)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_time": round(self.start_time, 6),
+            "duration_seconds": round(self.end_time - self.start_time, 6),
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class NoopSpan:
+    """Returned when tracing is disabled or no trace is active."""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: object) -> None:
+        pass
+
+    def set_attributes(self, **attributes: object) -> None:
+        pass
+
+    def set_error(self, exc: BaseException) -> None:
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class _Trace:
+    def __init__(self, exporters: tuple["SpanExporter", ...]) -> None:
+        self.trace_id = uuid.uuid4().hex
+        self.exporters = exporters
+        self.spans: list[Span] = []
+        self.finished = False
+        self.lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        """Record a finished span; the root span flushes the whole trace."""
+        with self.lock:
+            if not self.finished:
+                self.spans.append(span)
+                return
+        # Late span, e.g. a cancelled hedge that ended after the review
+        _export(self.exporters, [span])
+
+    def finish(self, root: Span) -> None:
+        with self.lock:
+            self.spans.append(root)
+            self.finished = True
+            spans, self.spans = self.spans, []
+        _export(self.exporters, spans)
+
+
+def _export(exporters: tuple["SpanExporter", ...], spans: list[Span]) -> None:
+    for exporter in exporters:
+        try:
+            exporter.export(spans)
+        except Exception:
+            logger.exception("[trace] %s failed", type(exporter).__name__)
+
+
+class SpanExporter(abc.ABC):
+    """Destination for finished traces."""
+
+    @abc.abstractmethod
+    def export(self, spans: list[Span]) -> None:
+        """Export the spans of one finished trace."""
+
+    def close(self) -> None:
+        """Flush and release resources; the default has nothing to do."""
+
+
+class JsonlSpanExporter(SpanExporter):
+    """Append one JSON object per span to a file."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def export(self, spans: list[Span]) -> None:
+        lines = "".join(
+            json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n" for span in spans
+        )
+        with self._lock, open(self.path, "a", encoding="utf-8") as handle:
+            handle.write(lines)
+
+
+def _otlp_value(value: object) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(span: Span) -> dict:
+    data = {
+        "traceId": span.trace.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": 1,
+        "startTimeUnixNano": str(int(span.start_time * 1e9)),
+        "endTimeUnixNano": str(int(span.end_time * 1e9)),
+        "attributes": [
+            {"key": key, "value": _otlp_value(value)}
+            for key, value in span.attributes.items()
+            if value is not None
+        ],
+        # STATUS_CODE_OK = 1, STATUS_CODE_ERROR = 2
+        "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+    }
+    if span.parent_id:
+        data["parentSpanId"] = span.parent_id
+    return data
+
+
+class OtlpHttpSpanExporter(SpanExporter):
+    """
+    Send spans to an OTLP/HTTP collector (JSON encoding) at <endpoint>/v1/traces.
+
+    Requests are made from a background thread so reviews never wait on the
+    collector; when it falls behind, whole traces are dropped.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        *,
+        headers: Mapping[str, str] | None = None,
+        timeout: float = 5.0,
+    ) -> None:
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+        self.timeout = timeout
+        self._queue: queue.Queue[list[Span] | None] = queue.Queue(maxsize=_OTLP_QUEUE_TRACES)
+        self._thread = threading.Thread(target=self._send_loop, daemon=True, name="otlp-export")
+        self._thread.start()
+
+    def export(self, spans: list[Span]) -> None:
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            logger.warning("[trace] OTLP export queue full, dropping %s spans", len(spans))
+
+    def close(self) -> None:
+        try:
+            self._queue.put(None, timeout=self.timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout=self.timeout)
+
+    def _send_loop(self) -> None:
+        while True:
+            spans = self._queue.get()
+            if spans is None:
+                return
+            body = {
+                "resourceSpans": [
+                    {
+                        "resource": {
+                            "attributes": [
+                                {"key": "service.name", "value": {"stringValue": SERVICE_NAME}}
+                            ]
+                        },
+                        "scopeSpans": [
+                            {
+                                "scope": {"name": SERVICE_NAME},
+                                "spans": [_otlp_span(span) for span in spans],
+                            }
+                        ],
+                    }
+                ]
+            }
+            try:
+                resp = requests.post(
+                    self.url,
+                    data=json.dumps(body, default=str),
+                    headers=self.headers,
+                    timeout=self.timeout,
+                )
+                if not resp.ok:
+                    logger.warning(
+                        "[trace] OTLP export status=%s: %s", resp.status_code, resp.text[:200]
+                    )
+            except requests.RequestException as exc:
+                logger.warning("[trace] OTLP export failed: %s", exc)
+
+
+_current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar(
+    "current_trace_span", default=None
+)
+
+
+class Tracer:
+    """
+    Process-wide tracer; disabled (and nearly free) until an exporter is set.
+
+    trace() starts a new trace, one per review task. span() nests under the
+    current span of this context and is a no-op outside a trace, so code
+    shared with untraced callers (prefetch, status updates) records nothing.
+    """
+
+    def __init__(self) -> None:
+        self._exporters: tuple[SpanExporter, ...] = ()
+        self._settings: tuple = ()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._exporters)
+
+    def configure(
+        self,
+        *,
+        jsonl_path: str = "",
+        otlp_endpoint: str = "",
+        otlp_headers: Mapping[str, str] | None = None,
+    ) -> None:
+        """Replace the exporters; unchanged settings keep the current ones."""
+        settings = (jsonl_path, otlp_endpoint, tuple(sorted((otlp_headers or {}).items())))
+        with self._lock:
+            if settings == self._settings:
+                return
+            exporters: list[SpanExporter] = []
+            if jsonl_path:
+                exporters.append(JsonlSpanExporter(jsonl_path))
+            if otlp_endpoint:
+                exporters.append(OtlpHttpSpanExporter(otlp_endpoint, headers=otlp_headers))
+            old, self._exporters = self._exporters, tuple(exporters)
+            self._settings = settings
+        for exporter in old:
+            exporter.close()
+        if exporters:
+            logger.info(
+                "[trace] exporting review traces to %s",
+                ", ".join(type(exporter).__name__ for exporter in exporters),
+            )
+
+    @contextmanager
+    def trace(self, name: str, **attributes: object) -> Iterator[Span | NoopSpan]:
+        """Run the block as the root span of a new trace."""
+        exporters = self._exporters
+        if not exporters:
+            yield NOOP_SPAN
+            return
+        root = Span(_Trace(exporters), name, "", attributes)
+        token = _current_span.set(root)
+        try:
+            yield root
+        except BaseException as exc:
+            root.set_error(exc)
+            raise
+        finally:
+            _current_span.reset(token)
+            root._end()
+            root.trace.finish(root)
+
+    @contextmanager
+    def span(self, name: str, **attributes: object) -> Iterator[Span | NoopSpan]:
+        """Run the block as a child of the current span."""
+        parent = _current_span.get()
+        if parent is None:
+            yield NOOP_SPAN
+            return
+        span = Span(parent.trace, name, parent.span_id, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as exc:
+            span.set_error(exc)
+            raise
+        finally:
+            _current_span.reset(token)
+            span._end()
+            span.trace.add(span)
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """Return the process-global tracer."""
+    return _tracer
+
+
+def trace(name: str, **attributes: object):
+    return _tracer.trace(name, **attributes)
+
+
+def span(name: str, **attributes: object):
+    return _tracer.span(name, **attributes)
+
+
+def current_span() -> Span | NoopSpan:
+    """Return the active span, or a no-op span outside a trace."""
+    return _current_span.get() or NOOP_SPAN
+
+
+def bind(fn: Callable) -> Callable:
+    """Carry the current span into fn when it runs on another thread."""
+    if _current_span.get() is None:
+        return fn
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
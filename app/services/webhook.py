@@ -1,20 +1,50 @@
 """Webhook logic: Push / MR parsing and background review."""
 
 import logging
+import threading
+import time
 from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor, wait
 from urllib.parse import urlparse
 
-from app.config import get_config, resolve_claude_skills_root, resolve_repo_workspace
-from app.services import claude_code, gitlab, review_queue
+from app.config import (
+    Config,
+    add_reload_listener,
+    get_config,
+    reload_config,
+    resolve_claude_skills_root,
+    resolve_repo_workspace,
+    resolve_review_cache_db,
+    resolve_review_queue_db,
+    resolve_review_queue_socket,
+)
+from app.services import (
+    claude_code,
+    diff_filter,
+    distributed_queue,
+    gitlab,
+    metrics,
+    model_health,
+    process,
+    queue_ipc,
+    review_cache,
+    review_queue,
+    status_dispatcher,
+    tracing,
+)
 
 logger = logging.getLogger(__name__)
 
+# (cfg, gitlab_token, gitlab_url, api_timeout, review_timeout)
+_WebhookConfig = tuple[Config, str, str, int, int]
+
+
 def _log_webhook_response(status: int, body: str) -> None:
     """Log webhook response at exit."""
     logger.info("webhook response -> status=%d body=%s", status, body)
 
 
-def _get_webhook_config() -> tuple[dict, str, str, int, int] | None:
+def _get_webhook_config() -> _WebhookConfig | None:
     """Return webhook config; None if token is not configured."""
     cfg = get_config()
     token = cfg.get("gitlab_token", "")
@@ -55,6 +85,21 @@ def _reject_invalid_repo_url(repo_url: str, gitlab_url: str) -> tuple[str, int]
     return "Invalid repository URL", 400
 
 
+def _dispatch_status(
+    project_id: int,
+    commit_sha: str,
+    fn: Callable[[], None],
+    *,
+    block: bool = False,
+) -> None:
+    """Run a GitLab update on the background dispatcher, ordered per commit."""
+    future = status_dispatcher.get_status_dispatcher().submit(
+        f"{project_id}:{commit_sha}", tracing.bind(fn)
+    )
+    if block:
+        wait([future])
+
+
 def _report_review_result(
     gitlab_url: str,
     token: str,
@@ -94,75 +139,93 @@ def _build_review_task(
     mr_iid: int | None = None,
     dedupe_key: str = "",
     review_type: str = "review",
+    payload: dict | None = None,
+    on_coalesce: Callable[[review_queue.ReviewTask], None] | None = None,
+    prefetch: Callable[[], None] | None = None,
+    priority: int = 0,
+    weight: float = 1.0,
+    size_hint: int = 0,
 ) -> review_queue.ReviewTask:
-    """Build a queued task that owns GitLab status reporting."""
+    """
+    Build a queued task that owns GitLab status reporting.
+
+    Status updates go through the dispatcher so workers never block on
+    "running"; final results are waited for so they are not lost on exit.
+    """
 
     def _on_start() -> None:
-        gitlab.set_commit_status(
-            gitlab_url,
-            token,
+        _dispatch_status(
             project_id,
             commit_sha,
-            "running",
-            "AI code review in progress...",
-            api_timeout,
+            lambda: gitlab.set_commit_status(
+                gitlab_url,
+                token,
+                project_id,
+                commit_sha,
+                "running",
+                "AI code review in progress...",
+                api_timeout,
+            ),
         )
 
+    def _report(success: bool, description: str, comment_body: str) -> None:
+        with tracing.span("report", success=success):
+            _dispatch_status(
+                project_id,
+                commit_sha,
+                lambda: _report_review_result(
+                    gitlab_url,
+                    token,
+                    project_id,
+                    commit_sha,
+                    success=success,
+                    description=description,
+                    comment_body=comment_body,
+                    api_timeout=api_timeout,
+                    mr_iid=mr_iid,
+                ),
+                block=True,
+            )
+
     def _on_success(result: str) -> None:
         desc = (
             "AI review passed (LGTM)"
             if "LGTM" in result.upper()
             else "AI review done"
         )
-        _report_review_result(
-            gitlab_url,
-            token,
-            project_id,
-            commit_sha,
-            success=True,
-            description=desc,
-            comment_body=comment_formatter(result),
-            api_timeout=api_timeout,
-            mr_iid=mr_iid,
-        )
+        _report(True, desc, comment_formatter(result))
         logger.info("%s review done, status updated.", review_type)
 
-    def _on_timeout() -> None:
-        _report_review_result(
-            gitlab_url,
-            token,
-            project_id,
-            commit_sha,
-            success=False,
-            description="AI review timeout",
-            comment_body="❌ **System Error**: AI review execution timed out",
-            api_timeout=api_timeout,
-            mr_iid=mr_iid,
-        )
+    def _on_timeout(partial: str) -> None:
+        body = "❌ **System Error**: AI review execution timed out"
+        if partial.strip():
+            body += (
+                "\n\nPartial review produced before the timeout:\n\n"
+                + comment_formatter(partial.strip())
+            )
+        _report(False, "AI review timeout", body)
 
     def _on_error(exc: Exception) -> None:
         logger.error("%s review failed: %s", review_type, exc)
-        _report_review_result(
-            gitlab_url,
-            token,
-            project_id,
-            commit_sha,
-            success=False,
-            description="Processing error",
-            comment_body="❌ **System Error**: AI review execution failed",
-            api_timeout=api_timeout,
-            mr_iid=mr_iid,
+        _report(
+            False,
+            "Processing error",
+            "❌ **System Error**: AI review execution failed",
         )
 
     def _on_superseded() -> None:
-        gitlab.set_commit_status(
-            gitlab_url,
-            token,
+        _dispatch_status(
             project_id,
             commit_sha,
-            "success",
-            "AI review skipped: superseded by newer commit",
-            api_timeout,
+            lambda: gitlab.set_commit_status(
+                gitlab_url,
+                token,
+                project_id,
+                commit_sha,
+                "success",
+                "AI review skipped: superseded by newer commit",
+                api_timeout,
+            ),
         )
 
     return review_queue.ReviewTask(
@@ -174,28 +237,397 @@ def _build_review_task(
         on_timeout=_on_timeout,
         on_error=_on_error,
         on_superseded=_on_superseded,
+        on_coalesce=on_coalesce,
+        prefetch=prefetch,
         dedupe_key=dedupe_key,
         review_type=review_type,
         mr_iid=mr_iid,
+        payload=payload or {},
+        priority=priority,
+        weight=weight,
+        size_hint=size_hint,
+    )
+
+
+def _get_review_queue(
+    cfg: Config,
+) -> review_queue.ReviewQueue | distributed_queue.DistributedReviewQueue:
+    """Return the global review queue; cfg is only used when creating it."""
+    limits = {
+        "worker_count": cfg.get("review_workers", 3),
+        "project_concurrency": cfg.get("review_project_max_concurrency", 2),
+        "min_workers": cfg.get("review_workers_min", 0),
+        "latency_target": cfg.get("review_latency_target_seconds", 0),
+        "aging_seconds": cfg.get("review_priority_aging_seconds", 600),
+        "sjf_seconds_per_file": cfg.get("review_sjf_seconds_per_file", 0),
+    }
+    if cfg.get("review_queue_backend", "local") == "shared":
+        return distributed_queue.get_distributed_queue(
+            resolve_review_queue_db(cfg),
+            restore=restore_review_task,
+            node_id=cfg.get("review_node_id", ""),
+            max_pending=cfg.get("review_queue_max", 100),
+            lease_seconds=cfg.get("review_lease_seconds", 60),
+            **limits,
+        )
+    return review_queue.get_review_queue(
+        cfg.get("review_queue_max", 100),
+        store_path=resolve_review_queue_db(cfg),
+        **limits,
+    )
+
+
+def _get_review_cache(cfg: Config) -> review_cache.ReviewCache | None:
+    """Return the global review result cache, or None when disabled."""
+    return review_cache.get_review_cache(
+        resolve_review_cache_db(cfg),
+        ttl_seconds=cfg.get("review_cache_ttl_seconds", 604800),
+        max_entries=cfg.get("review_cache_max_entries", 1000),
+    )
+
+
+def _get_diff_filter(
+    cfg: Config, project_id: object, project_path: str
+) -> diff_filter.DiffFilter:
+    """Return the diff filter for a project, applying per-project overrides."""
+    return diff_filter.diff_filter_for_project(
+        include=cfg.get("review_diff_include", ()),
+        exclude=cfg.get("review_diff_exclude", ()),
+        max_file_bytes=cfg.get("review_diff_max_file_bytes", 0),
+        project_rules=cfg.get("review_diff_project_rules", {}),
+        project_keys=(project_id, project_path),
     )
 
 
+def _task_scheduling(
+    cfg: Config, project_id: object, project_path: str, kind: str
+) -> tuple[int, float]:
+    """
+    Return (priority class, fair-share weight) for a project's task kind.
+
+    review_project_scheduling maps a project id or path to overrides of
+    "mr_priority", "push_priority" and "weight".
+    """
+    rules = cfg.get("review_project_scheduling", {})
+    override: dict = {}
+    for key in (project_id, project_path):
+        if str(key) in rules and isinstance(rules[str(key)], dict):
+            override = rules[str(key)]
+            break
+    priority_key = f"{kind}_priority"
+    try:
+        priority = int(override.get(priority_key, cfg.get(f"review_{priority_key}", 0)))
+        weight = float(override.get("weight", 1.0))
+    except (TypeError, ValueError):
+        logger.warning("[Queue] invalid scheduling override for project %s", project_path)
+        priority, weight = cfg.get(f"review_{priority_key}", 0), 1.0
+    return priority, (weight if weight > 0 else 1.0)
+
+
+def _push_changed_files(data: dict) -> int:
+    """Count distinct files touched by the commits listed in a push event."""
+    paths: set[str] = set()
+    for commit in data.get("commits") or []:
+        for key in ("added", "modified", "removed"):
+            paths.update(commit.get(key) or [])
+    return len(paths)
+
+
+def _claude_limits(cfg: Config) -> process.ProcessLimits:
+    """Return rlimits for Claude Code processes."""
+    return process.ProcessLimits(
+        address_space_mb=cfg.get("claude_rlimit_as_mb", 0),
+        cpu_seconds=cfg.get("claude_rlimit_cpu_seconds", 0),
+        open_files=cfg.get("claude_rlimit_nofile", 0),
+    )
+
+
+def _claude_hedge(cfg: Config) -> claude_code.HedgePolicy | None:
+    """Return the model hedging policy, or None for sequential fallbacks."""
+    percentile = cfg.get("claude_hedge_percentile", 0)
+    if percentile <= 0:
+        return None
+    return claude_code.HedgePolicy(
+        percentile=min(percentile, 100),
+        default_delay=cfg.get("claude_hedge_delay_seconds", 120),
+    )
+
+
+def _apply_queue_limits(cfg: Config) -> None:
+    """Apply reloaded queue limits to the running queue."""
+    _get_review_queue(cfg).set_limits(
+        max_pending=cfg.get("review_queue_max", 100),
+        worker_count=cfg.get("review_workers", 3),
+        project_concurrency=cfg.get("review_project_max_concurrency", 2),
+        min_workers=cfg.get("review_workers_min", 0),
+        latency_target=cfg.get("review_latency_target_seconds", 0),
+        aging_seconds=cfg.get("review_priority_aging_seconds", 600),
+        sjf_seconds_per_file=cfg.get("review_sjf_seconds_per_file", 0),
+    )
+
+
+def _apply_model_health(cfg: Config) -> None:
+    """Apply (reloaded) circuit breaker settings to the model health tracker."""
+    model_health.get_model_health().configure(
+        failure_threshold=cfg.get("claude_breaker_failures", 3),
+        cooldown_seconds=cfg.get("claude_breaker_cooldown_seconds", 300),
+    )
+
+
+def _apply_tracing(cfg: Config) -> None:
+    """Export review traces where TRACE_JSONL_PATH / TRACE_OTLP_ENDPOINT point."""
+    tracing.get_tracer().configure(
+        jsonl_path=cfg.get("trace_jsonl_path", ""),
+        otlp_endpoint=cfg.get("trace_otlp_endpoint", ""),
+        otlp_headers={
+            str(key): str(value) for key, value in cfg.get("trace_otlp_headers", {}).items()
+        },
+    )
+
+
+# Set in the worker daemon, which owns the queue behind REVIEW_QUEUE_SOCKET
+_owns_queue = False
+
+_QUEUE_PENDING = metrics.gauge("review_queue_pending", "Review tasks waiting in the queue.")
+_QUEUE_ACTIVE = metrics.gauge("review_queue_active", "Review tasks running.")
+_QUEUE_ACTIVE_BY_PROJECT = metrics.gauge(
+    "review_queue_active_by_project", "Review tasks running per project.", ("project_id",)
+)
+_QUEUE_WORKER_LIMIT = metrics.gauge(
+    "review_queue_worker_limit", "Current worker limit of this process's pool."
+)
+_QUEUE_REJECTED = metrics.counter(
+    "review_queue_rejected_total",
+    "Review tasks rejected with 429 because the queue was full.",
+    ("review_type",),
+)
+_MODEL_CIRCUIT_OPEN = metrics.gauge(
+    "claude_model_circuit_open",
+    "1 while a model's circuit breaker is open or half-open.",
+    ("model",),
+)
+
+
+def _queue_client(cfg: Config) -> queue_ipc.QueueClient | None:
+    """Return a worker daemon client when this process is an ingress process."""
+    path = resolve_review_queue_socket(cfg)
+    if not path or _owns_queue:
+        return None
+    return queue_ipc.QueueClient(path, timeout=cfg.get("api_timeout", 10))
+
+
+def _forward_reload(cfg: Config) -> None:
+    """Ask the worker daemon to reload too, so queue limits follow /admin/reload."""
+    client = _queue_client(cfg)
+    if client is None:
+        return
+    try:
+        client.call("reload")
+    except queue_ipc.QueueUnavailable as exc:
+        logger.warning("[Queue] reload not forwarded: %s", exc)
+
+
+def start_review_queue() -> None:
+    """Create the review queue and recover tasks persisted before a restart."""
+    client = _queue_client(get_config())
+    if client is not None:
+        logger.info("[Queue] ingress mode, forwarding tasks to %s", client.path)
+        add_reload_listener(_forward_reload)
+        return
+    # No task runs yet: every workspace on disk was left by a crashed process
+    claude_code.sweep_task_workspaces(
+        resolve_repo_workspace(get_config()),
+        timeout=get_config().get("review_timeout", 600),
+    )
+    queue = _get_review_queue(get_config())
+    _apply_model_health(get_config())
+    _apply_tracing(get_config())
+    model_health.get_model_health().add_listener(queue.observe_claude_run)
+    metrics.REGISTRY.add_scrape_hook(_refresh_queue_metrics)
+    add_reload_listener(_apply_queue_limits)
+    add_reload_listener(_apply_model_health)
+    add_reload_listener(_apply_tracing)
+    queue.recover(restore_review_task)
+
+
+def review_status() -> dict:
+    """Return queue depth, running task progress, model health and cache counters."""
+    cfg = get_config()
+    client = _queue_client(cfg)
+    if client is not None:
+        try:
+            status = client.call("status")
+        except queue_ipc.QueueUnavailable as exc:
+            return {"error": str(exc)}
+        status.pop("ok", None)
+        return status
+    status = _get_review_queue(cfg).snapshot()
+    status["models"] = model_health.get_model_health().snapshot()
+    cache = _get_review_cache(cfg)
+    if cache is not None:
+        status["review_cache"] = cache.stats()
+    return status
+
+
+def _refresh_queue_metrics() -> None:
+    """Update queue and model gauges from one snapshot per scrape."""
+    snapshot = _get_review_queue(get_config()).snapshot()
+    active_by_project: dict[str, int] = {}
+    for task in snapshot["active"]:
+        project_id = str(task["project_id"])
+        active_by_project[project_id] = active_by_project.get(project_id, 0) + 1
+    _QUEUE_PENDING.set(snapshot["pending"])
+    _QUEUE_ACTIVE.set(len(snapshot["active"]))
+    _QUEUE_ACTIVE_BY_PROJECT.replace(
+        ({"project_id": project_id}, count) for project_id, count in active_by_project.items()
+    )
+    _QUEUE_WORKER_LIMIT.set(snapshot["workers"]["limit"])
+    _MODEL_CIRCUIT_OPEN.replace(
+        ({"model": model or "default"}, float(state["state"] != model_health.CLOSED))
+        for model, state in model_health.get_model_health().snapshot().items()
+    )
+
+
+def render_metrics() -> str:
+    """Return Prometheus metrics of the process that owns the review queue."""
+    client = _queue_client(get_config())
+    if client is not None:
+        return client.call("metrics")["text"]
+    return metrics.REGISTRY.render()
+
+
+def stop_review_queue() -> None:
+    """Flush queue state and drop pending prefetches before shutdown."""
+    if _queue_client(get_config()) is not None:
+        return
+    _reset_prefetch_pool(get_config())
+    _get_review_queue(get_config()).close()
+    # Flushes traces still queued for the OTLP exporter
+    tracing.get_tracer().configure()
+
+
+def enqueue_review_payload(payload: dict) -> tuple[str, int]:
+    """Rebuild a task forwarded by an ingress process and enqueue it here."""
+    config = _get_webhook_config()
+    if config is None:
+        return "gitlab_token not configured", 500
+    task = restore_review_task(payload)
+    if task is None:
+        return "Unknown review task", 400
+    cfg, token, gitlab_url, api_timeout, _review_timeout = config
+    return _enqueue_review_task(
+        task, cfg, gitlab_url, token, task.project_id, task.commit_sha, api_timeout
+    )
+
+
+def serve_review_queue() -> queue_ipc.QueueServer:
+    """
+    Own the review queue and serve ingress processes on REVIEW_QUEUE_SOCKET.
+
+    Called by the worker daemon (python -m app.worker) instead of the
+    FastAPI lifespan.
+    """
+    global _owns_queue
+    path = resolve_review_queue_socket(get_config())
+    if not path:
+        raise RuntimeError("REVIEW_QUEUE_SOCKET is not set")
+    _owns_queue = True
+    start_review_queue()
+
+    def _enqueue(request: dict) -> dict:
+        body, status = enqueue_review_payload(request.get("payload") or {})
+        return {"body": body, "status": status}
+
+    def _reload(_request: dict) -> dict:
+        reload_config()
+        return {}
+
+    return queue_ipc.QueueServer(
+        path,
+        {
+            "enqueue": _enqueue,
+            "status": lambda _request: review_status(),
+            "metrics": lambda _request: {"text": metrics.REGISTRY.render()},
+            "reload": _reload,
+        },
+    )
+
+
+_prefetch_lock = threading.Lock()
+_prefetch_pool: ThreadPoolExecutor | None = None
+
+
+def _get_prefetch_pool(cfg: Config) -> ThreadPoolExecutor | None:
+    """Return the mirror prefetch pool, or None when prefetch is disabled."""
+    global _prefetch_pool
+    workers = cfg.get("repo_prefetch_workers", 2)
+    if workers <= 0:
+        return None
+    with _prefetch_lock:
+        if _prefetch_pool is None:
+            _prefetch_pool = ThreadPoolExecutor(
+                max_workers=workers,
+                thread_name_prefix="mirror-prefetch",
+            )
+        return _prefetch_pool
+
+
+def _reset_prefetch_pool(_cfg: Config) -> None:
+    """Drop the prefetch pool so the next prefetch uses reloaded limits."""
+    global _prefetch_pool
+    with _prefetch_lock:
+        pool, _prefetch_pool = _prefetch_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False)
+
+
+add_reload_listener(_reset_prefetch_pool)
+
+
+def _schedule_prefetch(task: review_queue.ReviewTask, cfg: Config) -> None:
+    """Warm the mirror for an accepted task while it waits in the queue."""
+    if task.prefetch is None:
+        return
+    pool = _get_prefetch_pool(cfg)
+    if pool is None:
+        return
+
+    def _prefetch() -> None:
+        if task.superseded:
+            return
+        try:
+            task.prefetch()
+        except Exception as exc:
+            # The worker fetches again (and reports errors) when it runs the task
+            logger.warning(
+                "[%s] mirror prefetch failed project_id=%s: %s",
+                task.review_type,
+                task.project_id,
+                exc,
+            )
+
+    try:
+        pool.submit(_prefetch)
+    except RuntimeError:
+        logger.debug("[%s] prefetch pool closed, skipping", task.review_type)
+
+
 def _enqueue_review_task(
     task: review_queue.ReviewTask,
-    queue_max: int,
-    worker_count: int,
-    project_concurrency: int,
+    cfg: Config,
     gitlab_url: str,
     token: str,
     project_id: int,
     commit_sha: str,
     api_timeout: int,
 ) -> tuple[str, int]:
-    """Enqueue a task and set queued status after acceptance."""
+    """Enqueue a task and queue the pending status update after acceptance."""
 
     def _mark_queued() -> None:
-        try:
-            gitlab.set_commit_status(
+        _dispatch_status(
+            project_id,
+            commit_sha,
+            lambda: gitlab.set_commit_status(
                 gitlab_url,
                 token,
                 project_id,
@@ -203,19 +635,26 @@ def _enqueue_review_task(
                 "pending",
                 "AI code review queued...",
                 api_timeout,
-            )
-        except Exception:
-            logger.exception("failed to set queued status")
+            ),
+        )
 
-    queue = review_queue.get_review_queue(
-        queue_max,
-        worker_count=worker_count,
-        project_concurrency=project_concurrency,
-    )
+    client = _queue_client(cfg)
+    if client is not None:
+        try:
+            reply = client.call("enqueue", payload=task.payload)
+        except queue_ipc.QueueUnavailable as exc:
+            logger.error("[Queue] cannot forward task: %s", exc)
+            _log_webhook_response(503, "Review worker unavailable")
+            return "Review worker unavailable", 503
+        return reply["body"], reply["status"]
+
+    queue = _get_review_queue(cfg)
     if not queue.try_enqueue(task, on_accepted=_mark_queued):
+        _QUEUE_REJECTED.inc(review_type=task.review_type)
         _log_webhook_response(429, "Queue full")
         return "Queue full", 429
 
+    _schedule_prefetch(task, cfg)
     _log_webhook_response(202, "Accepted, review queued")
     return "Accepted, review queued", 202
 
@@ -268,7 +707,75 @@ def handle_push_webhook(data: dict) -> tuple[str, int]:
         after_sha[:8],
     )
 
+    payload = {
+        "object_kind": "push",
+        "project_id": project_id,
+        "project_path": project_path,
+        "repo_url": repo_url,
+        "branch": branch,
+        "before_sha": before_sha,
+        "after_sha": after_sha,
+        "changed_files": _push_changed_files(data),
+    }
+    task = _push_review_task(payload, config)
+    return _enqueue_review_task(
+        task,
+        cfg,
+        gitlab_url,
+        token,
+        project_id,
+        after_sha,
+        api_timeout,
+    )
+
+
+def _push_review_task(
+    payload: dict,
+    config: _WebhookConfig,
+) -> review_queue.ReviewTask:
+    """
+    Build a push review task from its serializable payload.
+
+    Pending pushes to the same branch share a dedupe_key; a newer push
+    absorbs the older one's before SHA so one review covers the whole range.
+    """
+    cfg, token, gitlab_url, api_timeout, review_timeout = config
+    project_id = payload["project_id"]
+    project_path = payload["project_path"]
+    repo_url = payload["repo_url"]
+    branch = payload["branch"]
+    after_sha = payload["after_sha"]
+    requested_at = time.monotonic()
+    priority, weight = _task_scheduling(cfg, project_id, project_path, "push")
+
+    def _prefetch() -> None:
+        claude_code.prefetch_mirror(
+            claude_code.build_clone_url(repo_url, token),
+            resolve_repo_workspace(cfg),
+            project_id,
+            hint_branches=[branch],
+            shas=[payload["before_sha"], after_sha],
+            timeout=review_timeout,
+            token=token,
+            mirror_filter=cfg.get("repo_mirror_filter", ""),
+            requested_at=requested_at,
+        )
+
+    def _coalesce(older: review_queue.ReviewTask) -> None:
+        older_before = older.payload.get("before_sha", "")
+        # A branch-creation push has an all-zero before; keep our own range
+        if not claude_code._is_sha(older_before):
+            return
+        logger.info(
+            "[Push] coalescing pending push branch=%s range=%s..%s",
+            branch,
+            older_before[:8],
+            after_sha[:8],
+        )
+        payload["before_sha"] = older_before
+
     def _run() -> str:
+        before_sha = payload["before_sha"]
         clone_url = claude_code.build_clone_url(repo_url, token)
         repo_workspace = resolve_repo_workspace(cfg)
         claude_skills_root = resolve_claude_skills_root(cfg)
@@ -287,9 +794,21 @@ def handle_push_webhook(data: dict) -> tuple[str, int]:
             token=token,
             model_fallbacks=cfg.get("claude_model_fallbacks"),
             retry_delay_seconds=cfg.get("claude_retry_delay_seconds", 2),
+            workspace_mode=cfg.get("repo_workspace_mode", "worktree"),
+            mirror_filter=cfg.get("repo_mirror_filter", ""),
+            requested_at=requested_at,
+            review_cache=_get_review_cache(cfg),
+            chunk_tokens=cfg.get("review_chunk_tokens", 30000),
+            chunk_concurrency=cfg.get("review_chunk_concurrency", 3),
+            diff_filter=_get_diff_filter(cfg, project_id, project_path),
+            output_mode=cfg.get("claude_output_mode", "stream"),
+            stall_timeout=cfg.get("claude_stall_timeout", 180),
+            on_progress=review_queue.current_progress_reporter(),
+            limits=_claude_limits(cfg),
+            hedge=_claude_hedge(cfg),
         )
 
-    task = _build_review_task(
+    return _build_review_task(
         project_id,
         after_sha,
         gitlab_url,
@@ -298,19 +817,14 @@ def handle_push_webhook(data: dict) -> tuple[str, int]:
         _run,
         lambda r: f"🤖 **Code Review Result** (push {branch}):\n\n{r}",
         mr_iid=None,
+        dedupe_key=f"push:{project_id}:{branch}",
         review_type="Push",
-    )
-
-    return _enqueue_review_task(
-        task,
-        cfg.get("review_queue_max", 100),
-        cfg.get("review_workers", 3),
-        cfg.get("review_project_max_concurrency", 2),
-        gitlab_url,
-        token,
-        project_id,
-        after_sha,
-        api_timeout,
+        payload=payload,
+        on_coalesce=_coalesce,
+        prefetch=_prefetch,
+        priority=priority,
+        weight=weight,
+        size_hint=payload.get("changed_files", 0),
     )
 
 
@@ -373,6 +887,58 @@ def handle_mr_webhook(data: dict) -> tuple[str, int]:
         target_branch,
     )
 
+    payload = {
+        "object_kind": "merge_request",
+        "project_id": project_id,
+        "project_path": project_path,
+        "repo_url": repo_url,
+        "mr_iid": mr_iid,
+        "source_branch": source_branch,
+        "target_branch": target_branch,
+        "last_commit_sha": last_commit_sha,
+    }
+    task = _mr_review_task(payload, config)
+    return _enqueue_review_task(
+        task,
+        cfg,
+        gitlab_url,
+        token,
+        project_id,
+        last_commit_sha,
+        api_timeout,
+    )
+
+
+def _mr_review_task(
+    payload: dict,
+    config: _WebhookConfig,
+) -> review_queue.ReviewTask:
+    """Build a merge request review task from its serializable payload."""
+    cfg, token, gitlab_url, api_timeout, review_timeout = config
+    project_id = payload["project_id"]
+    project_path = payload["project_path"]
+    repo_url = payload["repo_url"]
+    mr_iid = payload["mr_iid"]
+    source_branch = payload["source_branch"]
+    target_branch = payload["target_branch"]
+    last_commit_sha = payload["last_commit_sha"]
+    requested_at = time.monotonic()
+    priority, weight = _task_scheduling(cfg, project_id, project_path, "mr")
+
+    def _prefetch() -> None:
+        claude_code.prefetch_mirror(
+            claude_code.build_clone_url(repo_url, token),
+            resolve_repo_workspace(cfg),
+            project_id,
+            fresh_branches=[target_branch],
+            hint_branches=[source_branch],
+            shas=[last_commit_sha],
+            timeout=review_timeout,
+            token=token,
+            mirror_filter=cfg.get("repo_mirror_filter", ""),
+            requested_at=requested_at,
+        )
+
     def _run() -> str:
         clone_url = claude_code.build_clone_url(repo_url, token)
         repo_workspace = resolve_repo_workspace(cfg)
@@ -386,14 +952,27 @@ def handle_mr_webhook(data: dict) -> tuple[str, int]:
             claude_cmd=cfg.get("claude_cmd", "claude"),
             project_id=project_id,
             workspace_key=f"mr-{mr_iid}-{last_commit_sha[:12]}",
+            head_sha=last_commit_sha,
             skills_root=claude_skills_root,
             timeout=review_timeout,
             token=token,
             model_fallbacks=cfg.get("claude_model_fallbacks"),
             retry_delay_seconds=cfg.get("claude_retry_delay_seconds", 2),
+            workspace_mode=cfg.get("repo_workspace_mode", "worktree"),
+            mirror_filter=cfg.get("repo_mirror_filter", ""),
+            requested_at=requested_at,
+            review_cache=_get_review_cache(cfg),
+            chunk_tokens=cfg.get("review_chunk_tokens", 30000),
+            chunk_concurrency=cfg.get("review_chunk_concurrency", 3),
+            diff_filter=_get_diff_filter(cfg, project_id, project_path),
+            output_mode=cfg.get("claude_output_mode", "stream"),
+            stall_timeout=cfg.get("claude_stall_timeout", 180),
+            on_progress=review_queue.current_progress_reporter(),
+            limits=_claude_limits(cfg),
+            hedge=_claude_hedge(cfg),
         )
 
-    task = _build_review_task(
+    return _build_review_task(
         project_id,
         last_commit_sha,
         gitlab_url,
@@ -404,16 +983,30 @@ def handle_mr_webhook(data: dict) -> tuple[str, int]:
         mr_iid=mr_iid,
         dedupe_key=f"mr:{project_id}:{mr_iid}",
         review_type="MR",
+        payload=payload,
+        prefetch=_prefetch,
+        priority=priority,
+        weight=weight,
     )
 
-    return _enqueue_review_task(
-        task,
-        cfg.get("review_queue_max", 100),
-        cfg.get("review_workers", 3),
-        cfg.get("review_project_max_concurrency", 2),
-        gitlab_url,
-        token,
-        project_id,
-        last_commit_sha,
-        api_timeout,
-    )
+
+_TASK_BUILDERS: dict[
+    str,
+    Callable[[dict, _WebhookConfig], review_queue.ReviewTask],
+] = {
+    "push": _push_review_task,
+    "merge_request": _mr_review_task,
+}
+
+
+def restore_review_task(payload: dict) -> review_queue.ReviewTask | None:
+    """Rebuild a review task from a persisted payload; None if not possible."""
+    builder = _TASK_BUILDERS.get(payload.get("object_kind", ""))
+    if builder is None:
+        logger.warning("[Queue] unknown persisted task kind=%s", payload.get("object_kind"))
+        return None
+    config = _get_webhook_config()
+    if config is None:
+        logger.error("[Queue] gitlab_token not configured, cannot restore task")
+        return None
+    return builder(payload, config)
@@ -0,0 +1,42 @@
+"""
+Review worker daemon.
+
+Owns the review queue and serves webhook ingress processes over the Unix
+socket at REVIEW_QUEUE_SOCKET, so any number of uvicorn workers share one
+queue, worker pool and dedupe index. Run with: python -m app.worker
+"""
+
+import logging
+import signal
+import threading
+
+from app.config import get_config, reload_config
+from app.logging_config import setup_logging
+from app.services import webhook as webhook_service
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    setup_logging(get_config().get("log_file", ""))
+    server = webhook_service.serve_review_queue()
+    stopping = threading.Event()
+
+    def _stop(signum: int, _frame) -> None:
+        logger.info("Stopping review worker on signal %s", signum)
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, lambda _signum, _frame: reload_config())
+
+    logger.info("Review worker ready socket=%s", server.path)
+    while not stopping.wait(1.0):
+        pass
+    server.close()
+    webhook_service.stop_review_queue()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Offline end-to-end load benchmark: python -m benchmarks.run --help"""
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Stand-in for the Claude Code CLI, used as CLAUDE_CMD by the benchmark.
+
+Reads the review input from stdin, waits FAKE_CLAUDE_LATENCY seconds
+(+/- FAKE_CLAUDE_JITTER as a fraction) and prints a short review, as text
+or stream-json depending on --output-format. Fails with probability
+FAKE_CLAUDE_FAILURE_RATE, and always for models in FAKE_CLAUDE_FAIL_MODELS.
+"""
+
+import json
+import os
+import random
+import sys
+import time
+
+
+def _arg(name: str) -> str:
+    args = sys.argv[1:]
+    return args[args.index(name) + 1] if name in args[:-1] else ""
+
+
+def _emit(event: dict) -> None:
+    print(json.dumps(event), flush=True)
+
+
+def main() -> int:
+    diff = sys.stdin.read()
+    model = _arg("--model") or "default"
+    stream = _arg("--output-format") == "stream-json"
+    latency = float(os.environ.get("FAKE_CLAUDE_LATENCY", "2"))
+    jitter = float(os.environ.get("FAKE_CLAUDE_JITTER", "0.3"))
+    failure_rate = float(os.environ.get("FAKE_CLAUDE_FAILURE_RATE", "0"))
+    fail_models = {m for m in os.environ.get("FAKE_CLAUDE_FAIL_MODELS", "").split(",") if m}
+
+    deadline = time.monotonic() + max(0.0, latency * random.uniform(1 - jitter, 1 + jitter))
+    if stream:
+        _emit({"type": "system", "subtype": "init", "model": model})
+    while (remaining := deadline - time.monotonic()) > 0:
+        time.sleep(min(1.0, remaining))
+        if stream:
+            tool_use = {"type": "tool_use", "name": "Read"}
+            _emit({"type": "assistant", "message": {"content": [tool_use]}})
+
+    if model in fail_models or random.random() < failure_rate:
+        if stream:
+            _emit({"type": "result", "is_error": True, "result": "fake failure"})
+        print(f"fake failure ({model})", file=sys.stderr)
+        return 1
+
+    review = f"## 审查总结\n\nLGTM ({model}, {len(diff)} bytes reviewed)"
+    if stream:
+        _emit({"type": "assistant", "message": {"content": [{"type": "text", "text": review}]}})
+        _emit({"type": "result", "subtype": "success", "is_error": False, "result": review})
+    else:
+        print(review)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
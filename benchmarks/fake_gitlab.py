@@ -0,0 +1,134 @@
+"""Local GitLab stand-in: records API calls and serves bare repos over smart HTTP."""
+
+import json
+import os
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+@dataclass
+class ApiCall:
+    at: float
+    path: str
+    body: dict
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self._git_http_backend(b"")
+
+    def do_POST(self) -> None:
+        body = self._read_body()
+        if not self.path.startswith("/api/v4/"):
+            self._git_http_backend(body)
+            return
+        if self.server.api_latency > 0:
+            time.sleep(self.server.api_latency)
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            payload = {}
+        with self.server.lock:
+            self.server.calls.append(ApiCall(time.time(), self.path, payload))
+        reply = b'{"id": 1}'
+        self.send_response(201)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+    def _read_body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b";")[0], 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return b"".join(chunks)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _git_http_backend(self, body: bytes) -> None:
+        """Run git http-backend as a CGI for clone and fetch requests."""
+        path, _, query = self.path.partition("?")
+        env = {
+            **os.environ,
+            "GIT_PROJECT_ROOT": self.server.git_root,
+            "GIT_HTTP_EXPORT_ALL": "1",
+            "PATH_INFO": path,
+            "QUERY_STRING": query,
+            "REQUEST_METHOD": self.command,
+            "CONTENT_TYPE": self.headers.get("Content-Type", ""),
+            "CONTENT_LENGTH": str(len(body)),
+            "REMOTE_ADDR": self.client_address[0],
+            "HTTP_CONTENT_ENCODING": self.headers.get("Content-Encoding", ""),
+            "GIT_PROTOCOL": self.headers.get("Git-Protocol", ""),
+        }
+        result = subprocess.run(["git", "http-backend"], input=body, env=env, capture_output=True)
+        head, separator, payload = result.stdout.partition(b"\r\n\r\n")
+        if not separator:
+            head, _, payload = result.stdout.partition(b"\n\n")
+        status, headers = 200, []
+        for line in head.decode("latin-1").splitlines():
+            name, _, value = line.partition(":")
+            if name.lower() == "status":
+                status = int(value.split()[0])
+            elif name:
+                headers.append((name, value.strip()))
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    git_root = ""
+    api_latency = 0.0
+    calls: list[ApiCall]
+    lock: threading.Lock
+
+
+class FakeGitLab:
+    """
+    Serve GitLab API POSTs and git smart HTTP for repos under git_root.
+
+    API calls are answered 201 after api_latency seconds and recorded with
+    their arrival time, so the driver can tell when a review was reported.
+    """
+
+    def __init__(self, git_root: str, *, api_latency: float = 0.0) -> None:
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.git_root = git_root
+        self._server.api_latency = api_latency
+        self._server.calls = []
+        self._server.lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True, name="fake-gitlab"
+        )
+        self._thread.start()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def calls(self) -> list[ApiCall]:
+        with self._server.lock:
+            return list(self._server.calls)
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,140 @@
+"""Local bare git repos and GitLab webhook payloads for the benchmark."""
+
+import os
+import random
+import subprocess
+from dataclasses import dataclass, field
+
+_COMMITTER = "Bench <bench@example.com> 1700000000 +0000"
+GROUP = "bench"
+
+
+@dataclass
+class BenchBranch:
+    name: str
+    sha: str
+    changed_paths: list[str]
+
+
+@dataclass
+class BenchRepo:
+    project_id: int
+    path: str
+    main_sha: str
+    branches: list[BenchBranch] = field(default_factory=list)
+
+    @property
+    def path_with_namespace(self) -> str:
+        return f"{GROUP}/{os.path.basename(self.path)[: -len('.git')]}"
+
+
+def _data(text: str) -> bytes:
+    raw = text.encode("utf-8")
+    return b"data %d\n" % len(raw) + raw + b"\n"
+
+
+def _file_content(index: int, lines: int, extra: str = "") -> str:
+    body = "".join(f"value_{index}_{n} = {n}\n" for n in range(lines))
+    return f"# generated file {index}\n{body}{extra}"
+
+
+def _fast_import_stream(
+    files: int, lines: int, branches: int, changed_files: int, seed: int
+) -> bytes:
+    """Build a git fast-import stream: main plus one commit per branch."""
+    rng = random.Random(seed)
+    chunks = [b"commit refs/heads/main\nmark :1\n", f"committer {_COMMITTER}\n".encode()]
+    chunks.append(_data("initial import"))
+    for index in range(files):
+        chunks.append(f"M 644 inline src/module_{index}.py\n".encode())
+        chunks.append(_data(_file_content(index, lines)))
+    for branch in range(branches):
+        chunks.append(f"commit refs/heads/bench-{branch}\n".encode())
+        chunks.append(f"committer {_COMMITTER}\n".encode())
+        chunks.append(_data(f"bench change {branch}"))
+        chunks.append(b"from :1\n")
+        for index in sorted(rng.sample(range(files), min(changed_files, files))):
+            extra = f"changed_in_branch_{branch} = {rng.randrange(1 << 30)}\n"
+            chunks.append(f"M 644 inline src/module_{index}.py\n".encode())
+            chunks.append(_data(_file_content(index, lines, extra)))
+    return b"".join(chunks)
+
+
+def create_repo(
+    root: str,
+    project_id: int,
+    *,
+    files: int,
+    lines: int,
+    branches: int,
+    changed_files: int,
+) -> BenchRepo:
+    """Create <root>/bench/project<id>.git with main and branches bench-0..N-1."""
+    path = os.path.join(root, GROUP, f"project{project_id}.git")
+    os.makedirs(path, exist_ok=True)
+    subprocess.run(["git", "init", "--bare", "-q", "-b", "main", path], check=True)
+    subprocess.run(
+        ["git", "fast-import", "--quiet"],
+        cwd=path,
+        input=_fast_import_stream(files, lines, branches, changed_files, seed=project_id),
+        check=True,
+    )
+    refs = subprocess.run(
+        ["git", "for-each-ref", "--format=%(refname:short) %(objectname)", "refs/heads"],
+        cwd=path,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.split()
+    shas = dict(zip(refs[::2], refs[1::2]))
+    repo = BenchRepo(project_id=project_id, path=path, main_sha=shas["main"])
+    for branch in range(branches):
+        name = f"bench-{branch}"
+        changed = subprocess.run(
+            ["git", "diff", "--name-only", "main", name],
+            cwd=path,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.split()
+        repo.branches.append(BenchBranch(name, shas[name], changed))
+    return repo
+
+
+def mr_event(repo: BenchRepo, branch: BenchBranch, iid: int, base_url: str) -> dict:
+    """Merge request "open" event for branch -> main."""
+    http_url = f"{base_url}/{repo.path_with_namespace}.git"
+    return {
+        "object_kind": "merge_request",
+        "project": {
+            "id": repo.project_id,
+            "path_with_namespace": repo.path_with_namespace,
+            "http_url_to_repo": http_url,
+        },
+        "object_attributes": {
+            "iid": iid,
+            "action": "open",
+            "state": "opened",
+            "source_branch": branch.name,
+            "target_branch": "main",
+            "last_commit": {"id": branch.sha},
+            "source": {"git_http_url": http_url},
+        },
+    }
+
+
+def push_event(repo: BenchRepo, branch: BenchBranch, base_url: str) -> dict:
+    """Push event moving branch from main to its bench commit."""
+    return {
+        "object_kind": "push",
+        "ref": f"refs/heads/{branch.name}",
+        "before": repo.main_sha,
+        "after": branch.sha,
+        "checkout_sha": branch.sha,
+        "project": {
+            "id": repo.project_id,
+            "path_with_namespace": repo.path_with_namespace,
+            "http_url": f"{base_url}/{repo.path_with_namespace}.git",
+        },
+        "commits": [{"id": branch.sha, "modified": branch.changed_paths}],
+    }
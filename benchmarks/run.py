@@ -0,0 +1,354 @@
+"""
+End-to-end load benchmark against a local service, fake GitLab and fake Claude.
+
+    python -m benchmarks.run --events 200 --rate 5 --repos 4 --claude-latency 2
+
+Starts the service (python -m app.main) with review tracing enabled, sends
+MR / push webhooks at the target rate and waits until every accepted review
+has posted its final commit status. Reports webhook response time, queue
+wait, end-to-end latency and per-stage p50/p95/p99 from the trace spans,
+plus throughput and the 429 rate. Service settings not set here (e.g.
+REVIEW_WORKERS) are taken from the environment as usual.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.fake_gitlab import FakeGitLab
+from benchmarks.payloads import create_repo, mr_event, push_event
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_FAKE_CLAUDE = os.path.join(_ROOT, "benchmarks", "fake_claude.py")
+_SECRET = "bench-secret"
+_STAGES = (
+    "mirror",
+    "diff",
+    "workspace",
+    "claude",
+    "claude.run",
+    "report",
+    "gitlab.post",
+)
+
+
+def _parse_args(argv: list[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=100, help="webhooks to send")
+    parser.add_argument("--rate", type=float, default=5.0, help="webhooks per second")
+    parser.add_argument("--mr-ratio", type=float, default=0.5, help="share of MR events")
+    parser.add_argument("--repos", type=int, default=4, help="projects to spread events over")
+    parser.add_argument("--files", type=int, default=200, help="files per repo")
+    parser.add_argument("--file-lines", type=int, default=50, help="lines per file")
+    parser.add_argument("--changed-files", type=int, default=5, help="files changed per event")
+    parser.add_argument(
+        "--claude-latency", type=float, default=2.0, help="mean fake Claude run seconds"
+    )
+    parser.add_argument("--claude-jitter", type=float, default=0.3, help="latency jitter fraction")
+    parser.add_argument("--claude-failure-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--claude-fail-models", default="", help="models that always fail, comma-separated"
+    )
+    parser.add_argument("--models", default="sonnet,haiku", help="CLAUDE_MODEL_FALLBACKS")
+    parser.add_argument(
+        "--gitlab-latency", type=float, default=0.05, help="fake GitLab API seconds"
+    )
+    parser.add_argument(
+        "--drain-timeout", type=float, default=600.0, help="seconds to wait for reviews"
+    )
+    parser.add_argument("--review-cache", action="store_true", help="keep the review cache on")
+    parser.add_argument("--workdir", default="", help="keep repos, logs and traces here (must be new or empty)")
+    parser.add_argument("--json", default="", help="also write the report to this file")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+    # Repos, queue/cache DBs and traces of an earlier run would be reused
+    if args.workdir and os.path.isdir(args.workdir) and os.listdir(args.workdir):
+        parser.error(f"--workdir {args.workdir} is not empty; pass a new or empty directory")
+    return args
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of values (which must be non-empty)."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def _summary(values: list[float]) -> dict:
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "p50": round(_percentile(values, 50), 3),
+        "p95": round(_percentile(values, 95), 3),
+        "p99": round(_percentile(values, 99), 3),
+        "max": round(max(values), 3),
+    }
+
+
+def _build_events(args: argparse.Namespace, base_url: str, git_root: str) -> list[dict]:
+    branches_per_repo = math.ceil(args.events / args.repos)
+    repos = [
+        create_repo(
+            git_root,
+            project_id,
+            files=args.files,
+            lines=args.file_lines,
+            branches=branches_per_repo,
+            changed_files=args.changed_files,
+        )
+        for project_id in range(1, args.repos + 1)
+    ]
+    rng = random.Random(args.seed)
+    events = []
+    for index in range(args.events):
+        repo = repos[index % args.repos]
+        branch_index = index // args.repos
+        branch = repo.branches[branch_index]
+        if rng.random() < args.mr_ratio:
+            events.append(mr_event(repo, branch, branch_index + 1, base_url))
+        else:
+            events.append(push_event(repo, branch, base_url))
+    return events
+
+
+def _event_sha(event: dict) -> str:
+    if event["object_kind"] == "push":
+        return event["after"]
+    return event["object_attributes"]["last_commit"]["id"]
+
+
+def _start_service(args: argparse.Namespace, workdir: str, gitlab_url: str) -> tuple:
+    skills = os.path.join(workdir, "skills")
+    os.makedirs(os.path.join(skills, ".claude", "skills", "git-review"), exist_ok=True)
+    skill = os.path.join(skills, ".claude", "skills", "git-review", "SKILL.md")
+    with open(skill, "w", encoding="utf-8") as handle:
+        handle.write("# git-review (benchmark stub)\n")
+    port = _free_port()
+    env = {
+        **os.environ,
+        "HOST": "127.0.0.1",
+        "PORT": str(port),
+        "GITLAB_URL": gitlab_url,
+        "GITLAB_TOKEN": "bench-token",
+        "GITLAB_WEBHOOK_SECRET": _SECRET,
+        "REPO_WORKSPACE": os.path.join(workdir, "workspace"),
+        "CLAUDE_CMD": _FAKE_CLAUDE,
+        "CLAUDE_SKILLS_ROOT": skills,
+        "CLAUDE_MODEL_FALLBACKS": args.models,
+        "CLAUDE_RETRY_DELAY_SECONDS": "0",
+        "REVIEW_QUEUE_SOCKET": "",
+        "TRACE_JSONL_PATH": os.path.join(workdir, "traces.jsonl"),
+        "TRACE_OTLP_ENDPOINT": "",
+        "LOG_FILE": os.path.join(workdir, "app.log"),
+        "FAKE_CLAUDE_LATENCY": str(args.claude_latency),
+        "FAKE_CLAUDE_JITTER": str(args.claude_jitter),
+        "FAKE_CLAUDE_FAILURE_RATE": str(args.claude_failure_rate),
+        "FAKE_CLAUDE_FAIL_MODELS": args.claude_fail_models,
+    }
+    if not args.review_cache:
+        env["REVIEW_CACHE_DB"] = ""
+    with open(os.path.join(workdir, "service.err"), "w") as stderr:
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "app.main"],
+            cwd=_ROOT,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=stderr,
+        )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"service exited, see {workdir}/service.err")
+        try:
+            if requests.get(f"{url}/health", timeout=1).ok:
+                return proc, url
+        except requests.RequestException:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("service did not become healthy in 30s")
+
+
+def _send_events(url: str, events: list[dict], rate: float) -> list[dict]:
+    """Send events open-loop at rate per second; return one record per event."""
+    records: list[dict] = [{} for _ in events]
+    session_local = threading.local()
+
+    def _send(index: int) -> None:
+        session = getattr(session_local, "session", None)
+        if session is None:
+            session = session_local.session = requests.Session()
+        sent = time.time()
+        try:
+            resp = session.post(
+                f"{url}/webhook",
+                json=events[index],
+                headers={"X-Gitlab-Token": _SECRET},
+                timeout=30,
+            )
+            status = resp.status_code
+        except requests.RequestException:
+            status = 0
+        records[index] = {
+            "sha": _event_sha(events[index]),
+            "kind": events[index]["object_kind"],
+            "sent": sent,
+            "status": status,
+            "response_seconds": time.time() - sent,
+        }
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=32, thread_name_prefix="bench-send") as pool:
+        for index in range(len(events)):
+            delay = started + index / rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(_send, index)
+    return records
+
+
+def _final_statuses(gitlab: FakeGitLab) -> dict[str, float]:
+    """Return sha -> time of its final (success / failed) commit status."""
+    finals: dict[str, float] = {}
+    for call in gitlab.calls():
+        if "/statuses/" not in call.path:
+            continue
+        if call.body.get("state") not in ("success", "failed"):
+            continue
+        if "superseded" in call.body.get("description", ""):
+            continue
+        finals.setdefault(call.path.rsplit("/", 1)[-1], call.at)
+    return finals
+
+
+def _wait_for_reviews(gitlab: FakeGitLab, shas: set[str], timeout: float) -> dict[str, float]:
+    deadline = time.monotonic() + timeout
+    while True:
+        finals = _final_statuses(gitlab)
+        if shas <= finals.keys() or time.monotonic() >= deadline:
+            return finals
+        time.sleep(0.5)
+
+
+def _read_spans(path: str) -> list[dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+def _report(records: list[dict], finals: dict[str, float], spans: list[dict]) -> dict:
+    statuses = Counter(record["status"] for record in records)
+    accepted = [record for record in records if record["status"] == 202]
+    sent_at = {record["sha"]: record["sent"] for record in accepted}
+    done = {sha: at for sha, at in finals.items() if sha in sent_at}
+
+    roots = [span for span in spans if not span["parent_id"]]
+    outcomes = Counter(root["attributes"].get("outcome", "") for root in roots)
+    queue_wait = [
+        root["start_time"] - sent_at[root["attributes"]["commit_sha"]]
+        for root in roots
+        if root["attributes"].get("commit_sha") in sent_at
+    ]
+    stages = {name: [] for name in _STAGES}
+    for span in spans:
+        if span["name"] in stages:
+            stages[span["name"]].append(span["duration_seconds"])
+
+    first_sent = min((record["sent"] for record in records), default=0.0)
+    last_done = max(done.values(), default=first_sent)
+    elapsed = max(last_done - first_sent, 1e-9)
+    return {
+        "sent": len(records),
+        "responses": {str(status): count for status, count in sorted(statuses.items())},
+        "rejected_429_rate": round(statuses.get(429, 0) / max(1, len(records)), 4),
+        "completed": len(done),
+        "outcomes": dict(outcomes),
+        "throughput_per_second": round(len(done) / elapsed, 3),
+        "latency_seconds": {
+            "webhook_response": _summary([record["response_seconds"] for record in records]),
+            "queue_wait": _summary(queue_wait),
+            "end_to_end": _summary([at - sent_at[sha] for sha, at in done.items()]),
+            "review_task": _summary([root["duration_seconds"] for root in roots]),
+            **{name: _summary(values) for name, values in stages.items()},
+        },
+    }
+
+
+def _print_report(report: dict) -> None:
+    print(
+        f"sent {report['sent']}  responses {report['responses']}  "
+        f"429 rate {report['rejected_429_rate']:.1%}"
+    )
+    print(
+        f"completed {report['completed']}  outcomes {report['outcomes']}  "
+        f"throughput {report['throughput_per_second']} reviews/s"
+    )
+    print(f"\n{'latency (s)':<18}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for name, summary in report["latency_seconds"].items():
+        if not summary["count"]:
+            print(f"{name:<18}{0:>7}")
+            continue
+        print(
+            f"{name:<18}{summary['count']:>7}{summary['p50']:>10}{summary['p95']:>10}"
+            f"{summary['p99']:>10}{summary['max']:>10}"
+        )
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _parse_args(argv)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="review-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    git_root = os.path.join(workdir, "git")
+    gitlab = FakeGitLab(git_root, api_latency=args.gitlab_latency)
+    proc = None
+    try:
+        print(f"generating {args.repos} repos and {args.events} events in {workdir}")
+        events = _build_events(args, gitlab.url, git_root)
+        proc, url = _start_service(args, workdir, gitlab.url)
+        print(f"sending {args.events} webhooks at {args.rate}/s to {url}")
+        records = _send_events(url, events, args.rate)
+        accepted = {record["sha"] for record in records if record["status"] == 202}
+        print(f"waiting for {len(accepted)} accepted reviews")
+        finals = _wait_for_reviews(gitlab, accepted, args.drain_timeout)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        gitlab.close()
+
+    report = _report(records, finals, _read_spans(os.path.join(workdir, "traces.jsonl")))
+    print()
+    _print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+    if not args.workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0 if report["completed"] == len(accepted) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
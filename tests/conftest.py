@@ -0,0 +1,95 @@
+"""Shared fixtures: a local GitLab API stub with scriptable responses."""
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+@dataclass
+class ApiCall:
+    at: float
+    path: str
+    status: int
+
+
+@dataclass
+class ScriptedResponse:
+    status: int
+    headers: dict[str, str] = field(default_factory=dict)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        with self.server.lock:
+            scripted = self.server.script.popleft() if self.server.script else None
+            status = scripted.status if scripted else 201
+            self.server.calls.append(ApiCall(time.time(), self.path, status))
+        reply = b'{"id": 1}' if status < 400 else b'{"message": "scripted error"}'
+        self.send_response(status)
+        for name, value in (scripted.headers if scripted else {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    calls: list[ApiCall]
+    script: deque[ScriptedResponse]
+    lock: threading.Lock
+
+
+class GitLabStub:
+    """
+    Answer GitLab API POSTs with 201 and record when each arrived.
+
+    Responses queued with script() are returned first, in order.
+    """
+
+    def __init__(self) -> None:
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.calls = []
+        self._server.script = deque()
+        self._server.lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True, name="gitlab-stub"
+        )
+        self._thread.start()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def script(self, *responses: ScriptedResponse) -> None:
+        """Answer the next API calls with these responses instead of 201."""
+        with self._server.lock:
+            self._server.script.extend(responses)
+
+    def calls(self) -> list[ApiCall]:
+        with self._server.lock:
+            return list(self._server.calls)
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join(timeout=5)
+
+
+@pytest.fixture
+def gitlab():
+    server = GitLabStub()
+    yield server
+    server.close()
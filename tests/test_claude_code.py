@@ -0,0 +1,55 @@
+"""Running the Claude Code CLI."""
+
+import stat
+import time
+
+import pytest
+
+from app.services import claude_code
+
+
+@pytest.fixture
+def skills_root(tmp_path):
+    skill = tmp_path / "skills" / ".claude" / "skills" / "git-review"
+    skill.mkdir(parents=True)
+    (skill / "SKILL.md").write_text("# git-review\n")
+    return str(tmp_path / "skills")
+
+
+def _fake_claude(tmp_path, body: str) -> str:
+    path = tmp_path / "claude"
+    path.write_text(f"#!/bin/sh\n{body}\n")
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return str(path)
+
+
+def _run(cmd: str, repo_path: str, skills_root: str, timeout: int, **kwargs) -> str:
+    return claude_code._run_claude_cmd(
+        cmd,
+        "review",
+        "",
+        repo_path,
+        timeout,
+        secrets=[],
+        skills_root=skills_root,
+        output_mode="text",
+        **kwargs,
+    )
+
+
+def test_returns_review_text(tmp_path, skills_root):
+    cmd = _fake_claude(tmp_path, "cat >/dev/null; echo 'looks good'")
+
+    assert _run(cmd, str(tmp_path), skills_root, 10).strip() == "looks good"
+
+
+def test_closed_stdout_still_times_out(tmp_path, skills_root):
+    # Prints, closes stdout, then keeps running past the deadline
+    cmd = _fake_claude(tmp_path, "echo partial; exec >&-; sleep 30")
+
+    started = time.monotonic()
+    with pytest.raises(claude_code._ClaudeTimeout) as excinfo:
+        _run(cmd, str(tmp_path), skills_root, 1)
+
+    assert time.monotonic() - started < 5
+    assert "partial" in excinfo.value.output
@@ -0,0 +1,71 @@
+"""AIMD worker limit."""
+
+import time
+
+from app.services.concurrency import AimdLimit
+from app.services.review_queue import ReviewQueue
+
+
+def test_limit_starts_within_bounds():
+    assert AimdLimit(initial=10, minimum=2, maximum=6).value == 6
+    assert AimdLimit(initial=0, minimum=2, maximum=6).value == 2
+
+
+def test_successes_increase_by_about_one_per_round():
+    limit = AimdLimit(initial=2, minimum=1, maximum=8)
+
+    for _ in range(2):
+        limit.sample(ok=True, seconds=1, now=100)
+
+    assert limit.value == 2
+    limit.sample(ok=True, seconds=1, now=100)
+    assert limit.value == 3
+
+
+def test_failure_halves_the_limit_down_to_the_minimum():
+    limit = AimdLimit(initial=8, minimum=3, maximum=8)
+
+    assert limit.sample(ok=False, seconds=1, now=100) == 4
+    assert limit.sample(ok=False, seconds=1, now=200) == 3
+
+
+def test_slow_run_counts_as_congestion():
+    limit = AimdLimit(initial=8, minimum=1, maximum=8, latency_target=30)
+
+    assert limit.sample(ok=True, seconds=10, now=100) == 8
+    assert limit.sample(ok=True, seconds=45, now=200) == 4
+
+
+def test_runs_started_before_a_decrease_do_not_decrease_again():
+    limit = AimdLimit(initial=8, minimum=1, maximum=8)
+
+    limit.sample(ok=False, seconds=50, now=100)
+    # Started at 60, before the decrease at 100: same congestion event
+    assert limit.sample(ok=False, seconds=50, now=110) == 4
+    # Started at 105, after it
+    assert limit.sample(ok=False, seconds=5, now=110) == 2
+
+
+def test_pool_workers_follow_the_limit():
+    queue = ReviewQueue(worker_count=4, min_workers=1)
+    assert queue.snapshot()["workers"]["threads"] == 4
+
+    queue.observe_claude_run("sonnet", False, 1.0)
+
+    deadline = time.monotonic() + 5
+    while queue.snapshot()["workers"]["threads"] > 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert queue.snapshot()["workers"] == {
+        "limit": 2,
+        "threads": 2,
+        "max": 4,
+        "adaptive": True,
+    }
+
+
+def test_pool_without_min_workers_is_fixed():
+    queue = ReviewQueue(worker_count=3, start_workers=False)
+
+    queue.observe_claude_run("sonnet", False, 1.0)
+
+    assert queue.snapshot()["workers"]["limit"] == 3
@@ -0,0 +1,61 @@
+"""Splitting large diffs into review chunks."""
+
+from app.services.diff_chunks import estimate_tokens, split_diff, split_files
+
+
+def _file(name: str, hunks: int = 1, lines: int = 4) -> str:
+    header = (
+        f"diff --git a/{name} b/{name}\n"
+        "index 1111111..2222222 100644\n"
+        f"--- a/{name}\n"
+        f"+++ b/{name}\n"
+    )
+    added = "".join(f"+line {i}\n" for i in range(lines))
+    body = "".join(
+        f"@@ -{n * 10},1 +{n * 10},{lines} @@\n{added}" for n in range(hunks)
+    )
+    return header + body
+
+
+def test_estimate_tokens_rounds_up():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcde") == 2
+
+
+def test_small_diff_is_one_chunk():
+    diff = _file("a.py") + _file("b.py")
+
+    assert split_diff(diff, 10_000) == [diff]
+    assert split_diff(diff, 0) == [diff]
+
+
+def test_split_files_keeps_leading_text():
+    diff = "From abc\n" + _file("a.py") + _file("b.py")
+
+    assert split_files(diff) == ["From abc\n", _file("a.py"), _file("b.py")]
+
+
+def test_whole_files_are_packed_in_order():
+    files = [_file(f"{name}.py") for name in "abcd"]
+    budget = estimate_tokens(files[0] + files[1])
+
+    chunks = split_diff("".join(files), budget)
+
+    assert chunks == [files[0] + files[1], files[2] + files[3]]
+
+
+def test_large_file_is_split_at_hunks_with_its_header():
+    big = _file("big.py", hunks=6)
+    header = big[: big.index("@@")]
+
+    chunks = split_diff(big, estimate_tokens(big) // 3)
+
+    assert len(chunks) > 1
+    assert all(chunk.startswith(header) for chunk in chunks)
+    assert "".join(chunk[len(header) :] for chunk in chunks) == big[len(header) :]
+
+
+def test_single_hunk_is_never_split():
+    big = _file("big.py", hunks=1, lines=200)
+
+    assert split_diff(big, 10) == [big]
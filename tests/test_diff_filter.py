@@ -0,0 +1,119 @@
+"""Path and size rules for the reviewed diff."""
+
+import subprocess
+
+import pytest
+
+from app.services.claude_code import _filtered_diff
+from app.services.diff_filter import (
+    DiffFilter,
+    diff_filter_for_project,
+    drop_unreviewable,
+)
+
+
+def test_pathspecs_follow_gitignore_conventions():
+    diff_filter = DiffFilter(
+        include=("src/",), exclude=("*.min.js", "/build", "a/b.txt")
+    )
+
+    assert diff_filter.pathspecs() == [
+        ":(glob)**/src/**",
+        ":(exclude,glob)**/*.min.js",
+        ":(exclude,glob)build",
+        ":(exclude,glob)a/b.txt",
+    ]
+
+
+def test_project_rules_override_global_values():
+    rules = {"group/app": {"exclude": "docs/, *.md", "max_file_bytes": 10}}
+
+    diff_filter = diff_filter_for_project(
+        include=["src/"],
+        exclude=["vendor/"],
+        max_file_bytes=1000,
+        project_rules=rules,
+        project_keys=[42, "group/app"],
+    )
+
+    assert diff_filter == DiffFilter(
+        include=("src/",), exclude=("docs/", "*.md"), max_file_bytes=10
+    )
+
+
+def test_drop_unreviewable_removes_binary_and_oversized_files():
+    text = "diff --git a/a.py b/a.py\n+x\n"
+    binary = (
+        "diff --git a/logo.png b/logo.png\n"
+        "Binary files a/logo.png and b/logo.png differ\n"
+    )
+    large = "diff --git a/big.txt b/big.txt\n" + "+line\n" * 50
+
+    diff, skipped = drop_unreviewable(text + binary + large, 100)
+
+    assert diff == text
+    assert [path for path, _reason in skipped] == ["logo.png", "big.txt"]
+
+
+def _git(repo, *args: str) -> None:
+    subprocess.run(["git", "-C", str(repo), *args], check=True, capture_output=True)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    _git(tmp_path, "init", "-q")
+    _git(tmp_path, "config", "user.email", "test@example.com")
+    _git(tmp_path, "config", "user.name", "test")
+    (tmp_path / "README.md").write_text("base\n")
+    _git(tmp_path, "add", "-A")
+    _git(tmp_path, "commit", "-qm", "base")
+    files = {
+        "src/app.py": "print('hi')\n",
+        "src/vendor/lib.js": "lib()\n",
+        "web/app.min.js": "a()\n",
+        "build/out.txt": "out\n",
+        "src/build/keep.txt": "keep\n",
+        "big.txt": "x" * 500 + "\n",
+    }
+    for path, content in files.items():
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_text(content)
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG\0\0\0")
+    _git(tmp_path, "add", "-A")
+    _git(tmp_path, "commit", "-qm", "change")
+    return str(tmp_path)
+
+
+def _reviewed_paths(diff: str) -> list[str]:
+    return [
+        line.split(" b/", 1)[1]
+        for line in diff.splitlines()
+        if line.startswith("diff --git ")
+    ]
+
+
+def test_filtered_diff_applies_path_and_size_rules(repo):
+    diff_filter = DiffFilter(
+        exclude=("vendor/", "*.min.js", "/build"), max_file_bytes=300
+    )
+
+    diff, skipped = _filtered_diff(
+        repo, "HEAD~1..HEAD", diff_filter, timeout=10, secrets=[]
+    )
+
+    assert _reviewed_paths(diff) == ["src/app.py", "src/build/keep.txt"]
+    assert sorted(path for path, _reason in skipped) == [
+        "big.txt",
+        "build/out.txt",
+        "logo.png",
+        "src/vendor/lib.js",
+        "web/app.min.js",
+    ]
+
+
+def test_filtered_diff_with_include_only(repo):
+    diff, _skipped = _filtered_diff(
+        repo, "HEAD~1..HEAD", DiffFilter(include=("*.py",)), timeout=10, secrets=[]
+    )
+
+    assert _reviewed_paths(diff) == ["src/app.py"]
@@ -0,0 +1,180 @@
+"""DistributedReviewQueue superseding and leases on a shared SQLite file."""
+
+import json
+import time
+
+import pytest
+
+from app.services.distributed_queue import DistributedReviewQueue
+from app.services.review_queue import ReviewTask
+
+_superseded: list[str] = []
+_errors: list[str] = []
+
+
+def _task(payload: dict) -> ReviewTask:
+    def on_coalesce(older: ReviewTask) -> None:
+        payload["before"] = older.payload["before"]
+
+    return ReviewTask(
+        project_id=payload.get("project_id", 1),
+        commit_sha=payload["after"],
+        run_review=lambda: "",
+        on_start=lambda: None,
+        on_success=lambda result: None,
+        on_timeout=lambda output: None,
+        on_error=lambda exc: _errors.append(payload["after"]),
+        on_superseded=lambda: _superseded.append(payload["after"]),
+        on_coalesce=on_coalesce,
+        dedupe_key=payload.get("key", ""),
+        payload=payload,
+    )
+
+
+def _replica(tmp_path, node_id: str, **kwargs) -> DistributedReviewQueue:
+    return DistributedReviewQueue(
+        str(tmp_path / "shared.db"),
+        restore=_task,
+        node_id=node_id,
+        start_workers=False,
+        **kwargs,
+    )
+
+
+@pytest.fixture
+def queue(tmp_path):
+    _superseded.clear()
+    _errors.clear()
+    queue = _replica(tmp_path, "a")
+    yield queue
+    queue.close()
+
+
+def _payloads(queue: DistributedReviewQueue) -> list[dict]:
+    return [
+        json.loads(payload)
+        for (payload,) in queue._query(
+            "SELECT payload FROM shared_review_tasks ORDER BY enqueued_at"
+        )
+    ]
+
+
+def test_supersedes_and_coalesces_pending_task(queue):
+    accepted = []
+
+    def on_accepted() -> None:
+        # Runs after the commit, outside the write transaction
+        accepted.append((queue._conn.in_transaction, queue.pending_count))
+
+    assert queue.try_enqueue(_task({"key": "push:main", "before": "a", "after": "b"}))
+    newer = _task({"key": "push:main", "before": "b", "after": "c"})
+    assert queue.try_enqueue(newer, on_accepted=on_accepted)
+
+    assert accepted == [(False, 1)]
+    assert _superseded == ["b"]
+    assert _payloads(queue) == [{"key": "push:main", "before": "a", "after": "c"}]
+
+
+def test_absorbs_a_task_another_replica_queued_meanwhile(queue, tmp_path, monkeypatch):
+    other = _replica(tmp_path, "b")
+    query = queue._query
+    raced = []
+
+    def racing_query(sql, params=()):
+        rows = query(sql, params)
+        if "dedupe_key" in sql and not raced:
+            raced.append(True)
+            other.try_enqueue(_task({"key": "push:main", "before": "a", "after": "b"}))
+        return rows
+
+    monkeypatch.setattr(queue, "_query", racing_query)
+
+    assert queue.try_enqueue(_task({"key": "push:main", "before": "b", "after": "c"}))
+
+    other.close()
+    assert _superseded == ["b"]
+    assert _payloads(queue) == [{"key": "push:main", "before": "a", "after": "c"}]
+
+
+def _expire_leases(queue: DistributedReviewQueue) -> None:
+    with queue._transaction() as conn:
+        conn.execute("UPDATE shared_review_tasks SET lease_expires = 0")
+
+
+def test_project_limit_holds_across_replicas(queue, tmp_path):
+    other = _replica(tmp_path, "b", project_concurrency=1)
+    queue.project_concurrency = 1
+    for project_id, after in ((1, "p1-a"), (1, "p1-b"), (2, "p2")):
+        queue.try_enqueue(_task({"project_id": project_id, "after": after}))
+
+    first, _ = queue._claim()
+    second, _ = other._claim()
+
+    assert (first.commit_sha, second.commit_sha) == ("p1-a", "p2")
+    assert queue._claim() is None
+    assert other._claim() is None
+    other.close()
+
+
+def test_finishing_deletes_the_leased_row(queue):
+    queue.try_enqueue(_task({"after": "x"}))
+
+    task, lease_id = queue._claim()
+    queue._finish(task, lease_id)
+
+    assert queue.pending_count == 0
+    assert queue.wait_for_idle(timeout=1)
+
+
+def test_expired_lease_is_claimed_by_another_replica(queue, tmp_path):
+    other = _replica(tmp_path, "b")
+    queue.try_enqueue(_task({"after": "x"}))
+    task, stale_lease = queue._claim()
+    _expire_leases(queue)
+
+    reclaimed, lease_id = other._claim()
+
+    assert reclaimed.task_id == task.task_id
+    # The original owner finishing late must not drop the re-claimed row
+    assert not queue._delete_leased(task.task_id, stale_lease)
+    assert other._delete_leased(task.task_id, lease_id)
+    other.close()
+
+
+def test_task_out_of_attempts_is_abandoned(tmp_path):
+    _errors.clear()
+    queue = _replica(tmp_path, "a", max_attempts=1)
+    other = _replica(tmp_path, "b", max_attempts=1)
+    queue.try_enqueue(_task({"after": "x"}))
+    queue._claim()
+    _expire_leases(queue)
+
+    assert other._claim() is None
+    assert _errors == ["x"]
+    assert other.wait_for_idle(timeout=1)
+    queue.close()
+    other.close()
+
+
+def test_recover_releases_this_nodes_leases(queue, tmp_path):
+    queue.try_enqueue(_task({"after": "x"}))
+    queue._claim()
+    restarted = _replica(tmp_path, "a")
+
+    assert restarted.recover() == 1
+    task, _ = restarted._claim()
+    assert task.commit_sha == "x"
+    restarted.close()
+
+
+def test_heartbeat_renews_running_leases(tmp_path):
+    queue = _replica(tmp_path, "a", lease_seconds=3)
+    queue.try_enqueue(_task({"after": "x"}))
+    queue._claim()
+    _expire_leases(queue)
+
+    time.sleep(1.3)
+
+    (expires,) = queue._query("SELECT lease_expires FROM shared_review_tasks")[0]
+    assert expires > time.time()
+    queue.close()
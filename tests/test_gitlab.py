@@ -0,0 +1,201 @@
+"""GitLabClient retries, backoff and pacing against a local GitLab stub."""
+
+import email.utils
+import threading
+import time
+
+import requests
+
+from app.services.gitlab import GitLabClient, _retry_after_seconds, _TokenBucket
+from tests.conftest import GitLabStub, ScriptedResponse
+
+
+def _status_url(gitlab: GitLabStub, sha: str = "abc") -> str:
+    return f"{gitlab.url}/api/v4/projects/1/statuses/{sha}"
+
+
+def _client(**kwargs) -> GitLabClient:
+    kwargs.setdefault("backoff_seconds", 0.01)
+    kwargs.setdefault("rate_per_second", 0)
+    return GitLabClient(**kwargs)
+
+
+def _response(**headers: str) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = 429
+    resp.headers.update(headers)
+    return resp
+
+
+def test_retry_after_seconds():
+    assert _retry_after_seconds(_response(**{"Retry-After": "2.5"})) == 2.5
+    assert _retry_after_seconds(_response(**{"Retry-After": "-1"})) == 0.0
+
+
+def test_retry_after_http_date():
+    date = email.utils.formatdate(time.time() + 30, usegmt=True)
+
+    delay = _retry_after_seconds(_response(**{"Retry-After": date}))
+
+    assert 28 <= delay <= 30
+
+
+def test_retry_after_falls_back_to_ratelimit_reset():
+    reset = str(time.time() + 10)
+
+    assert 8 <= _retry_after_seconds(_response(**{"RateLimit-Reset": reset})) <= 10
+    assert (
+        _retry_after_seconds(
+            _response(**{"Retry-After": "soon", "RateLimit-Reset": reset})
+        )
+        >= 8
+    )
+
+
+def test_retry_after_without_usable_headers():
+    assert _retry_after_seconds(_response()) is None
+    assert _retry_after_seconds(_response(**{"RateLimit-Reset": "later"})) is None
+
+
+def test_token_bucket_allows_a_burst_then_paces():
+    bucket = _TokenBucket(20, capacity=5)
+
+    started = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    burst = time.monotonic() - started
+    for _ in range(4):
+        bucket.acquire()
+
+    assert burst < 0.05
+    assert time.monotonic() - started >= 0.15
+
+
+def test_token_bucket_zero_rate_never_blocks():
+    bucket = _TokenBucket(0)
+
+    started = time.monotonic()
+    for _ in range(1000):
+        bucket.acquire()
+
+    assert time.monotonic() - started < 0.1
+
+
+def test_token_bucket_pause_holds_back_acquire():
+    bucket = _TokenBucket(1000)
+    bucket.pause_until(time.monotonic() + 0.3)
+    bucket.pause_until(time.monotonic())  # an earlier deadline never shortens a pause
+
+    started = time.monotonic()
+    bucket.acquire()
+
+    assert time.monotonic() - started >= 0.25
+
+
+def test_exhausted_quota_pauses_the_bucket(gitlab):
+    client = _client(rate_per_second=1000)
+    gitlab.script(
+        ScriptedResponse(201, {"RateLimit-Remaining": "0", "Retry-After": "0.4"})
+    )
+
+    client.post(_status_url(gitlab), "token", {})
+    client.post(_status_url(gitlab), "token", {})
+
+    first, second = gitlab.calls()
+    assert second.at - first.at >= 0.35
+
+
+def test_retries_429_then_succeeds(gitlab):
+    gitlab.script(ScriptedResponse(429))
+
+    resp = _client().post(_status_url(gitlab), "token", {"state": "pending"})
+
+    assert resp.status_code == 201
+    assert [call.status for call in gitlab.calls()] == [429, 201]
+
+
+def test_retries_503_for_non_idempotent_posts(gitlab):
+    gitlab.script(ScriptedResponse(503), ScriptedResponse(503))
+
+    resp = _client().post(_status_url(gitlab), "token", {}, idempotent=False)
+
+    assert resp.status_code == 201
+    assert [call.status for call in gitlab.calls()] == [503, 503, 201]
+
+
+def test_does_not_retry_500_for_non_idempotent_posts(gitlab):
+    gitlab.script(ScriptedResponse(500))
+
+    resp = _client().post(_status_url(gitlab), "token", {}, idempotent=False)
+
+    assert resp.status_code == 500
+    assert len(gitlab.calls()) == 1
+
+
+def test_honours_retry_after_seconds(gitlab):
+    gitlab.script(ScriptedResponse(429, {"Retry-After": "0.5"}))
+
+    _client().post(_status_url(gitlab), "token", {})
+
+    first, second = gitlab.calls()
+    assert second.at - first.at >= 0.45
+
+
+def test_honours_ratelimit_reset(gitlab):
+    reset = time.time() + 0.6
+    gitlab.script(ScriptedResponse(429, {"RateLimit-Reset": f"{reset:.3f}"}))
+
+    _client().post(_status_url(gitlab), "token", {})
+
+    assert gitlab.calls()[1].at >= reset - 0.05
+
+
+def test_gives_up_after_max_retries(gitlab):
+    gitlab.script(*(ScriptedResponse(503) for _ in range(5)))
+
+    resp = _client(max_retries=2).post(_status_url(gitlab), "token", {})
+
+    assert resp.status_code == 503
+    assert len(gitlab.calls()) == 3
+
+
+def test_token_bucket_paces_concurrent_callers(gitlab):
+    client = _client(rate_per_second=20)
+    threads = [
+        threading.Thread(
+            target=lambda: [
+                client.post(_status_url(gitlab), "token", {}) for _ in range(10)
+            ]
+        )
+        for _ in range(4)
+    ]
+
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # 40 requests, a full bucket of 20, then 20 more at 20/s
+    assert len(gitlab.calls()) == 40
+    assert time.monotonic() - started >= 0.9
+
+
+def test_429_pauses_every_caller(gitlab):
+    client = _client(rate_per_second=1000)
+    gitlab.script(ScriptedResponse(429, {"Retry-After": "0.5"}))
+    first = threading.Thread(
+        target=client.post, args=(_status_url(gitlab, "a"), "token", {})
+    )
+    first.start()
+    while not gitlab.calls():
+        time.sleep(0.01)
+    time.sleep(0.1)  # let the client read the 429 and pause the bucket
+
+    client.post(_status_url(gitlab, "b"), "token", {})
+    first.join()
+
+    throttled = gitlab.calls()[0]
+    other = next(call for call in gitlab.calls() if call.path.endswith("/b"))
+    assert throttled.status == 429
+    assert other.at - throttled.at >= 0.45
@@ -0,0 +1,100 @@
+"""Per-model circuit breakers."""
+
+import pytest
+
+from app.services import model_health
+from app.services.model_health import CLOSED, HALF_OPEN, OPEN, ModelHealth
+
+_MODELS = ("sonnet", "haiku", "opus")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(model_health.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def health(clock):
+    return ModelHealth(failure_threshold=2, cooldown_seconds=60)
+
+
+def _state(health: ModelHealth, model: str) -> str:
+    return health.snapshot()[model]["state"]
+
+
+def test_consecutive_failures_open_the_circuit(health):
+    health.record_failure("sonnet", "boom")
+    assert health.select(_MODELS) == list(_MODELS)
+
+    health.record_failure("sonnet", "boom")
+
+    assert _state(health, "sonnet") == OPEN
+    assert health.select(_MODELS) == ["haiku", "opus"]
+
+
+def test_success_resets_the_failure_count(health):
+    health.record_failure("sonnet")
+    health.record_success("sonnet")
+    health.record_failure("sonnet")
+
+    assert _state(health, "sonnet") == CLOSED
+
+
+def test_cooldown_lets_one_probe_through(health, clock):
+    health.record_failure("sonnet")
+    health.record_failure("sonnet")
+    clock[0] += 61
+
+    assert health.select(_MODELS) == list(_MODELS)
+    assert _state(health, "sonnet") == HALF_OPEN
+    # Only one task probes at a time
+    assert health.select(_MODELS) == ["haiku", "opus"]
+
+
+def test_probe_outcome_closes_or_reopens(health, clock):
+    for _ in range(2):
+        health.record_failure("sonnet")
+        health.record_failure("haiku")
+    clock[0] += 61
+    health.select(_MODELS)
+
+    health.record_success("sonnet")
+    health.record_failure("haiku")
+
+    assert _state(health, "sonnet") == CLOSED
+    assert _state(health, "haiku") == OPEN
+    assert health.select(_MODELS) == ["sonnet", "opus"]
+
+
+def test_lost_probe_is_retried_after_another_cooldown(health, clock):
+    health.record_failure("sonnet")
+    health.record_failure("sonnet")
+    clock[0] += 61
+    health.select(_MODELS)
+
+    clock[0] += 61
+
+    assert health.select(_MODELS) == list(_MODELS)
+
+
+def test_all_open_still_tries_every_model(health):
+    for model in _MODELS:
+        health.record_failure(model)
+        health.record_failure(model)
+
+    assert health.select(_MODELS) == list(_MODELS)
+
+
+def test_zero_threshold_disables_breakers_but_notifies_listeners():
+    health = ModelHealth(failure_threshold=0)
+    seen = []
+    health.add_listener(lambda model, ok, seconds: seen.append((model, ok, seconds)))
+
+    for _ in range(5):
+        health.record_failure("sonnet", seconds=1.5)
+
+    assert health.select(_MODELS) == list(_MODELS)
+    assert health.snapshot() == {}
+    assert seen == [("sonnet", False, 1.5)] * 5
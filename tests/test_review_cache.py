@@ -0,0 +1,98 @@
+"""Review cache key and SQLite result store."""
+
+import os
+
+import pytest
+
+from app.services.review_cache import ReviewCache, review_cache_key, skills_tree_hash
+
+_DIFF = """\
+diff --git a/app.py b/app.py
+index 1111111..2222222 100644
+--- a/app.py
++++ b/app.py
+@@ -10,2 +10,3 @@ def main():
+     run()
++    log()
+"""
+
+
+def _key(**overrides) -> str:
+    args = {
+        "project_id": 1,
+        "diff": _DIFF,
+        "prompt": "review",
+        "models": ("sonnet", "haiku"),
+        "skills_hash": "skills",
+    }
+    args.update(overrides)
+    return review_cache_key(**args)
+
+
+def test_key_ignores_blob_ids_of_a_rebased_patch():
+    rebased = _DIFF.replace("1111111..2222222", "3333333..4444444")
+
+    assert _key(diff=rebased) == _key()
+
+
+def test_key_changes_when_hunks_move():
+    moved = _DIFF.replace("@@ -10,2 +10,3 @@", "@@ -20,2 +20,3 @@")
+
+    assert _key(diff=moved) != _key()
+
+
+@pytest.mark.parametrize(
+    "override",
+    [
+        {"project_id": 2},
+        {"prompt": "review strictly"},
+        {"models": ("haiku", "sonnet")},
+        {"skills_hash": "changed"},
+        {"diff": _DIFF.replace("log()", "trace()")},
+    ],
+)
+def test_key_covers_every_input(override):
+    assert _key(**override) != _key()
+
+
+def test_skills_hash_follows_file_content(tmp_path):
+    skill = tmp_path / "SKILL.md"
+    skill.write_text("v1")
+    before = skills_tree_hash(str(tmp_path))
+
+    skill.write_text("v2")
+    os.utime(skill, ns=(0, skill.stat().st_mtime_ns + 10**9))
+
+    assert skills_tree_hash(str(tmp_path)) != before
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ReviewCache(str(tmp_path / "cache.db"), ttl_seconds=0, max_entries=2)
+
+
+def test_put_then_get(cache):
+    cache.put("k", "LGTM")
+
+    assert cache.get("k") == "LGTM"
+    assert cache.get("other") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = ReviewCache(str(tmp_path / "cache.db"), ttl_seconds=60)
+    cache._put("k", "LGTM", 0.0)
+
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted(cache):
+    cache._put("a", "A", 1.0)
+    cache._put("b", "B", 2.0)
+    cache._get("a", 3.0)
+    cache._put("c", "C", 4.0)
+
+    assert cache.get("a") == "A"
+    assert cache.get("b") is None
+    assert cache.get("c") == "C"
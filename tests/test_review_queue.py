@@ -0,0 +1,276 @@
+"""ReviewQueue scheduling, superseding and recovery."""
+
+import pytest
+
+from app.services import review_queue
+from app.services.review_queue import (
+    ReviewQueue,
+    ReviewTask,
+    effective_class,
+    task_sort_key,
+)
+from app.services.review_store import ReviewStore
+
+
+def _task(project_id: int = 1, *, dedupe_key: str = "", **kwargs) -> ReviewTask:
+    kwargs.setdefault("payload", {"object_kind": "test", "project_id": project_id})
+    kwargs.setdefault("run_review", lambda: "")
+    return ReviewTask(
+        project_id=project_id,
+        commit_sha="abc",
+        on_start=lambda: None,
+        on_success=lambda result: None,
+        on_timeout=lambda output: None,
+        on_error=lambda exc: None,
+        dedupe_key=dedupe_key,
+        **kwargs,
+    )
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ReviewStore(str(tmp_path / "queue.db"), flush_interval=0)
+    yield store
+    store.close()
+
+
+def test_recover_supersedes_rows_with_the_same_dedupe_key(store):
+    superseded = []
+
+    def restore(payload: dict) -> ReviewTask:
+        def on_coalesce(older: ReviewTask) -> None:
+            payload["before"] = older.payload["before"]
+
+        return _task(
+            dedupe_key=payload.get("key", ""),
+            payload=payload,
+            on_coalesce=on_coalesce,
+            on_superseded=lambda: superseded.append(payload["after"]),
+        )
+
+    store.add(
+        "running", 1, {"key": "mr:1", "before": "a", "after": "b"}, dedupe_key="mr:1"
+    )
+    store.mark_running("running")
+    store.add(
+        "pending", 1, {"key": "mr:1", "before": "b", "after": "c"}, dedupe_key="mr:1"
+    )
+    store.add("other", 1, {"before": "x", "after": "y"})
+    queue = ReviewQueue(start_workers=False, store=store)
+
+    assert queue.recover(restore) == 2
+
+    first = queue._pop_next_ready()
+    second = queue._pop_next_ready()
+    assert {first.task_id, second.task_id} == {"pending", "other"}
+    assert superseded == ["b"]
+    rows = {task.task_id: task.payload for task in store.load()}
+    assert rows == {
+        "pending": {"key": "mr:1", "before": "a", "after": "c"},
+        "other": {"before": "x", "after": "y"},
+    }
+
+
+def test_accepted_tasks_are_persisted_until_finished(store):
+    queue = ReviewQueue(start_workers=False, store=store)
+    queue.try_enqueue(_task(1))
+    queue.try_enqueue(_task(2))
+
+    running = queue._pop_next_ready()
+    store.flush()
+    states = {task.task_id: task.state for task in store.load()}
+    assert states[running.task_id] == "running"
+    assert sorted(states.values()) == ["pending", "running"]
+
+    queue._finish_task(running)
+    assert running.task_id not in {task.task_id for task in store.load()}
+
+
+def test_recover_requeues_running_tasks_first(store):
+    store.add("pending", 1, {"n": 1})
+    store.add("running", 1, {"n": 2})
+    store.mark_running("running")
+    queue = ReviewQueue(start_workers=False, project_concurrency=1, store=store)
+
+    assert queue.recover(lambda payload: _task(1, payload=payload)) == 2
+
+    assert queue._pop_next_ready().task_id == "running"
+
+
+def test_recover_drops_rows_that_cannot_be_restored(store):
+    store.add("gone", 1, {"n": 1})
+    queue = ReviewQueue(start_workers=False, store=store)
+
+    assert queue.recover(lambda payload: None) == 0
+    assert store.load() == []
+
+
+def _drain(queue: ReviewQueue) -> list[ReviewTask]:
+    order = []
+    while (task := queue._pop_next_ready()) is not None:
+        order.append(task)
+        queue._finish_task(task)
+    return order
+
+
+def test_project_concurrency_caps_running_tasks_per_project():
+    queue = ReviewQueue(start_workers=False, project_concurrency=1)
+    first, second, other = _task(1), _task(1), _task(2)
+    for task in (first, second, other):
+        queue.try_enqueue(task)
+
+    assert queue._pop_next_ready() is first
+    assert queue._pop_next_ready() is other
+    assert queue._pop_next_ready() is None
+
+    queue._finish_task(first)
+    assert queue._pop_next_ready() is second
+
+
+def test_projects_take_turns():
+    queue = ReviewQueue(start_workers=False)
+    for project_id in (1, 1, 1, 2, 2, 3):
+        queue.try_enqueue(_task(project_id))
+
+    assert [task.project_id for task in _drain(queue)] == [1, 2, 3, 1, 2, 1]
+
+
+def test_full_queue_rejects_new_tasks():
+    queue = ReviewQueue(max_pending=2, start_workers=False)
+    accepted = []
+
+    assert queue.try_enqueue(_task(1), on_accepted=lambda: accepted.append(1))
+    assert queue.try_enqueue(_task(2), on_accepted=lambda: accepted.append(2))
+    assert not queue.try_enqueue(_task(3), on_accepted=lambda: accepted.append(3))
+
+    assert accepted == [1, 2]
+    assert queue.pending_count == 2
+
+
+def test_worker_threads_run_every_task():
+    queue = ReviewQueue(worker_count=2)
+    done = []
+    for project_id in (1, 1, 2, 3):
+        queue.try_enqueue(
+            _task(project_id, run_review=lambda p=project_id: done.append(p) or "ok")
+        )
+
+    assert queue.wait_for_idle()
+    assert sorted(done) == [1, 1, 2, 3]
+    assert queue.active_count == 0
+
+
+def test_newer_task_supersedes_pending_one_with_the_same_key():
+    queue = ReviewQueue(start_workers=False)
+    reported = []
+    older = _task(
+        1, dedupe_key="mr:1:5", on_superseded=lambda: reported.append("older")
+    )
+    newer = _task(1, dedupe_key="mr:1:5")
+
+    queue.try_enqueue(older)
+    queue.try_enqueue(newer)
+
+    assert older.superseded
+    assert reported == ["older"]
+    assert queue.pending_count == 1
+    assert _drain(queue) == [newer]
+
+
+def test_superseding_does_not_count_against_a_full_queue():
+    queue = ReviewQueue(max_pending=1, start_workers=False)
+
+    assert queue.try_enqueue(_task(1, dedupe_key="mr:1:5"))
+    assert queue.try_enqueue(_task(1, dedupe_key="mr:1:5"))
+    assert not queue.try_enqueue(_task(1, dedupe_key="mr:1:6"))
+
+
+def test_running_task_is_not_superseded():
+    queue = ReviewQueue(start_workers=False)
+    running = _task(1, dedupe_key="mr:1:5")
+    queue.try_enqueue(running)
+    assert queue._pop_next_ready() is running
+
+    queue.try_enqueue(_task(1, dedupe_key="mr:1:5"))
+
+    assert not running.superseded
+    assert queue.pending_count == 1
+
+
+def test_superseded_task_is_skipped_when_run():
+    outcomes = []
+    task = _task(
+        1,
+        run_review=lambda: outcomes.append("ran") or "",
+        on_superseded=lambda: outcomes.append("superseded"),
+    )
+    task.mark_superseded()
+
+    task.run()
+
+    assert outcomes == ["superseded"]
+
+
+def test_sort_key_folds_priority_into_time_with_aging():
+    key = task_sort_key(2, 100.0, 0, aging_seconds=600, sjf_seconds_per_file=0)
+
+    assert key == (0, 1300.0)
+    assert effective_class(key, 600) == 2
+
+
+def test_sort_key_without_aging_is_strict_priority():
+    key = task_sort_key(2, 100.0, 3, aging_seconds=0, sjf_seconds_per_file=5)
+
+    assert key == (2, 115.0)
+    assert effective_class(key, 0) == 2
+
+
+def test_size_delay_is_capped_at_one_aging_period():
+    key = task_sort_key(0, 0.0, 1000, aging_seconds=600, sjf_seconds_per_file=5)
+
+    assert key == (0, 600.0)
+
+
+def test_higher_priority_runs_first():
+    queue = ReviewQueue(start_workers=False)
+    push = _task(1, priority=1)
+    mr = _task(2, priority=0)
+    queue.try_enqueue(push)
+    queue.try_enqueue(mr)
+
+    assert _drain(queue) == [mr, push]
+
+
+def test_waiting_task_ages_past_newer_higher_priority_work(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(review_queue.time, "monotonic", lambda: clock[0])
+    queue = ReviewQueue(start_workers=False, aging_seconds=600)
+    old_push = _task(1, priority=1)
+    queue.try_enqueue(old_push)
+    clock[0] += 700
+    new_mr = _task(2, priority=0)
+    queue.try_enqueue(new_mr)
+
+    assert _drain(queue) == [old_push, new_mr]
+
+
+def test_weighted_fair_share_across_projects():
+    queue = ReviewQueue(start_workers=False, aging_seconds=0)
+    for _ in range(6):
+        queue.try_enqueue(_task(1, weight=2))
+        queue.try_enqueue(_task(2, weight=1))
+
+    first_six = [task.project_id for task in _drain(queue)[:6]]
+
+    assert first_six.count(1) == 4
+    assert first_six.count(2) == 2
+
+
+def test_smaller_push_runs_first_with_sjf():
+    queue = ReviewQueue(start_workers=False, sjf_seconds_per_file=10)
+    large = _task(1, size_hint=20)
+    small = _task(1, size_hint=1)
+    queue.try_enqueue(large)
+    queue.try_enqueue(small)
+
+    assert _drain(queue) == [small, large]
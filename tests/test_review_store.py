@@ -0,0 +1,117 @@
+"""ReviewStore write-behind persistence."""
+
+import sqlite3
+
+import pytest
+
+from app.services.review_store import ReviewStore
+
+
+class _RecordingConnection:
+    """Wrap a connection: count transactions and fail the first ``failures`` writes."""
+
+    def __init__(self, conn: sqlite3.Connection, failures: int = 0) -> None:
+        self._conn = conn
+        self.failures = failures
+        self.transactions = 0
+
+    def execute(self, sql, params=()):
+        if self.failures and not sql.startswith("SELECT"):
+            self.failures -= 1
+            raise sqlite3.OperationalError("disk I/O error")
+        return self._conn.execute(sql, params)
+
+    def __enter__(self):
+        self.transactions += 1
+        return self._conn.__enter__()
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ReviewStore(str(tmp_path / "queue.db"), flush_interval=0)
+    yield store
+    store.close()
+
+
+def test_failed_batch_is_retried_not_counted_committed(store):
+    store._conn = _RecordingConnection(store._conn, failures=1)
+
+    store.add("t1", 1, {"n": 1})
+
+    # The first attempt fails and backs off, so the write is not durable yet
+    assert store.flush(timeout=0.05) is False
+    assert store.flush(timeout=2.0) is True
+    assert [task.task_id for task in store.load()] == ["t1"]
+
+
+def test_load_returns_running_tasks_first(store):
+    store.add("first", 1, {"n": 1})
+    store.add("second", 1, {"n": 2})
+    store.add("third", 2, {"n": 3})
+    store.mark_running("third")
+
+    assert [task.task_id for task in store.load()] == ["third", "first", "second"]
+    assert [task.state for task in store.load()] == ["running", "pending", "pending"]
+
+
+def test_remove_forgets_a_task(store):
+    store.add("t1", 1, {"n": 1})
+    store.add("t2", 1, {"n": 2})
+    store.remove("t1")
+
+    assert [task.payload for task in store.load()] == [{"n": 2}]
+
+
+def test_writes_survive_reopening(tmp_path):
+    path = str(tmp_path / "queue.db")
+    first = ReviewStore(path)
+    first.add(
+        "t1", 7, {"object_kind": "push"}, dedupe_key="push:7:main", enqueued_at=12.5
+    )
+    first.close()
+
+    second = ReviewStore(path)
+    try:
+        (task,) = second.load()
+    finally:
+        second.close()
+
+    assert (task.task_id, task.state, task.payload, task.enqueued_at) == (
+        "t1",
+        "pending",
+        {"object_kind": "push"},
+        12.5,
+    )
+
+
+def test_unreadable_payload_is_dropped(store):
+    store.add("good", 1, {"n": 1})
+    store.flush()
+    with store._db_lock, store._conn:
+        store._conn.execute(
+            "INSERT INTO review_tasks (task_id, project_id, payload, enqueued_at) "
+            "VALUES ('bad', '1', 'not json', 0)"
+        )
+
+    assert [task.task_id for task in store.load()] == ["good"]
+    assert [task.task_id for task in store.load()] == ["good"]
+
+
+def test_burst_is_committed_in_batches(tmp_path):
+    store = ReviewStore(str(tmp_path / "queue.db"), flush_interval=0.05, batch_size=50)
+    conn = store._conn = _RecordingConnection(store._conn)
+    try:
+        for n in range(120):
+            store.add(f"t{n}", 1, {"n": n})
+
+        assert store.flush()
+        assert conn.transactions <= 4
+        assert len(store.load()) == 120
+    finally:
+        store.close()
@@ -0,0 +1,39 @@
+"""Push task coalescing in the webhook service."""
+
+from types import MappingProxyType
+
+from app.services import webhook
+
+_ZERO_SHA = "0" * 40
+_CONFIG = (MappingProxyType({}), "token", "http://gitlab.example", 10, 600)
+
+
+def _push_task(before_sha: str, after_sha: str):
+    payload = {
+        "project_id": 1,
+        "project_path": "group/project",
+        "repo_url": "http://gitlab.example/group/project.git",
+        "branch": "feature",
+        "before_sha": before_sha,
+        "after_sha": after_sha,
+        "changed_files": 1,
+    }
+    return webhook._push_review_task(payload, _CONFIG)
+
+
+def test_coalesce_extends_range_to_older_before():
+    older = _push_task("a" * 40, "b" * 40)
+    newer = _push_task("b" * 40, "c" * 40)
+
+    newer.absorb(older)
+
+    assert newer.payload["before_sha"] == "a" * 40
+
+
+def test_coalesce_into_branch_creation_keeps_newer_before():
+    older = _push_task(_ZERO_SHA, "b" * 40)
+    newer = _push_task("b" * 40, "c" * 40)
+
+    newer.absorb(older)
+
+    assert newer.payload["before_sha"] == "b" * 40